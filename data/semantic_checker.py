@@ -1,89 +1,87 @@
 # Re-run the semantic checker after code execution environment reset
-import re
-import json
+import sys
 import os
-from urllib.parse import urlparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "scripts")))
+
+from rules import compile_rules
 
 INPUT_PATH = "data/generated.jsonl"
 FINAL_PATH = "data/final_dataset.jsonl"
-REJECTED_PATH = "data/failed_outputs/errors.jsonl"
+REJECTED_PATH = "data/rejected_semantic.jsonl"
 
-def check_semantic_compatibility(sample):
-    instruction = sample["instruction"].lower()
-    input_text = sample["input"].lower()
-    code = sample["output"]
+HTTP_METHOD_CALLS = [f"requests.{m}" for m in ("get", "post", "put", "delete", "patch")]
 
+# Rule deklaratif (format: lihat scripts/rules.py), urutan = urutan cek awal
+SEMANTIC_RULES = [
     # 1. Basic checks
-    if not code.strip().startswith("import"):
-        return False, "Script tidak mengimpor modul apa pun"
-
-    if "http" in input_text:
-        if "requests" not in code:
-            return False, "Permintaan HTTP tapi modul 'requests' tidak digunakan"
-        if not any(m in code for m in ("requests.get", "requests.post", "requests.put", "requests.delete", "requests.patch")):
-            return False, "Permintaan HTTP tapi tidak ada metode GET/POST/PUT/DELETE/PATCH"
-
-    if "web3" in input_text or "swap" in instruction or "contract" in instruction:
-        if "web3" not in code.lower():
-            return False, "Instruksi menyebut 'Web3/swap/contract' tapi tidak ditemukan penggunaan Web3"
-
-    if "input(" in input_text or "masukkan" in instruction:
-        if "input(" not in code:
-            return False, "Instruksi menyebut input, tapi tidak ditemukan penggunaan input()"
-
+    {
+        "name": "starts_with_import",
+        "require": {"starts_with_import": True},
+        "reason": "Script tidak mengimpor modul apa pun",
+    },
+    {
+        "name": "http_uses_requests",
+        "when": {"input_any": ["http"]},
+        "require": {"imports_any": ["requests"]},
+        "reason": "Permintaan HTTP tapi modul 'requests' tidak digunakan",
+    },
+    {
+        "name": "http_method_call",
+        "when": {"input_any": ["http"]},
+        "require": {"calls_any": HTTP_METHOD_CALLS},
+        "reason": "Permintaan HTTP tapi tidak ada metode GET/POST/PUT/DELETE/PATCH",
+    },
+    {
+        "name": "web3_usage",
+        "when": {"input_any": ["web3"], "instruction_any": ["swap", "contract"]},
+        "require": {"identifiers_any": ["web3"]},
+        "reason": "Instruksi menyebut 'Web3/swap/contract' tapi tidak ditemukan penggunaan Web3",
+    },
+    {
+        "name": "input_call",
+        "when": {"input_any": ["input("], "instruction_any": ["masukkan"]},
+        "require": {"calls_any": ["input"]},
+        "reason": "Instruksi menyebut input, tapi tidak ditemukan penggunaan input()",
+    },
     # 2. Logical structure
-    if "def " not in code and "class " not in code and "requests." not in code and "web3." not in code:
-        return False, "Tidak ada fungsi, class, atau pemanggilan API (requests/web3)"
-
+    {
+        "name": "structure",
+        "require": {"has_functions": True, "has_classes": True, "call_prefix_any": ["requests.", "web3."]},
+        "reason": "Tidak ada fungsi, class, atau pemanggilan API (requests/web3)",
+    },
     # 3. Keyword enforcement
-    urls = re.findall(r"https?://[^\s\"']+", input_text)
-    for url in urls:
-        domain = urlparse(url).netloc
-        if domain not in code:
-            return False, f"Domain URL '{domain}' tidak ditemukan dalam kode"
-
+    {
+        "name": "url_domain",
+        "require": {"input_urls_in_strings": "domain"},
+        "reason": "Domain URL '{detail}' tidak ditemukan dalam kode",
+    },
     # 4. Header enforcement if mentioned
-    if "content-type" in input_text or "headers:" in input_text:
-        if not ("headers" in code.lower() and ("application/json" in code.lower() or "content-type" in code.lower())):
-            return False, "Header 'Content-Type' disebutkan tapi tidak ditemukan dalam kode"
-
+    {
+        "name": "content_type_header",
+        "when": {"input_any": ["content-type", "headers:"]},
+        "require": [{"identifiers_any": ["headers"]}, {"strings_lower_any": ["application/json", "content-type"]}],
+        "reason": "Header 'Content-Type' disebutkan tapi tidak ditemukan dalam kode",
+    },
     # 5. Body/data presence if 'body:' or 'json' mentioned
-    if "body:" in input_text or "json" in instruction:
-        if not any(k in code.lower() for k in ["data=", "json="]):
-            return False, "Body disebutkan tapi tidak ditemukan dalam kode request"
-
-    return True, None
-
-def run_semantic_checker():
-    if not os.path.exists(INPUT_PATH):
-        print("❌ File generated.jsonl tidak ditemukan.")
-        return
+    {
+        "name": "request_body",
+        "when": {"input_any": ["body:"], "instruction_any": ["json"]},
+        "require": {"keywords_any": ["data", "json"]},
+        "reason": "Body disebutkan tapi tidak ditemukan dalam kode request",
+    },
+]
 
-    final_data = []
-    rejected_data = []
-    total = 0
+SEMANTIC = compile_rules("semantic", SEMANTIC_RULES)
 
-    with open(INPUT_PATH, "r", encoding="utf-8") as f:
-        for line in f:
-            total += 1
-            item = json.loads(line)
-            passed, reason = check_semantic_compatibility(item)
-            if passed:
-                final_data.append(item)
-            else:
-                item["rejected_reason"] = reason
-                rejected_data.append(item)
-
-    with open(FINAL_PATH, "w", encoding="utf-8") as f:
-        for item in final_data:
-            f.write(json.dumps(item, ensure_ascii=False) + "\n")
-
-    with open(REJECTED_PATH, "w", encoding="utf-8") as f:
-        for item in rejected_data:
-            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+def check_semantic_compatibility(sample):
+    return SEMANTIC.check(sample)
 
-    print(f"✅ Seleksi selesai. Total: {total}")
-    print(f"   - Lolos  : {len(final_data)} ke {FINAL_PATH}")
-    print(f"   - Ditolak: {len(rejected_data)} ke {REJECTED_PATH}")
+def run_semantic_checker(workers=None):
+    """Cek sample baru di generated.jsonl (lihat scripts/check_engine.py)."""
+    from scripts.check_engine import run_checks
+    run_checks(["semantic"], workers=workers)
 
-run_semantic_checker()
+if __name__ == "__main__":
+    run_semantic_checker()
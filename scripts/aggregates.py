@@ -0,0 +1,119 @@
+# aggregates.py
+# Agregat streaming dengan memori tetap: momen (count/jumlah/jumlah kuadrat,
+# min, max), histogram lebar tetap, dan sketch kuantil log-bucket (ala
+# DDSketch). Semuanya dict biasa (bisa langsung disimpan ke JSON), di-update
+# per nilai, dan bisa digabung (merge) dengan hasil run/chunk lain tanpa
+# membaca ulang data lama. Untuk nilai integer hasil merge tidak bergantung
+# urutan, jadi mode serial dan paralel memberi ringkasan yang sama persis.
+import math
+
+QUANTILE_ACCURACY = 0.01  # error relatif maksimum kuantil dari sketch
+
+
+def new_moments():
+    return {"count": 0, "sum": 0, "squares": 0, "min": None, "max": None}
+
+
+def add_moment(moments, value):
+    moments["count"] += 1
+    moments["sum"] += value
+    moments["squares"] += value * value
+    if moments["min"] is None or value < moments["min"]:
+        moments["min"] = value
+    if moments["max"] is None or value > moments["max"]:
+        moments["max"] = value
+
+
+def merge_moments(moments, other):
+    moments["count"] += other["count"]
+    moments["sum"] += other["sum"]
+    moments["squares"] += other["squares"]
+    for key, pick in (("min", min), ("max", max)):
+        values = [v for v in (moments[key], other[key]) if v is not None]
+        moments[key] = pick(values) if values else None
+
+
+def mean(moments):
+    return moments["sum"] / moments["count"] if moments["count"] else None
+
+
+def variance(moments):
+    """Variansi sampel (n - 1). Dihitung dari jumlah integer, jadi tetap eksak untuk data integer."""
+    n = moments["count"]
+    if n < 2:
+        return 0.0
+    return max(0.0, (n * moments["squares"] - moments["sum"] ** 2) / (n * (n - 1)))
+
+
+def new_histogram(width, limit):
+    """Bin [k*width, (k+1)*width) sampai `limit`; nilai >= limit masuk satu bin overflow."""
+    return {"width": width, "limit": limit, "bins": {}}
+
+
+def add_histogram(histogram, value):
+    start = min(int(value) // histogram["width"] * histogram["width"], histogram["limit"])
+    key = str(start)  # kunci string: sama sebelum dan sesudah disimpan ke JSON
+    histogram["bins"][key] = histogram["bins"].get(key, 0) + 1
+
+
+def merge_histogram(histogram, other):
+    for key, count in other["bins"].items():
+        histogram["bins"][key] = histogram["bins"].get(key, 0) + count
+
+
+def histogram_labels(histogram):
+    """{"0-9": n, "10-19": n, ..., "500+": n} urut dari bin terkecil."""
+    width, limit = histogram["width"], histogram["limit"]
+    labels = {}
+    for start in sorted(int(key) for key in histogram["bins"]):
+        if start >= limit:
+            label = f"{limit}+"
+        elif width == 1:
+            label = str(start)
+        else:
+            label = f"{start}-{start + width - 1}"
+        labels[label] = histogram["bins"][str(start)]
+    return labels
+
+
+def new_sketch(accuracy=QUANTILE_ACCURACY):
+    return {"accuracy": accuracy, "count": 0, "zero": 0, "bins": {}}
+
+
+def _gamma(sketch):
+    return (1 + sketch["accuracy"]) / (1 - sketch["accuracy"])
+
+
+def add_sketch(sketch, value):
+    """Nilai >= 0. Bin ke-i menampung (gamma^(i-1), gamma^i]."""
+    sketch["count"] += 1
+    if value <= 0:
+        sketch["zero"] += 1
+        return
+    key = str(math.ceil(math.log(value, _gamma(sketch))))
+    sketch["bins"][key] = sketch["bins"].get(key, 0) + 1
+
+
+def merge_sketch(sketch, other):
+    if sketch["accuracy"] != other["accuracy"]:
+        raise ValueError("Sketch dengan akurasi berbeda tidak bisa digabung")
+    sketch["count"] += other["count"]
+    sketch["zero"] += other["zero"]
+    for key, count in other["bins"].items():
+        sketch["bins"][key] = sketch["bins"].get(key, 0) + count
+
+
+def quantile(sketch, q):
+    """Perkiraan kuantil ke-q (0..1) dengan error relatif <= accuracy; None jika kosong."""
+    if not sketch["count"]:
+        return None
+    rank = q * (sketch["count"] - 1)
+    seen = sketch["zero"]
+    if rank < seen:
+        return 0.0
+    gamma = _gamma(sketch)
+    for index in sorted(int(key) for key in sketch["bins"]):
+        seen += sketch["bins"][str(index)]
+        if rank < seen:
+            return 2 * gamma ** index / (gamma + 1)
+    return 2 * gamma ** index / (gamma + 1)
@@ -1,17 +1,24 @@
 import sys
 import os
 import json
-import uuid
 import time
+import heapq
+import itertools
+from collections import Counter, deque
+from concurrent.futures import wait, FIRST_COMPLETED
 from datetime import datetime
 
 # Tambah path agar bisa mengimpor modul lokal
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from generator import load_model, generate_script
-from evaluator import evaluate_script
-from data.semantic_checker import check_semantic_compatibility
+from model_client import get_generator
+from evaluator import EvaluatorPool, DEFAULT_WORKERS, static_gate_stats
+from data.semantic_checker import check_semantic_compatibility, SEMANTIC
 from scripts.score_checker import compute_score
+from progress import ProgressJournal, RunCursor, ensure_id, sample_key
+from jsonl_sink import get_sink, flush_all
+from rules import print_rule_stats, save_rule_stats
+from deduplicate_generated import normalize_code
 
 DATA_PATH = "data/dataset.jsonl"
 GEN_PATH = "data/generated.jsonl"
@@ -21,127 +28,451 @@ FAILED_DIR = "data/failed_outputs"
 
 RETRY_LIMIT = 3
 SCORE_THRESHOLD = 0.7
-SLEEP_BETWEEN_BATCH = 3
+SLEEP_BETWEEN_BATCH = 0  # jeda opsional antar batch (detik)
+BATCH_SIZE = 8
+# Sample per panggilan generate = beberapa batch, supaya generate_scripts bisa
+# mengelompokkan prompt dengan panjang mirip ke batch yang sama
+GENERATE_WINDOW = 4
+RETRY_SHARE = 0.5  # porsi maksimal batch untuk retry selama masih ada sample baru
+EVAL_WORKERS = DEFAULT_WORKERS
+# Best-of-N: kandidat per sample dalam satu generate, dievaluasi bersamaan dengan
+# early exit. 1 = jalur lama (satu kandidat, retry jika gagal).
+BEST_OF_N = int(os.environ.get("TRAIN_AI_BEST_OF", "1"))
+# Percobaan pertama greedy (deterministik, bisa diambil dari gen_cache di run
+# berikutnya); retry tetap sampling agar outputnya berbeda. Hanya untuk BEST_OF_N 1
+GREEDY_FIRST = os.environ.get("TRAIN_AI_GREEDY", "0") == "1"
 
 os.makedirs(FAILED_DIR, exist_ok=True)
 
 def save_jsonl_line(path, item):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    sink = get_sink(path)
+    sink.write(item)
+    return sink
 
 def log(text):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     line = f"[{timestamp}] {text}"
     print(line)
-    os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
-    with open(LOG_PATH, "a", encoding="utf-8") as f:
-        f.write(line + "\n")
-
-def load_existing_ids(path):
-    ids = set()
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                try:
-                    ids.add(json.loads(line)["id"])
-                except:
-                    continue
-    return ids
+    get_sink(LOG_PATH).write_line(line)
+
+class RetryScheduler:
+    """Antrean prioritas untuk sample yang gagal.
+
+    Sample dengan percobaan paling sedikit diambil lebih dulu; alasan gagal
+    dicatat agar terlihat berapa retry yang disebabkan tiap jenis kegagalan.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.seq = itertools.count()
+        self.reasons = Counter()
+
+    def push(self, sample, attempt, reason):
+        heapq.heappush(self.heap, (attempt, next(self.seq), sample, reason))
+        self.reasons[reason] += 1
+
+    def pop(self):
+        attempt, _, sample, reason = heapq.heappop(self.heap)
+        return sample, attempt
+
+    def __len__(self):
+        return len(self.heap)
+
+
+def next_batch(fresh, retries, size=BATCH_SIZE * GENERATE_WINDOW):
+    """Gabungkan retry dan sample baru menjadi satu window generate (`size` sample).
+
+    Item adalah (sample, percobaan, output); output terisi jika sample sudah
+    di-generate pada run sebelumnya (dari jurnal) sehingga tidak perlu generate ulang.
+    """
+    batch = []
+    retry_quota = int(size * RETRY_SHARE)
+    while retries and len(batch) < retry_quota:
+        batch.append(retries.pop() + (None,))
+    for item in fresh:
+        batch.append(item)
+        if len(batch) >= size:
+            break
+    # Sample baru habis: sisa kapasitas untuk retry
+    while retries and len(batch) < size:
+        batch.append(retries.pop() + (None,))
+    return batch
+
 
-def process_sample(pipe, sample, retry_count=0):
-    if retry_count >= RETRY_LIMIT:
-        log(f"⛔ Gagal permanen ID: {sample['id'][:8]} setelah {RETRY_LIMIT} percobaan.")
+def prefilter_reason(script):
+    """Alasan output jelas bukan script ("non_python"/"too_short"), atau None."""
+    # ❌ Output bukan Python (misal JSON)
+    if script.startswith("{") or script.startswith("["):
+        return "non_python"
+    # ❌ Terlalu pendek
+    if len(script.splitlines()) < 3:
+        return "too_short"
+    return None
+
+
+def prefilter(sample):
+    """Tolak permanen output yang jelas bukan script (tidak di-retry)."""
+    reason = prefilter_reason(sample["output"])
+    if reason == "non_python":
+        log(f"⚠️ Output JSON ID: {sample['id'][:8]}")
+    elif reason == "too_short":
+        log(f"⚠️ Terlalu pendek ID: {sample['id'][:8]}")
+    if reason is not None:
+        save_jsonl_line(f"{FAILED_DIR}/{reason}.jsonl", sample)
         return False
+    return True
+
+
+def verdict(sample, result):
+    """Cek hasil runtime, semantik, dan skor tanpa efek samping. Kembalikan (lolos, alasan, detail)."""
+    script = sample["output"]
+
+    # 🧪 Evaluasi runtime
+    if not result["success"]:
+        return False, "runtime", result["stderr"]
+
+    # ✅ Evaluasi semantik
+    sem_ok, reason = check_semantic_compatibility(sample)
+    if not sem_ok:
+        return False, "semantic", reason
+
+    # ✅ Evaluasi skor sintaks
+    score = compute_score(script)
+    if score["syntax_valid_percent"] < SCORE_THRESHOLD * 100:
+        return False, "score", score
+    if score["line_count"] > 100:
+        return False, "too_long", score
+    if score["function_count"] < 1:
+        return False, "no_function", score
+    if script.count("#") > 20:
+        return False, "comments", score
+    return True, None, score
+
+
+def judge(sample, result):
+    """Cek hasil runtime, semantik, dan skor lalu catat hasilnya. Kembalikan (lolos, alasan)."""
+    script = sample["output"]
+    ok, reason, detail = verdict(sample, result)
+    if reason == "runtime":
+        log(f"⚠️ Runtime error ID: {sample['id'][:8]}")
+        save_jsonl_line(f"{FAILED_DIR}/errors.jsonl", {
+            "instruction": sample["instruction"],
+            "input": sample["input"],
+            "generated": script,
+            "error": detail
+        })
+    elif reason == "semantic":
+        log(f"❌ Gagal semantik ID: {sample['id'][:8]} | {detail}")
+    elif reason == "score":
+        log(f"❌ Skor rendah ID: {sample['id'][:8]} | Syntax: {detail['syntax_valid_percent']:.2f}")
+    elif reason == "too_long":
+        log(f"🗑️ Terlalu panjang ID: {sample['id'][:8]} | Line: {detail['line_count']}")
+    elif reason == "no_function":
+        log(f"🗑️ Tidak ada fungsi ID: {sample['id'][:8]}")
+    elif reason == "comments":
+        log(f"🗑️ Terlalu banyak komentar ID: {sample['id'][:8]}")
+    if not ok:
+        return False, reason
+
+    # ✅ Lolos semua filter
+    log(f"✅ OK ID: {sample['id'][:8]} | Line: {detail['line_count']} | Func: {detail['function_count']} | Syntax: {detail['syntax_valid_percent']:.2f}%")
+    save_jsonl_line(GEN_PATH, sample)
+    save_jsonl_line(FINAL_PATH, sample)
+    return True, None
+
+
+def dedupe_candidates(outputs):
+    """Kandidat unik sesuai urutan; script yang sama setelah normalisasi dianggap satu."""
+    seen = set()
+    unique = []
+    for output in outputs:
+        output = output.strip()
+        key = tuple(normalize_code(output))
+        if output and key not in seen:
+            seen.add(key)
+            unique.append(output)
+    return unique
+
+
+def evaluate_best_of(pool, batch, check=judge, stats=None):
+    """Evaluasi kandidat banyak sample sekaligus dengan early exit per sample.
+
+    `batch` berisi (sample, percobaan, [kandidat]). Kandidat dikirim bergiliran
+    antar sample (kandidat pertama semua sample dulu) dan paling banyak
+    `pool.workers` berjalan bersamaan. Begitu satu kandidat sebuah sample lolos
+    `check`, kandidat lain sample itu dibatalkan: yang belum jalan tidak pernah
+    dikirim dan yang masih jalan dimatikan lewat `pool.cancel` (hasilnya
+    diabaikan).
+
+    Yield (sample, percobaan, kandidat pemenang atau None, alasan gagal).
+    """
+    stats = stats if stats is not None else Counter()
+    queue = deque()
+    left = {}
+    reasons = {}
+    for rank in range(max((len(candidates) for _, _, candidates in batch), default=0)):
+        for idx, (sample, attempt, candidates) in enumerate(batch):
+            if rank < len(candidates):
+                queue.append((idx, dict(sample, output=candidates[rank])))
+    for idx, (sample, attempt, candidates) in enumerate(batch):
+        left[idx] = len(candidates)
+        reasons[idx] = Counter()
+    done = set()
+    running = {}
+
+    def refill():
+        while queue and len(running) < pool.workers:
+            idx, candidate = queue.popleft()
+            if idx in done:
+                stats["cancelled"] += 1
+                continue
+            running[pool.submit(candidate["output"], sample=candidate)] = (idx, candidate)
+
+    refill()
+    while running:
+        finished, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in finished:
+            idx, candidate = running.pop(future)
+            sample, attempt, _ = batch[idx]
+            left[idx] -= 1
+            if idx in done:
+                stats["cancelled"] += 1
+                continue
+            stats["evaluated"] += 1
+            try:
+                ok, reason = check(candidate, future.result())
+            except Exception as e:
+                log(f"🚨 ERROR ID: {sample['id'][:8]} | {str(e)}")
+                ok, reason = False, "error"
+            if ok:
+                done.add(idx)
+                for other, (other_idx, _) in running.items():
+                    if other_idx == idx:
+                        pool.cancel(other)
+                yield sample, attempt, candidate, None
+            else:
+                reasons[idx][reason] += 1
+                if left[idx] == 0:
+                    yield sample, attempt, None, reasons[idx].most_common(1)[0][0]
+        refill()
+
+
+def generate_outputs(generator, todo):
+    """Output untuk (sample, percobaan) sesuai urutan `todo`."""
+    if not todo:
+        return []
+    if not GREEDY_FIRST or BEST_OF_N > 1:
+        return generator.generate([sample for sample, _ in todo], num_return_sequences=BEST_OF_N)
+    outputs = [None] * len(todo)
+    for do_sample in (False, True):
+        indexes = [i for i, (_, attempt) in enumerate(todo) if (attempt > 0) == do_sample]
+        if indexes:
+            generated = generator.generate([todo[i][0] for i in indexes], do_sample=do_sample)
+            for i, output in zip(indexes, generated):
+                outputs[i] = output
+    return outputs
 
-    try:
-        model, tokenizer = pipe
-        script = generate_script(model, tokenizer, sample).strip()
-        sample["output"] = script
-
-        # ❌ Output bukan Python (misal JSON)
-        if script.startswith("{") or script.startswith("["):
-            log(f"⚠️ Output JSON ID: {sample['id'][:8]}")
-            save_jsonl_line(f"{FAILED_DIR}/non_python.jsonl", sample)
-            return False
-
-        # ❌ Terlalu pendek
-        if len(script.splitlines()) < 3:
-            log(f"⚠️ Terlalu pendek ID: {sample['id'][:8]}")
-            save_jsonl_line(f"{FAILED_DIR}/too_short.jsonl", sample)
-            return False
-
-        # 🧪 Evaluasi runtime
-        result = evaluate_script(script)
-        if not result["success"]:
-            log(f"⚠️ Runtime error ID: {sample['id'][:8]}")
-            save_jsonl_line(f"{FAILED_DIR}/errors.jsonl", {
-                "instruction": sample["instruction"],
-                "input": sample["input"],
-                "generated": script,
-                "error": result["stderr"]
-            })
-            return process_sample(pipe, sample, retry_count + 1)
-
-        # ✅ Evaluasi semantik
-        sem_ok, reason = check_semantic_compatibility(sample)
-        if not sem_ok:
-            log(f"❌ Gagal semantik ID: {sample['id'][:8]} | {reason}")
-            return process_sample(pipe, sample, retry_count + 1)
-
-        # ✅ Evaluasi skor sintaks
-        score = compute_score(script)
-        if score["syntax_valid_percent"] < SCORE_THRESHOLD * 100:
-            log(f"❌ Skor rendah ID: {sample['id'][:8]} | Syntax: {score['syntax_valid_percent']:.2f}")
-            return process_sample(pipe, sample, retry_count + 1)
-
-        if score["line_count"] > 100:
-            log(f"🗑️ Terlalu panjang ID: {sample['id'][:8]} | Line: {score['line_count']}")
-            return process_sample(pipe, sample, retry_count + 1)
-        if score["function_count"] < 1:
-            log(f"🗑️ Tidak ada fungsi ID: {sample['id'][:8]}")
-            return process_sample(pipe, sample, retry_count + 1)
-        if script.count("#") > 20:
-            log(f"🗑️ Terlalu banyak komentar ID: {sample['id'][:8]}")
-            return process_sample(pipe, sample, retry_count + 1)
-
-        # ✅ Lolos semua filter
-        log(f"✅ OK ID: {sample['id'][:8]} | Line: {score['line_count']} | Func: {score['function_count']} | Syntax: {score['syntax_valid_percent']:.2f}%")
-        save_jsonl_line(GEN_PATH, sample)
-        save_jsonl_line(FINAL_PATH, sample)
-        return True
-
-    except Exception as e:
-        log(f"🚨 ERROR ID: {sample['id'][:8]} | {str(e)}")
-        return process_sample(pipe, sample, retry_count + 1)
 
 def main():
-    model, tokenizer = load_model()
-    existing_ids = load_existing_ids(GEN_PATH)
+    generator = get_generator(batch_size=BATCH_SIZE)
 
     if not os.path.exists(DATA_PATH):
         log(f"❌ Tidak ada file {DATA_PATH}!")
         return
 
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        data = [json.loads(line) for line in f]
+    journal = ProgressJournal()
+    migrated = journal.import_legacy(GEN_PATH)
+    if migrated:
+        log(f"📒 {migrated} sample lama dari {GEN_PATH} ditandai selesai di jurnal.")
+
+    offset = journal.begin_run()
+    if offset:
+        log(f"📒 Melanjutkan run yang terhenti dari byte {offset} {DATA_PATH}.")
+    cursor = RunCursor(journal, offset)
+    # kunci sample -> nomor baris di cursor yang belum selesai; dataset boleh
+    # berisi baris kembar (instruction + input sama), jadi satu kunci bisa
+    # punya beberapa baris
+    seqs = {}
+
+    stats = Counter()
+    retries = RetryScheduler()
+    resumed = Counter()
+
+    def iter_fresh():
+        # Dataset dibaca bertahap dari offset run; sample yang sudah diproses
+        # sebelum berhenti dilanjutkan dari tahap terakhirnya di jurnal
+        for seq, sample in cursor.iter_samples(DATA_PATH):
+            key = ensure_id(sample)
+            stats["total"] += 1
+            stage, result = journal.get(key)
+            if stage == "done":
+                resumed["done"] += 1
+                cursor.finish(seq)
+                continue
+            seqs.setdefault(key, deque()).append(seq)
+            if stage == "generated":
+                # Output sudah ada tapi belum dinilai: langsung evaluasi
+                resumed["generated"] += 1
+                candidates = result.get("candidates") if BEST_OF_N > 1 else None
+                yield sample, result["attempt"], candidates or result["output"]
+            elif stage == "retry":
+                resumed["retry"] += 1
+                retries.push(sample, result["attempt"], result["reason"])
+            else:
+                yield sample, 0, None
+
+    fresh = iter_fresh()
+    started = time.perf_counter()
 
-    total = len(data)
-    success = 0
-    for sample in data:
-        if "id" not in sample:
-            sample["id"] = str(uuid.uuid4())
+    # Group commit per batch: hasil jurnal dan baris cursor dikumpulkan lalu
+    # dicatat sekaligus oleh commit()
+    journal_batch = []  # (kunci, tahap, hasil)
+    finished_seqs = []
 
-        if sample["id"] in existing_ids:
-            log(f"⚠️ Lewati duplikat ID: {sample['id'][:8]}")
-            continue
+    def done(sample, result):
+        key = sample_key(sample)
+        journal_batch.append((key, "done", result))
+        pending = seqs[key]
+        finished_seqs.append(pending.popleft())
+        if not pending:
+            del seqs[key]
+
+    def commit():
+        # Output di-flush sebelum jurnal mencatat `done`: output yang masih di
+        # buffer saat crash tidak akan pernah di-generate ulang
+        flush_all()
+        journal.record_many(journal_batch)
+        cursor.finish_many(finished_seqs)
+        journal_batch.clear()
+        finished_seqs.clear()
+
+    def fail(sample, attempt, reason):
+        if attempt + 1 >= RETRY_LIMIT:
+            log(f"⛔ Gagal permanen ID: {sample['id'][:8]} setelah {RETRY_LIMIT} percobaan ({reason}).")
+            stats["failed"] += 1
+            done(sample, {"status": "failed", "reason": reason})
+        else:
+            retries.push(sample, attempt + 1, reason)
+            journal_batch.append((sample_key(sample), "retry", {"attempt": attempt + 1, "reason": reason}))
+
+    def evaluate_candidates(pool, items):
+        # Best-of-N: dedup kandidat, buang yang jelas bukan script, lalu
+        # evaluasi bersamaan dan berhenti per sample begitu satu lolos
+        candidates_batch = []
+        for sample, attempt, outputs in items:
+            outputs = outputs if isinstance(outputs, list) else [outputs]
+            unique = dedupe_candidates(outputs)
+            stats["candidates"] += len(outputs)
+            stats["unique"] += len(unique)
+            log(f"🔁 Proses ID: {sample['id'][:8]} (percobaan {attempt + 1}, {len(unique)}/{len(outputs)} kandidat unik)")
+            passed = [output for output in unique if prefilter_reason(output) is None]
+            if not passed:
+                sample["output"] = unique[0] if unique else ""
+                prefilter(sample)
+                stats["failed"] += 1
+                done(sample, {"status": "rejected"})
+                continue
+            candidates_batch.append((sample, attempt, passed))
+
+        for sample, attempt, winner, reason in evaluate_best_of(pool, candidates_batch, stats=stats):
+            if winner is not None:
+                sample["output"] = winner["output"]
+                stats["success"] += 1
+                done(sample, {"status": "success"})
+            else:
+                fail(sample, attempt, reason)
+
+    with EvaluatorPool(workers=EVAL_WORKERS) as pool:
+        while True:
+            batch = next_batch(fresh, retries)
+            if not batch:
+                break
+
+            todo = [(sample, attempt) for sample, attempt, output in batch if output is None]
+            stats["generated"] += len(todo)
+            try:
+                scripts = generate_outputs(generator, todo)
+            except Exception as e:
+                log(f"🚨 ERROR batch generate | {str(e)}")
+                for sample, attempt in todo:
+                    fail(sample, attempt, "error")
+                # Item dari jurnal tetap dievaluasi
+                batch = [item for item in batch if item[2] is not None]
+                scripts = []
+
+            generated = iter(scripts)
+            generated_batch = []
+            items = []
+            for sample, attempt, output in batch:
+                if output is None:
+                    output = next(generated)
+                    if isinstance(output, list):
+                        generated_batch.append((sample_key(sample), "generated",
+                                                {"attempt": attempt, "output": output[0], "candidates": output}))
+                    else:
+                        output = output.strip()
+                        generated_batch.append((sample_key(sample), "generated", {"attempt": attempt, "output": output}))
+                items.append((sample, attempt, output))
+            journal.record_many(generated_batch)
+
+            if BEST_OF_N > 1:
+                evaluate_candidates(pool, items)
+                commit()
+                if SLEEP_BETWEEN_BATCH:
+                    time.sleep(SLEEP_BETWEEN_BATCH)
+                continue
+
+            # Evaluasi runtime satu batch berjalan paralel
+            submitted = []
+            for sample, attempt, output in items:
+                log(f"🔁 Proses ID: {sample['id'][:8]} (percobaan {attempt + 1})")
+                sample["output"] = output
+                if not prefilter(sample):
+                    stats["failed"] += 1
+                    done(sample, {"status": "rejected"})
+                    continue
+                submitted.append((sample, attempt, pool.submit(sample["output"], sample=sample)))
+
+            for sample, attempt, future in submitted:
+                try:
+                    ok, reason = judge(sample, future.result())
+                except Exception as e:
+                    log(f"🚨 ERROR ID: {sample['id'][:8]} | {str(e)}")
+                    ok, reason = False, "error"
+                if ok:
+                    stats["success"] += 1
+                    done(sample, {"status": "success"})
+                else:
+                    fail(sample, attempt, reason)
+            commit()
 
-        log(f"🔁 Proses ID: {sample['id'][:8]}")
-        if process_sample((model, tokenizer), sample):
-            success += 1
-        time.sleep(SLEEP_BETWEEN_BATCH)
+            if SLEEP_BETWEEN_BATCH:
+                time.sleep(SLEEP_BETWEEN_BATCH)
 
-    log(f"🏁 Selesai. Total: {total} | Berhasil: {success} | Gagal: {total - success}")
+    # Run berikutnya mulai dari awal dan mencoba lagi sample yang belum sukses
+    journal.end_run()
+    journal.close()
+    elapsed = time.perf_counter() - started
+    if resumed:
+        log(f"📒 Lanjut dari jurnal: {resumed['done']} sudah selesai, "
+            f"{resumed['generated']} tinggal evaluasi, {resumed['retry']} antre retry")
+    log(f"🏁 Selesai. Total: {stats['total']} | Berhasil: {stats['success']} | Gagal: {stats['failed']}")
+    finished = stats["success"] + stats["failed"]
+    mode = f"best-of-{BEST_OF_N}" if BEST_OF_N > 1 else "retry sekuensial"
+    log(f"🎯 Mode {mode}: accept rate {stats['success'] / finished if finished else 0:.1%} | "
+        f"{elapsed / stats['success'] if stats['success'] else 0:.1f}s wall-clock per sample diterima")
+    if BEST_OF_N > 1:
+        log(f"🎲 Kandidat: {stats['candidates']} di-generate, {stats['unique']} unik, "
+            f"{stats['evaluated']} dievaluasi, {stats['cancelled']} dibatalkan (early exit)")
+    log(f"⏱️ {stats['generated']} generate dalam {elapsed:.1f}s "
+        f"({stats['generated'] / elapsed * 3600 if elapsed else 0:.0f} sample/jam) | "
+        f"Retry per alasan: {dict(retries.reasons)}")
+    gate = static_gate_stats()
+    log(f"🚧 Gate statis: {gate['rejected']} proses dihemat dari {gate['checked']} script "
+        f"(syntax {gate['syntax']}, modul hilang {gate['missing_module']})")
+    log(f"🔌 Generator: {json.dumps(generator.stats(), ensure_ascii=False)}")
+    print_rule_stats(SEMANTIC)
+    save_rule_stats([SEMANTIC])
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,82 @@
+import sys
+import os
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+
+def resident_memory_mb():
+    # VmRSS dari /proc (Linux); fallback ke ru_maxrss
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_memory_mb()
+
+
+def peak_memory_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(backend, samples, max_tokens):
+    # Import di sini agar waktu load torch tidak tercampur antar backend
+    from generator import load_model, generate_scripts
+    from bench_generate import load_samples
+
+    start = time.perf_counter()
+    model, tokenizer = load_model(backend)
+    load_time = time.perf_counter() - start
+    rss = resident_memory_mb()
+
+    batch = load_samples(samples)
+    start = time.perf_counter()
+    outputs = generate_scripts(model, tokenizer, batch, batch_size=len(batch), max_tokens=max_tokens)
+    elapsed = time.perf_counter() - start
+    new_tokens = sum(len(tokenizer(o)["input_ids"]) for o in outputs)
+
+    return {
+        "backend": backend,
+        "load_time_s": round(load_time, 2),
+        "rss_mb": round(rss, 1),
+        "peak_rss_mb": round(peak_memory_mb(), 1),
+        "tokens_per_s": round(new_tokens / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandingkan waktu load, memori, dan tokens/s tiap backend")
+    parser.add_argument("--backends", default="cpu-fp32,cpu-int8")
+    parser.add_argument("--samples", type=int, default=4)
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.samples, args.max_tokens)))
+        return
+
+    # Tiap backend diukur di proses terpisah supaya memori tidak saling memengaruhi
+    print(f"{'backend':<10} {'load (s)':>9} {'RSS (MB)':>10} {'peak (MB)':>10} {'tok/s':>8}")
+    for backend in args.backends.split(","):
+        proc = subprocess.run(
+            [sys.executable, __file__, "--worker", backend,
+             "--samples", str(args.samples), "--max-tokens", str(args.max_tokens)],
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            print(f"{backend:<10} ❌ gagal: {proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else proc.returncode}")
+            continue
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{r['backend']:<10} {r['load_time_s']:>9} {r['rss_mb']:>10} {r['peak_rss_mb']:>10} {r['tokens_per_s']:>8}")
+
+
+if __name__ == "__main__":
+    main()
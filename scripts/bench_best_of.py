@@ -0,0 +1,100 @@
+import sys
+import os
+import json
+import time
+import argparse
+from collections import Counter
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import auto_loop
+from auto_loop import RETRY_LIMIT, BATCH_SIZE, GENERATE_WINDOW, verdict, prefilter_reason, dedupe_candidates, evaluate_best_of
+from evaluator import EvaluatorPool, DEFAULT_WORKERS
+from model_client import get_generator
+
+DATA_PATH = "data/dataset.jsonl"
+
+
+def load_samples(limit):
+    samples = []
+    with open(DATA_PATH, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                samples.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+            if len(samples) >= limit:
+                break
+    return samples
+
+
+def check(candidate, result):
+    ok, reason, _ = verdict(candidate, result)
+    return ok, reason
+
+
+def run(generator, pool, samples, n):
+    """Sampai RETRY_LIMIT putaran: generate untuk sample yang belum lolos, lalu evaluasi.
+
+    n == 1 adalah jalur retry sekuensial auto_loop; n > 1 best-of-N dengan early exit.
+    """
+    stats = Counter()
+    remaining = list(samples)
+    start = time.perf_counter()
+    for _ in range(RETRY_LIMIT):
+        if not remaining:
+            break
+        failed = []
+        window = BATCH_SIZE * GENERATE_WINDOW
+        for offset in range(0, len(remaining), window):
+            batch = remaining[offset:offset + window]
+            outputs = generator.generate(batch, num_return_sequences=n)
+            stats["generate_calls"] += 1
+            items = []
+            for sample, output in zip(batch, outputs):
+                unique = dedupe_candidates(output if isinstance(output, list) else [output])
+                stats["candidates"] += n
+                stats["unique"] += len(unique)
+                passed = [c for c in unique if prefilter_reason(c) is None]
+                if passed:
+                    items.append((sample, 0, passed))
+                else:
+                    failed.append(sample)
+            for sample, _, winner, _ in evaluate_best_of(pool, items, check=check, stats=stats):
+                if winner is not None:
+                    stats["accepted"] += 1
+                else:
+                    failed.append(sample)
+        remaining = failed
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retry sekuensial vs best-of-N dengan early exit")
+    parser.add_argument("--samples", type=int, default=32)
+    parser.add_argument("--n", type=int, nargs="*", default=[2, 4])
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    auto_loop.log = lambda text: None  # jangan penuhi output dengan log per kandidat
+    samples = load_samples(args.samples)
+    generator = get_generator(batch_size=BATCH_SIZE)
+    print(f"📦 {len(samples)} sample | retry limit {RETRY_LIMIT} | {args.workers} worker evaluasi")
+
+    with EvaluatorPool(workers=args.workers) as pool:
+        for n in [1] + sorted(set(n for n in args.n if n > 1)):
+            stats = run(generator, pool, samples, n)
+            accepted = stats["accepted"]
+            name = "sekuensial" if n == 1 else f"best-of-{n}"
+            print(
+                f"   - {name:<11}: accept {accepted}/{len(samples)} ({accepted / len(samples):.0%}) | "
+                f"{stats['seconds'] / accepted if accepted else float('inf'):6.1f}s per sample diterima | "
+                f"{stats['generate_calls']} generate | kandidat unik {stats['unique']}/{stats['candidates']} | "
+                f"dievaluasi {stats['evaluated']}, dibatalkan {stats['cancelled']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import sys
+import os
+import io
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import contextlib
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_code_features import load_corpus
+from code_features import extract_features
+from check_engine import CheckEngine, INPUT_PATH, STATE_PATH, DEFAULT_WORKERS, default_rule_sets
+
+BASE_SAMPLES = 5000
+# File bookkeeping yang boleh berbeda antar mode (timing rule, dsb.)
+IGNORED_FILES = {INPUT_PATH, "data/rule_stats.json"}
+
+
+def write_corpus(path, lines):
+    """generated.jsonl sintetis: sample dari data/ dengan variasi agar tiap script unik."""
+    base = load_corpus(min(lines, BASE_SAMPLES))
+    if not base:
+        raise SystemExit("❌ Tidak ada sample di data/ untuk dijadikan corpus.")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for n in range(lines):
+            sample = base[n % len(base)]
+            if n >= len(base):
+                sample = dict(sample, output=sample["output"] + f"\n\nprint({n})\n")
+            f.write(json.dumps(dict(sample, id=f"{n:08d}"), ensure_ascii=False) + "\n")
+    return os.path.getsize(path)
+
+
+def run_mode(root, corpus, workers):
+    """Jalankan engine di direktori `root` (path data/ relatif); kembalikan detik."""
+    os.makedirs(os.path.join(root, "data"), exist_ok=True)
+    os.symlink(corpus, os.path.join(root, INPUT_PATH))
+    cwd = os.getcwd()
+    os.chdir(root)
+    extract_features.cache_clear()
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            CheckEngine(default_rule_sets()).run(workers=workers)
+        return time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+
+
+def digests(root):
+    result = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            rel = os.path.relpath(path, root)
+            if rel in IGNORED_FILES:
+                continue
+            if rel == STATE_PATH:
+                # Fingerprint sama, offset sama, total sama
+                with open(path, "rb") as f:
+                    result[rel] = hashlib.sha1(json.dumps(json.load(f), sort_keys=True).encode()).hexdigest()
+                continue
+            with open(path, "rb") as f:
+                result[rel] = hashlib.sha1(f.read()).hexdigest()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark check engine: serial vs process pool")
+    parser.add_argument("--lines", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, nargs="*", default=[2, 4, DEFAULT_WORKERS])
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        corpus = os.path.join(tmp, "generated.jsonl")
+        size = write_corpus(corpus, args.lines)
+        print(f"📦 {args.lines} baris ({size / 1e6:.0f} MB) | {os.cpu_count()} core")
+
+        serial = run_mode(os.path.join(tmp, "serial"), corpus, 1)
+        expected = digests(os.path.join(tmp, "serial"))
+        print(f"   - serial    : {args.lines / serial:9.0f} baris/s | {serial:7.1f}s")
+
+        for workers in sorted(set(args.workers)):
+            if workers < 2:
+                continue
+            root = os.path.join(tmp, f"parallel_{workers}")
+            seconds = run_mode(root, corpus, workers)
+            same = digests(root) == expected
+            print(
+                f"   - {workers:2d} worker : {args.lines / seconds:9.0f} baris/s | {seconds:7.1f}s | "
+                f"{serial / seconds:4.1f}x | output {'identik ✅' if same else 'BERBEDA ❌'}"
+            )
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import sys
+import os
+import re
+import json
+import time
+import argparse
+from collections import Counter
+from urllib.parse import urlparse
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from code_features import extract_features
+from scripts.score_checker import analyze_code
+from data.semantic_checker import check_semantic_compatibility
+from semantic_checker_automation import check_semantic_for_automation, automation_keywords as AUTOMATION_KEYWORDS
+
+# Sumber script contoh: semua output yang pernah dihasilkan
+CORPUS_PATHS = [
+    "data/generated.jsonl",
+    "data/final_dataset.jsonl",
+    "data/final_dataset_soft.jsonl",
+    "data/failed_outputs/errors.jsonl",
+    "data/failed_outputs/non_python.jsonl",
+    "data/failed_outputs/too_short.jsonl",
+]
+
+
+# ---------- implementasi lama (pencarian teks), sebagai pembanding ----------
+
+def legacy_semantic(sample):
+    instruction = sample["instruction"].lower()
+    input_text = sample["input"].lower()
+    code = sample["output"]
+
+    # 1. Basic checks
+    if not code.strip().startswith("import"):
+        return False, "Script tidak mengimpor modul apa pun"
+
+    if "http" in input_text:
+        if "requests" not in code:
+            return False, "Permintaan HTTP tapi modul 'requests' tidak digunakan"
+        if not any(m in code for m in ("requests.get", "requests.post", "requests.put", "requests.delete", "requests.patch")):
+            return False, "Permintaan HTTP tapi tidak ada metode GET/POST/PUT/DELETE/PATCH"
+
+    if "web3" in input_text or "swap" in instruction or "contract" in instruction:
+        if "web3" not in code.lower():
+            return False, "Instruksi menyebut 'Web3/swap/contract' tapi tidak ditemukan penggunaan Web3"
+
+    if "input(" in input_text or "masukkan" in instruction:
+        if "input(" not in code:
+            return False, "Instruksi menyebut input, tapi tidak ditemukan penggunaan input()"
+
+    # 2. Logical structure
+    if "def " not in code and "class " not in code and "requests." not in code and "web3." not in code:
+        return False, "Tidak ada fungsi, class, atau pemanggilan API (requests/web3)"
+
+    # 3. Keyword enforcement
+    urls = re.findall(r"https?://[^\s\"']+", input_text)
+    for url in urls:
+        domain = urlparse(url).netloc
+        if domain not in code:
+            return False, f"Domain URL '{domain}' tidak ditemukan dalam kode"
+
+    # 4. Header enforcement if mentioned
+    if "content-type" in input_text or "headers:" in input_text:
+        if not ("headers" in code.lower() and ("application/json" in code.lower() or "content-type" in code.lower())):
+            return False, "Header 'Content-Type' disebutkan tapi tidak ditemukan dalam kode"
+
+    # 5. Body/data presence if 'body:' or 'json' mentioned
+    if "body:" in input_text or "json" in instruction:
+        if not any(k in code.lower() for k in ["data=", "json="]):
+            return False, "Body disebutkan tapi tidak ditemukan dalam kode request"
+
+    return True, None
+
+
+def legacy_automation(sample):
+    instruction = sample["instruction"].lower()
+    input_text = sample["input"].lower()
+    code = sample["output"].strip()
+
+    # 🚫 1. Jangan kosong atau dummy
+    if not code or len(code.splitlines()) < 2:
+        return False, "Output terlalu pendek atau kosong"
+
+    if "pass" in code and "def" in code and len(code.splitlines()) <= 5:
+        return False, "Fungsi kosong dengan pass"
+
+    # ✅ 2. Harus ada aktivitas automation / script logic
+    automation_detected = any(lib in code.lower() for lib in AUTOMATION_KEYWORDS)
+    if not automation_detected:
+        return False, "Tidak ditemukan aktivitas automation dalam kode"
+
+    # ✅ 3. Harus ada struktur fungsional
+    if not any(k in code for k in ["def ", "class ", "requests.", "async def", "await", "web3.", "selenium."]):
+        return False, "Tidak ada struktur logis seperti fungsi, kelas, atau action"
+
+    # ✅ 4. Jika menyebut http, harus akses URL valid
+    if "http" in input_text:
+        urls = re.findall(r"https?://[^\s\"']+", input_text)
+        for url in urls:
+            if url not in code:
+                return False, f"URL {url} disebut tapi tidak digunakan dalam kode"
+
+    # ✅ 5. Keyword checker (contoh swap harus pakai web3)
+    if "swap" in instruction or "web3" in input_text:
+        if "web3" not in code.lower():
+            return False, "Instruksi menyebut 'swap' atau 'Web3' tapi tidak ada penggunaan Web3"
+
+    return True, None
+
+
+def legacy_score(code):
+    lines = code.strip().splitlines()
+    line_count = len(lines)
+
+    function_count = len(re.findall(r"^\s*def\s+\w+", code, re.MULTILINE))
+    class_count = len(re.findall(r"^\s*class\s+\w+", code, re.MULTILINE))
+    comment_count = len(re.findall(r"^\s*#.*", code, re.MULTILINE))
+    variable_count = len(re.findall(r"\b\w+\s*=", code))
+
+    hardcoded_values = len(re.findall(r"[^a-zA-Z](\"[^\"]*\"|'[^']*'|\d+)", code))
+
+    try:
+        compile(code, "<string>", "exec")
+        syntax_valid = True
+    except Exception:
+        syntax_valid = False
+
+    return {
+        "line_count": line_count,
+        "function_count": function_count,
+        "class_count": class_count,
+        "comment_count": comment_count,
+        "variable_count": variable_count,
+        "hardcoded_values": hardcoded_values,
+        "syntax_valid": syntax_valid,
+        "syntax_valid_percent": 100.0 if syntax_valid else 0.0,  # ✅ Tambahkan ini
+    }
+
+
+# ---------- benchmark & kesetaraan ----------
+
+def load_corpus(target):
+    """Sample unik dari data/, diperbanyak dengan variasi kecil sampai `target`."""
+    seen = set()
+    base = []
+    for path in CORPUS_PATHS:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not isinstance(item, dict):
+                    continue
+                output = item.get("output") or item.get("generated") or ""
+                if not output or output in seen:
+                    continue
+                seen.add(output)
+                base.append({"instruction": item.get("instruction", ""), "input": item.get("input", ""), "output": output})
+    if not base:
+        return []
+    # Variasi: tambahkan baris kosong + print di akhir agar tiap script unik (cache tidak membantu)
+    samples = list(base)
+    n = 0
+    while len(samples) < target:
+        sample = base[n % len(base)]
+        samples.append(dict(sample, output=sample["output"] + f"\n\nprint({n})\n"))
+        n += 1
+    return samples[:target]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark & cek kesetaraan fitur AST vs pencarian teks lama")
+    parser.add_argument("--scripts", type=int, default=3000)
+    parser.add_argument("--show", type=int, default=10, help="jumlah perbedaan verdict yang ditampilkan")
+    args = parser.parse_args()
+
+    samples = load_corpus(args.scripts)
+    if not samples:
+        print("❌ Tidak ada script contoh di data/.")
+        return
+    print(f"📦 {len(samples)} script")
+
+    start = time.perf_counter()
+    old = [(legacy_semantic(s), legacy_automation(s), legacy_score(s["output"])) for s in samples]
+    old_time = time.perf_counter() - start
+
+    extract_features.cache_clear()
+    start = time.perf_counter()
+    new = [(check_semantic_compatibility(s), check_semantic_for_automation(s), analyze_code(s["output"])) for s in samples]
+    new_time = time.perf_counter() - start
+
+    # Cek ulang dengan record fitur yang sudah di-cache (mis. rule set tambahan)
+    start = time.perf_counter()
+    for s in samples:
+        check_semantic_compatibility(s)
+        check_semantic_for_automation(s)
+        analyze_code(s["output"])
+    cached_time = time.perf_counter() - start
+
+    print(f"⏱️  Teks lama: {old_time * 1000:8.1f} ms | fitur AST: {new_time * 1000:8.1f} ms "
+          f"({len(samples) / new_time:.0f} script/s, {old_time / new_time:.2f}x) | "
+          f"cek ulang dari cache: {cached_time * 1000:6.1f} ms")
+
+    # Kesetaraan verdict
+    diffs = []
+    for sample, (old_sem, old_auto, old_score), (new_sem, new_auto, new_score) in zip(samples, old, new):
+        for name, before, after in (("semantic", old_sem, new_sem), ("automation", old_auto, new_auto)):
+            if before[0] != after[0]:
+                diffs.append((name, sample, before, after))
+        if old_score["syntax_valid"] != new_score["syntax_valid"]:
+            diffs.append(("syntax_valid", sample, old_score["syntax_valid"], new_score["syntax_valid"]))
+
+    agree = Counter()
+    for name in ("semantic", "automation", "syntax_valid"):
+        agree[name] = len(samples) - sum(1 for d in diffs if d[0] == name)
+    print("🟰 Verdict sama: " + " | ".join(f"{name} {agree[name]}/{len(samples)}" for name in agree))
+
+    # Arti field hitungan berubah (score_checker.SCORE_VERSION 2); tampilkan seberapa sering berbeda
+    field_diffs = Counter()
+    for (_, _, old_score), (_, _, new_score) in zip(old, new):
+        for field, value in old_score.items():
+            if new_score[field] != value:
+                field_diffs[field] += 1
+    print("📐 Field skor berbeda: " + (", ".join(f"{k} {v}" for k, v in field_diffs.most_common()) or "tidak ada"))
+
+    # Perbedaan verdict unik (variasi dari script yang sama dihitung sekali)
+    shown = set()
+    for name, sample, before, after in diffs:
+        key = (name, sample["instruction"], sample["input"], str(before), str(after))
+        if key in shown or len(shown) >= args.show:
+            continue
+        shown.add(key)
+        print(f"   ≠ {name}: lama {before} → baru {after} | {sample['instruction'][:60]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import sys
+import os
+import re
+import json
+import time
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from collections import Counter, deque
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from bench_code_features import load_corpus
+from deduplicate_generated import remove_duplicates_from_generated, SIMILARITY_THRESHOLD
+
+BASE_SAMPLES = 5000
+RECENT = 2000  # duplikat diambil dari sekian record terakhir
+_VARIANT_RE = re.compile(r"^print\(\d+\)$")
+_ASSIGN_RE = re.compile(r"^\s*([a-z_]\w*)\s*=[^=]", re.MULTILINE)
+
+
+def legacy_dedup(path):
+    # Cara lama: seluruh string instruction+input+output disimpan di set
+    seen = set()
+    unique = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            sample = json.loads(line)
+            key = sample.get("instruction", "").strip() + sample.get("input", "").strip() + sample.get("output", "").strip()
+            if key not in seen:
+                seen.add(key)
+                unique.append(sample)
+    with open(path, "w", encoding="utf-8") as f:
+        for sample in unique:
+            f.write(json.dumps(sample, ensure_ascii=False) + "\n")
+
+
+def perturb(code, rng):
+    """Near-duplicate: ganti nama variabel, tambah komentar/baris kosong, ubah angka."""
+    names = _ASSIGN_RE.findall(code)
+    if names:
+        name = rng.choice(names)
+        code = re.sub(rf"\b{re.escape(name)}\b", f"{name}_{rng.randrange(1000)}", code)
+    lines = code.splitlines()
+    pos = rng.randrange(len(lines) + 1)
+    lines[pos:pos] = ["", "# " + rng.choice(["versi lain", "TODO", "contoh"])]
+    code = "\n".join(line + (" " * rng.randrange(3)) for line in lines)
+    return re.sub(r"\b\d+\b", lambda m: str(rng.randrange(100)), code, count=1)
+
+
+def write_corpus(path, lines, exact_rate, near_rate, seed=0):
+    """Corpus berlabel: sample berbeda (campuran acak baris kode), salinan persis, dan near-duplicate."""
+    rng = random.Random(seed)
+    base = load_corpus(BASE_SAMPLES)
+    if not base:
+        raise SystemExit("❌ Tidak ada sample di data/ untuk dijadikan corpus.")
+    # Baris `print(n)` hanya variasi dari load_corpus, bukan kode asli
+    pool = sorted({
+        line for sample in base for line in sample["output"].splitlines()
+        if line.strip() and not _VARIANT_RE.match(line)
+    })
+    recent = deque(maxlen=RECENT)
+    with open(path, "w", encoding="utf-8") as f:
+        for n in range(lines):
+            roll = rng.random()
+            if recent and roll < exact_rate:
+                sample, label = dict(rng.choice(recent)), "exact"
+            elif recent and roll < exact_rate + near_rate:
+                original = rng.choice(recent)
+                sample, label = dict(original, output=perturb(original["output"], rng)), "near"
+            else:
+                source = rng.choice(base)
+                output = "import requests\n" + "\n".join(rng.sample(pool, rng.randint(8, 20)))
+                sample, label = {"instruction": source["instruction"], "input": source["input"], "output": output}, "distinct"
+                recent.append(sample)
+            f.write(json.dumps(dict(sample, bench_label=label), ensure_ascii=False) + "\n")
+    return os.path.getsize(path)
+
+
+def _measure(target, path, queue):
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    target(path)
+    seconds = time.perf_counter() - start
+    queue.put((seconds, (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - start_rss) / 1024))
+
+
+def measure(target, path):
+    """Jalankan di proses terpisah agar puncak memori tiap cara terukur sendiri."""
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(target, path, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def labels(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return Counter(json.loads(line)["bench_label"] for line in f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dedup: set string utuh vs MinHash/LSH")
+    parser.add_argument("--lines", type=int, default=1000000)
+    parser.add_argument("--exact-rate", type=float, default=0.05)
+    parser.add_argument("--near-rate", type=float, default=0.15)
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        corpus = os.path.join(tmp, "corpus.jsonl")
+        size = write_corpus(corpus, args.lines, args.exact_rate, args.near_rate)
+        expected = labels(corpus)
+        print(f"📦 {args.lines} baris ({size / 1e6:.0f} MB) | label: {dict(expected)}")
+
+        methods = [("MinHash/LSH", lambda path: remove_duplicates_from_generated(path, args.threshold))]
+        if not args.skip_legacy:
+            methods.insert(0, ("string utuh", legacy_dedup))
+        for name, target in methods:
+            path = os.path.join(tmp, "run.jsonl")
+            shutil.copyfile(corpus, path)
+            with open(os.devnull, "w") as devnull:
+                stdout, sys.stdout = sys.stdout, devnull
+                try:
+                    seconds, peak_mb = measure(target, path)
+                finally:
+                    sys.stdout = stdout
+            kept = labels(path)
+            print(
+                f"   - {name:<12}: {args.lines / seconds:8.0f} baris/s | puncak memori +{peak_mb:6.0f} MB | "
+                f"sisa distinct {kept['distinct']}/{expected['distinct']} | "
+                f"exact dibuang {expected['exact'] - kept['exact']}/{expected['exact']} | "
+                f"near dibuang {expected['near'] - kept['near']}/{expected['near']}"
+            )
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
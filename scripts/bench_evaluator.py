@@ -0,0 +1,62 @@
+import sys
+import os
+import time
+import argparse
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from evaluator import EVAL_MODES, EvaluatorPool, evaluate_script
+
+# Script contoh: hitung ringan + menunggu seperti request jaringan
+BENCH_SCRIPT = (
+    "import json\n"
+    "import time\n"
+    "data = {{'n': sum(range(10000))}}\n"
+    "time.sleep({sleep})\n"
+    "print(json.dumps(data))\n"
+)
+
+OVERHEAD_SCRIPT = (
+    "try:\n"
+    "    import requests\n"
+    "except ImportError:\n"
+    "    pass\n"
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark throughput EvaluatorPool per jumlah worker")
+    parser.add_argument("--scripts", type=int, default=32)
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--sleep", type=float, default=0.2, help="detik menunggu di tiap script")
+    parser.add_argument("--mode", default="subprocess", choices=EVAL_MODES)
+    parser.add_argument("--overhead", type=int, default=20, help="jumlah script kosong untuk ukur overhead per mode")
+    args = parser.parse_args()
+
+    # Overhead per script: script yang mengimpor modul umum tapi tidak melakukan apa-apa
+    print(f"⏱️  Overhead per script ({args.overhead}x, serial):")
+    for mode in EVAL_MODES:
+        evaluate_script(OVERHEAD_SCRIPT, mode=mode)  # pemanasan (mis. start fork server)
+        start = time.perf_counter()
+        for _ in range(args.overhead):
+            evaluate_script(OVERHEAD_SCRIPT, mode=mode)
+        elapsed = (time.perf_counter() - start) / args.overhead
+        print(f"   - {mode:<10}: {elapsed * 1000:7.1f} ms/script")
+
+    scripts = [BENCH_SCRIPT.format(sleep=args.sleep)] * args.scripts
+    print(f"📦 {args.scripts} script | sleep {args.sleep}s per script | mode {args.mode}")
+
+    for workers in [int(w) for w in args.workers.split(",")]:
+        with EvaluatorPool(workers=workers, mode=args.mode) as pool:
+            start = time.perf_counter()
+            results = pool.map(scripts)
+            elapsed = time.perf_counter() - start
+        ok = sum(1 for r in results if r["success"])
+        print(
+            f"   - {workers:>2} worker: {elapsed:6.2f}s | "
+            f"{args.scripts / elapsed:6.1f} script/s | sukses {ok}/{args.scripts}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import sys
+import os
+import json
+import time
+import argparse
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from generator import BACKENDS, load_model, build_prompt, generate_scripts
+
+DATA_PATH = "data/dataset.jsonl"
+
+
+def load_samples(limit):
+    samples = []
+    with open(DATA_PATH, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                samples.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+            if len(samples) >= limit:
+                break
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tokens/s generate_scripts per batch size")
+    parser.add_argument("--samples", type=int, default=16)
+    parser.add_argument("--batch-sizes", default="1,2,4,8")
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--backend", default="cpu-fp32", choices=BACKENDS)
+    args = parser.parse_args()
+
+    model, tokenizer = load_model(args.backend)
+    samples = load_samples(args.samples)
+    prompt_tokens = sum(len(tokenizer(build_prompt(s))["input_ids"]) for s in samples)
+    print(f"📦 {len(samples)} sample | {prompt_tokens} token prompt | max_new_tokens={args.max_tokens}")
+
+    for batch_size in [int(b) for b in args.batch_sizes.split(",")]:
+        start = time.perf_counter()
+        outputs = generate_scripts(model, tokenizer, samples, batch_size=batch_size, max_tokens=args.max_tokens)
+        elapsed = time.perf_counter() - start
+        new_tokens = sum(len(tokenizer(o)["input_ids"]) for o in outputs)
+        print(
+            f"   - batch {batch_size:>3}: {elapsed:7.2f}s | "
+            f"{new_tokens / elapsed:8.1f} tok/s (output) | "
+            f"{len(samples) / elapsed * 3600:8.0f} sample/jam"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import sys
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from jsonl_sink import JsonlSink
+
+# Record contoh seukuran sample generated.jsonl yang kecil
+RECORD = {
+    "id": "0" * 40,
+    "instruction": "Generate a POST request with custom headers.",
+    "input": "POST https://api.example.com/data\nHeaders: Content-Type: application/json",
+    "output": "import requests\n\ndef main():\n    requests.post('https://api.example.com/data', json={})\n",
+}
+
+
+def save_jsonl_line(path, item):
+    # Cara lama: makedirs + buka/tutup file per record
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+
+def run_threads(n_threads, n_records, write):
+    per_thread = n_records // n_threads
+    threads = [threading.Thread(target=lambda: [write(RECORD) for _ in range(per_thread)]) for _ in range(n_threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def count_lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark penulisan JSONL: per record vs JsonlSink")
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--fsync", action="store_true", help="fsync di tiap flush sink")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        print(f"📦 {args.records} record | {args.threads} thread")
+        for n_threads in (1, args.threads):
+            old_path = os.path.join(tmp, f"old_{n_threads}", "out.jsonl")
+            lock = threading.Lock()
+
+            def old_write(item):
+                with lock:  # tanpa lock baris dari thread berbeda bisa bercampur
+                    save_jsonl_line(old_path, item)
+
+            old = run_threads(n_threads, args.records, old_write)
+
+            new_path = os.path.join(tmp, f"new_{n_threads}", "out.jsonl")
+            sink = JsonlSink(new_path, fsync=args.fsync)
+            start = time.perf_counter()
+            run_threads(n_threads, args.records, sink.write)
+            sink.close()  # termasuk flush terakhir
+            new = time.perf_counter() - start
+
+            total = args.records // n_threads * n_threads
+            assert count_lines(old_path) == count_lines(new_path) == total
+            print(
+                f"   - {n_threads} thread: per record {total / old:9.0f} record/s | "
+                f"JsonlSink {total / new:9.0f} record/s | {old / new:5.1f}x"
+            )
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import sys
+import os
+import time
+import argparse
+import statistics
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from generator import BACKENDS, load_model, generate_script, get_prefix_cache
+from bench_generate import load_samples
+
+
+def time_to_first_token(model, tokenizer, samples, use_prefix_cache):
+    timings = []
+    for sample in samples:
+        start = time.perf_counter()
+        generate_script(model, tokenizer, sample, max_tokens=1, use_prefix_cache=use_prefix_cache)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandingkan time-to-first-token dengan/tanpa cache KV preamble")
+    parser.add_argument("--samples", type=int, default=16)
+    parser.add_argument("--backend", default="cpu-fp32", choices=BACKENDS)
+    args = parser.parse_args()
+
+    model, tokenizer = load_model(args.backend)
+    samples = load_samples(args.samples)
+
+    start = time.perf_counter()
+    get_prefix_cache(model, tokenizer)
+    print(f"🧠 Cache preamble dibuat dalam {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    # Pemanasan agar alokasi pertama tidak ikut terukur
+    generate_script(model, tokenizer, samples[0], max_tokens=1, use_prefix_cache=False)
+
+    for label, flag in (("tanpa cache", False), ("dengan cache", True)):
+        timings = time_to_first_token(model, tokenizer, samples, flag)
+        print(
+            f"   - {label:<13}: median {statistics.median(timings):7.1f} ms | "
+            f"rata-rata {statistics.mean(timings):7.1f} ms | max {max(timings):7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
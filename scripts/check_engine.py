@@ -0,0 +1,411 @@
+# check_engine.py
+# Mesin cek inkremental untuk generated.jsonl: file dibaca sekali, setiap
+# sample dijalankan ke semua rule set terdaftar (semantic, automation, score),
+# dan semua file verdict ditulis bersama. Posisi byte terakhir (watermark) per
+# rule set disimpan sehingga run berikutnya hanya memproses baris baru.
+#
+# Mode paralel: rentang byte yang belum dicek dipotong menjadi chunk yang
+# batasnya jatuh di awal baris, tiap chunk dicek di process pool dan menulis
+# output ke file sementara, lalu file itu digabung sesuai urutan chunk. Hasil
+# (file verdict, score_log, score_summary.json) sama persis
+# dengan mode serial.
+import sys
+import os
+import json
+import shutil
+import hashlib
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import semantic_checker_automation
+from data import semantic_checker
+from scripts import score_checker
+from jsonl_sink import JsonlSink, get_sink
+from rules import print_rule_stats, save_rule_stats
+
+INPUT_PATH = "data/generated.jsonl"
+STATE_PATH = "data/check_state.json"
+FINGERPRINT_BYTES = 4096  # byte sebelum watermark yang dicek untuk mendeteksi file ditulis ulang
+DEFAULT_WORKERS = os.cpu_count() or 1
+CHUNKS_PER_WORKER = 4  # chunk lebih kecil dari bagian per worker agar beban merata
+PARALLEL_MIN_BYTES = 1024 * 1024  # di bawah ini overhead pool lebih mahal dari ceknya
+
+
+class RuleSet:
+    """Satu kelompok aturan lolos/tolak.
+
+    `check(sample)` mengembalikan (lolos, alasan). Sample lolos ditambahkan ke
+    `passed_path`, yang ditolak (dengan `rejected_reason`) ke `rejected_path`.
+    """
+
+    def __init__(self, name, check, passed_path, rejected_path, rules=None):
+        self.name = name
+        self.check = check
+        self.passed_path = passed_path
+        self.rejected_path = rejected_path
+        self.rules = rules  # CompiledRules (scripts/rules.py) untuk statistik per rule
+
+    def derived_paths(self):
+        # File yang sepenuhnya diturunkan dari input: dikosongkan saat dibangun ulang.
+        # Karena itu tiap rule set punya file tolak sendiri (bukan errors.jsonl runtime)
+        return [self.passed_path, self.rejected_path]
+
+    def output_paths(self):
+        return [self.passed_path, self.rejected_path]
+
+    def new_state(self):
+        return {"offset": 0, "fingerprint": None, "passed": 0, "rejected": 0}
+
+    def merge_state(self, state, other):
+        """Tambahkan hasil chunk paralel (`other`, dari new_state) ke `state`."""
+        state["passed"] += other["passed"]
+        state["rejected"] += other["rejected"]
+
+    def apply(self, sample, state, write):
+        """Kembalikan (lolos, alasan, skor) atau None jika sample dilewati.
+
+        Output ditulis lewat `write(path, item)`.
+        """
+        passed, reason = self.check(sample)
+        if passed:
+            write(self.passed_path, sample)
+            state["passed"] += 1
+        else:
+            write(self.rejected_path, dict(sample, rejected_reason=reason))
+            state["rejected"] += 1
+        return passed, reason, None
+
+    def report(self, state, new):
+        print(f"✅ {self.name}: {new['checked']} baru (lolos {new['passed']}, ditolak {new['rejected']})")
+        print(f"   - Total lolos  : {state['passed']} di {self.passed_path}")
+        print(f"   - Total ditolak: {state['rejected']} di {self.rejected_path}")
+        if self.rules is not None:
+            print_rule_stats(self.rules)
+
+
+class ScoreRuleSet(RuleSet):
+    """Skor kode per sample ke SCORE_LOG + ringkasan agregat di SUMMARY_PATH."""
+
+    def __init__(self, name="score"):
+        self.name = name
+        self.rules = None
+
+    def derived_paths(self):
+        return [score_checker.SCORE_LOG]
+
+    def output_paths(self):
+        return [score_checker.SCORE_LOG]
+
+    def new_state(self):
+        # Agregat disimpan bersama watermark (satu file, atomik): tidak pernah terhitung dua kali
+        return {
+            "offset": 0, "fingerprint": None, "passed": 0, "rejected": 0,
+            "version": score_checker.SCORE_VERSION, "aggregates": score_checker.new_aggregates(),
+        }
+
+    def merge_state(self, state, other):
+        super().merge_state(state, other)
+        score_checker.merge_aggregates(state["aggregates"], other["aggregates"])
+
+    def apply(self, sample, state, write):
+        code = sample.get("output", "").strip()
+        if not code:
+            return None
+        score = score_checker.analyze_code(code)
+        write(score_checker.SCORE_LOG, score_checker.score_log_item(sample, score))
+        score_checker.add_score(state["aggregates"], score)
+        state["passed" if score["syntax_valid"] else "rejected"] += 1
+        return score["syntax_valid"], None, score
+
+    def report(self, state, new):
+        if not state["aggregates"]["total"]:
+            print("⚠️ Tidak ada script yang bisa dinilai.")
+            return
+        summary = score_checker.save_summary(state["aggregates"])
+        print(f"📊 Ringkasan Skor Kode ({new['checked']} baru):")
+        for key, val in summary.items():
+            if key not in ("fields", "histograms"):
+                print(f"   - {key}: {val}")
+        for field, stats in summary["fields"].items():
+            print(
+                f"   - {field:<16} mean {stats['mean']:7.2f} ± {stats['stdev']:<7.2f} "
+                f"min {stats['min']} | p50 {stats['p50']} | p90 {stats['p90']} | p99 {stats['p99']} | max {stats['max']}"
+            )
+        for field, bins in summary["histograms"].items():
+            print(f"   - histogram {field}: {bins}")
+
+
+def default_rule_sets():
+    return [
+        RuleSet(
+            "automation",
+            semantic_checker_automation.check_semantic_for_automation,
+            semantic_checker_automation.FINAL_PATH,
+            semantic_checker_automation.REJECTED_PATH,
+            rules=semantic_checker_automation.AUTOMATION,
+        ),
+        RuleSet(
+            "semantic",
+            semantic_checker.check_semantic_compatibility,
+            semantic_checker.FINAL_PATH,
+            semantic_checker.REJECTED_PATH,
+            rules=semantic_checker.SEMANTIC,
+        ),
+        ScoreRuleSet(),
+    ]
+
+
+def _fingerprint(f, offset):
+    start = max(0, offset - FINGERPRINT_BYTES)
+    f.seek(start)
+    return hashlib.sha1(f.read(offset - start)).hexdigest()
+
+
+def load_state(path=STATE_PATH):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _sink_write(path, item):
+    get_sink(path).write(item)
+
+
+def _scan(f, end, rule_sets, states, write, new):
+    """Cek baris lengkap dari posisi `f` sampai `end`; kembalikan (posisi akhir, baris rusak).
+
+    Rule set hanya memproses baris di atau setelah watermark-nya (`states[..]["offset"]`).
+    """
+    pos = f.tell()
+    skipped_lines = 0
+    for raw in f:
+        if not raw.endswith(b"\n"):
+            break  # baris terakhir belum selesai ditulis: tunggu run berikutnya
+        line_start, pos = pos, pos + len(raw)
+        if raw.strip():
+            try:
+                sample = json.loads(raw)
+            except json.JSONDecodeError:
+                skipped_lines += 1
+                sample = None
+
+            for rule_set in rule_sets if sample is not None else ():
+                state = states[rule_set.name]
+                if line_start < state["offset"]:
+                    continue
+                verdict = rule_set.apply(sample, state, write)
+                if verdict is None:
+                    continue
+                passed, reason, score = verdict
+                counts = new[rule_set.name]
+                counts["checked"] += 1
+                counts["passed" if passed else "rejected"] += 1
+        if pos >= end:
+            break
+    return pos, skipped_lines
+
+
+def _chunk_bounds(f, start, end, count):
+    """Potong [start, end) menjadi paling banyak `count` rentang yang dimulai di awal baris."""
+    bounds = [start]
+    for i in range(1, count):
+        target = start + (end - start) * i // count
+        if target <= bounds[-1]:
+            continue
+        f.seek(target - 1)
+        f.readline()  # maju ke awal baris berikutnya
+        boundary = f.tell()
+        if bounds[-1] < boundary < end:
+            bounds.append(boundary)
+    bounds.append(end)
+    return list(zip(bounds, bounds[1:]))
+
+
+_worker_rule_sets = None
+
+
+def _check_chunk(task):
+    """Worker: cek satu chunk, tulis output ke file sementara, kembalikan hasil parsialnya."""
+    global _worker_rule_sets
+    index, input_path, begin, end, offsets, orders, tmp_dir = task
+    if _worker_rule_sets is None:
+        _worker_rule_sets = {rule_set.name: rule_set for rule_set in default_rule_sets()}
+    rule_sets = [_worker_rule_sets[name] for name in offsets]
+
+    states = {}
+    for rule_set in rule_sets:
+        states[rule_set.name] = dict(rule_set.new_state(), offset=offsets[rule_set.name])
+        if rule_set.rules is not None:
+            rule_set.rules.set_order(orders[rule_set.name])
+            rule_set.rules.reset_stats()
+
+    sinks = {}
+
+    def write(path, item):
+        sink = sinks.get(path)
+        if sink is None:
+            tmp_path = os.path.join(tmp_dir, f"{index:05d}_{len(sinks)}.jsonl")
+            sink = sinks[path] = JsonlSink(tmp_path, flush_interval=float("inf"), fsync=False)
+        sink.write(item)
+
+    new = {rule_set.name: {"checked": 0, "passed": 0, "rejected": 0} for rule_set in rule_sets}
+    with open(input_path, "rb") as f:
+        f.seek(begin)
+        pos, skipped_lines = _scan(f, end, rule_sets, states, write, new)
+    for sink in sinks.values():
+        sink.close()
+
+    return {
+        "pos": pos,
+        "skipped_lines": skipped_lines,
+        "outputs": {path: sink.path for path, sink in sinks.items()},
+        "states": states,
+        "new": new,
+        "rule_stats": {r.name: r.rules.stats() for r in rule_sets if r.rules is not None},
+    }
+
+
+class CheckEngine:
+    def __init__(self, rule_sets=None, input_path=INPUT_PATH, state_path=STATE_PATH):
+        self.rule_sets = rule_sets if rule_sets is not None else default_rule_sets()
+        self.input_path = input_path
+        self.state_path = state_path
+
+    def _resume_states(self, f, size, saved):
+        """State per rule set; yang watermark-nya tidak lagi cocok dibangun ulang dari awal."""
+        states = {}
+        for rule_set in self.rule_sets:
+            state = saved.get(rule_set.name)
+            fresh = rule_set.new_state()
+            # Format state lama atau versi arti field yang berbeda dibangun ulang
+            current = state is not None and fresh.keys() <= state.keys() and state.get("version") == fresh.get("version")
+            valid = (
+                current
+                and state["offset"] <= size
+                and state["fingerprint"] == _fingerprint(f, state["offset"])
+            )
+            if not valid:
+                if state is not None and not current:
+                    print(f"♻️  Format state {rule_set.name} berubah, dicek ulang dari awal.")
+                elif state is not None:
+                    print(f"♻️  {self.input_path} berubah, {rule_set.name} dicek ulang dari awal.")
+                state = fresh
+                state["fingerprint"] = _fingerprint(f, 0)
+                for path in rule_set.derived_paths():
+                    if os.path.exists(path):
+                        open(path, "w").close()
+            states[rule_set.name] = state
+        return states
+
+    def _run_parallel(self, f, start, end, states, workers, new):
+        bounds = _chunk_bounds(f, start, end, workers * CHUNKS_PER_WORKER)
+        offsets = {rule_set.name: states[rule_set.name]["offset"] for rule_set in self.rule_sets}
+        orders = {r.name: r.rules.order() for r in self.rule_sets if r.rules is not None}
+        by_name = {rule_set.name: rule_set for rule_set in self.rule_sets}
+        pos = start
+        skipped_lines = 0
+
+        # Buffer sink induk ditulis dulu agar isi chunk menyusul di belakangnya
+        for rule_set in self.rule_sets:
+            for path in rule_set.output_paths():
+                get_sink(path).flush()
+
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        tmp_dir = tempfile.mkdtemp(prefix="check_chunks_")
+        try:
+            tasks = [
+                (index, self.input_path, begin, stop, offsets, orders, tmp_dir)
+                for index, (begin, stop) in enumerate(bounds)
+            ]
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=context) as pool:
+                # map mengembalikan hasil sesuai urutan chunk: output digabung urut seperti mode serial
+                for result in pool.map(_check_chunk, tasks):
+                    for path, tmp_path in result["outputs"].items():
+                        with open(tmp_path, "rb") as src, open(path, "ab") as dst:
+                            shutil.copyfileobj(src, dst, 1024 * 1024)
+                        os.remove(tmp_path)
+                    for name, state in result["states"].items():
+                        by_name[name].merge_state(states[name], state)
+                        for field, value in result["new"][name].items():
+                            new[name][field] += value
+                    for name, stats in result["rule_stats"].items():
+                        by_name[name].rules.merge_stats(stats)
+                    skipped_lines += result["skipped_lines"]
+                    pos = result["pos"]
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return pos, skipped_lines
+
+    def run(self, workers=1):
+        if not os.path.exists(self.input_path):
+            print(f"❌ File tidak ditemukan: {self.input_path}")
+            return None
+
+        saved = load_state(self.state_path)
+        new = {rule_set.name: {"checked": 0, "passed": 0, "rejected": 0} for rule_set in self.rule_sets}
+
+        with open(self.input_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            states = self._resume_states(f, size, saved)
+            start = min((state["offset"] for state in states.values()), default=size)
+            # Mode paralel hanya untuk rule set terdaftar (worker membangunnya ulang dari nama)
+            registered = {rule_set.name for rule_set in default_rule_sets()}
+            parallel = (
+                workers > 1
+                and size - start >= PARALLEL_MIN_BYTES
+                and all(rule_set.name in registered for rule_set in self.rule_sets)
+            )
+            if parallel:
+                pos, skipped_lines = self._run_parallel(f, start, size, states, workers, new)
+            else:
+                f.seek(start)
+                pos, skipped_lines = _scan(f, size, self.rule_sets, states, _sink_write, new)
+            fingerprint = _fingerprint(f, pos)
+
+        # Output ditulis dulu, baru watermark maju (baris tidak pernah hilang)
+        for rule_set in self.rule_sets:
+            for path in rule_set.output_paths():
+                get_sink(path).flush()
+            states[rule_set.name].update(offset=pos, fingerprint=fingerprint)
+        saved.update(states)
+        save_state(saved, self.state_path)
+
+        if skipped_lines:
+            print(f"⚠️ {skipped_lines} baris JSON rusak dilewati.")
+        for rule_set in self.rule_sets:
+            rule_set.report(states[rule_set.name], new[rule_set.name])
+        # Statistik rule dipakai untuk urutan cek di run berikutnya
+        save_rule_stats([r.rules for r in self.rule_sets if r.rules is not None])
+        return new
+
+
+def run_checks(names=None, workers=None):
+    """Jalankan rule set terdaftar (semua, atau yang namanya ada di `names`).
+
+    `workers` > 1 memakai process pool untuk input besar (default: jumlah core).
+    """
+    rule_sets = [r for r in default_rule_sets() if names is None or r.name in names]
+    return CheckEngine(rule_sets).run(workers=workers or DEFAULT_WORKERS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cek generated.jsonl (automation, semantic, score)")
+    parser.add_argument("names", nargs="*", help="rule set yang dijalankan (default: semua)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+    run_checks(args.names or None, workers=args.workers)
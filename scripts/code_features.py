@@ -0,0 +1,311 @@
+# code_features.py
+# Analisis sekali per script: AST di-parse satu kali dan hasilnya (import,
+# pemanggilan seperti `requests.post`, fungsi/kelas, string literal,
+# validitas sintaks) disimpan di cache. Checker semantik dan skor memakai
+# record ini, jadi teks di komentar/string tidak lagi dianggap kode.
+# Field hitungan skor juga diambil dari AST (SCORE_VERSION 2, lihat
+# score_checker): isi string/komentar tidak lagi ikut terhitung.
+import re
+import ast
+import functools
+
+FEATURE_CACHE_SIZE = 4096
+
+# Fallback untuk script yang tidak bisa di-parse: perilaku pencarian teks lama
+_IMPORT_RE = re.compile(r"^\s*(?:from\s+([\w.]+)\s+import|import\s+([\w., ]+))", re.MULTILINE)
+_CALL_RE = re.compile(r"([A-Za-z_][\w.]*)\s*\(")
+_DEF_RE = re.compile(r"^\s*(?:async\s+)?def\s+(\w+)", re.MULTILINE)
+_CLASS_RE = re.compile(r"^\s*class\s+(\w+)", re.MULTILINE)
+_COMMENT_RE = re.compile(r"^\s*#.*", re.MULTILINE)
+_KEYWORD_RE = re.compile(r"(\w+)=(?!=)")
+_LITERAL_RE = re.compile(r"[^a-zA-Z](\"[^\"]*\"|'[^']*'|\d+)")
+# Literal yang dihitung sebagai nilai hardcoded (bool/None/... tidak)
+_LITERAL_TYPES = (str, bytes, int, float, complex)
+
+
+def _dotted(node, aliases):
+    """Nama bertitik dari Name/Attribute dengan alias import di-resolve (`r.get` -> `requests.get`)."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Call):
+        # requests.Session().get -> requests.Session.get
+        inner = _dotted(node.func, aliases)
+        if inner is None:
+            return None
+        parts.append(inner)
+    elif isinstance(node, ast.Name):
+        parts.append(aliases.get(node.id, node.id))
+    else:
+        return None
+    return ".".join(reversed(parts))
+
+
+# Field yang tidak pernah berisi node menarik: ctx (Load/Store/Del), operator,
+# dan field yang selalu berisi teks/angka (nama, atribut, level import, ...)
+_SKIP_FIELDS = {
+    "ctx", "op", "ops", "type_comment",
+    "id", "name", "names", "arg", "attr", "module", "level", "kind", "conversion", "is_async", "simple",
+}
+# Node yang anaknya tidak perlu dijalani (handler membaca isinya langsung)
+_LEAF_NODES = {ast.Constant, ast.Import, ast.ImportFrom}
+_FIELDS = {cls: () for cls in _LEAF_NODES}
+
+
+class _Collector:
+    """Kumpulkan fitur dengan satu kali jalan ke semua node (lebih murah dari NodeVisitor rekursif)."""
+
+    def __init__(self):
+        self.imports = set()
+        self.aliases = {}
+        self.calls = set()
+        self.attributes = set()
+        self.functions = []
+        self.classes = []
+        self.keywords = set()
+        self.identifiers = set()
+        self.strings = []
+        self.has_pass = False
+        self.has_await = False
+        self.variables = 0  # nama yang di-assign (Name dengan ctx Store)
+        self.literals = 0
+        self.string_spans = []  # (baris awal, baris akhir) string multi-baris
+
+    def collect(self, tree):
+        # Seperti ast.walk tanpa turun ke node ctx/operator; import langsung diproses, handler
+        # lain ditunda agar alias sudah dikenal saat pemanggilan di-resolve
+        handlers = self.HANDLERS
+        fields_of = _FIELDS
+        identifiers = self.identifiers
+        name_cls = ast.Name
+        store_cls = ast.Store
+        later = []
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            cls = node.__class__
+            if cls is name_cls:
+                identifiers.add(node.id)
+                if node.ctx.__class__ is store_cls:
+                    self.variables += 1
+                continue  # anak Name hanya ctx
+            handler = handlers.get(cls)
+            if handler is not None:
+                if handler is _Collector._import:
+                    handler(self, node)
+                else:
+                    later.append((handler, node))
+            fields = fields_of.get(cls)
+            if fields is None:
+                fields = fields_of[cls] = tuple(f for f in cls._fields if f not in _SKIP_FIELDS)
+            for field in fields:
+                value = getattr(node, field, None)
+                if value.__class__ is list:
+                    stack.extend([item for item in value if isinstance(item, ast.AST)])
+                elif isinstance(value, ast.AST):
+                    stack.append(value)
+        for handler, node in later:
+            handler(self, node)
+
+    def _import(self, node):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                self.imports.add(alias.name)
+                self.identifiers.add(alias.name)
+                # `import a.b` mengikat nama `a`; `import a.b as c` mengikat `c` ke `a.b`
+                if alias.asname:
+                    self.aliases[alias.asname] = alias.name
+                    self.identifiers.add(alias.asname)
+            return
+        module = node.module or ""
+        if module:
+            self.imports.add(module)
+            self.identifiers.add(module)
+        for alias in node.names:
+            bound = alias.asname or alias.name
+            self.aliases[bound] = f"{module}.{alias.name}" if module else alias.name
+            self.identifiers.add(alias.name)
+            self.identifiers.add(bound)
+
+    def _call(self, node):
+        name = _dotted(node.func, self.aliases)
+        if name:
+            self.calls.add(name)
+        for keyword in node.keywords:
+            if keyword.arg:
+                self.keywords.add(keyword.arg)
+                self.identifiers.add(keyword.arg)
+
+    def _attribute(self, node):
+        name = _dotted(node, self.aliases)
+        if name:
+            self.attributes.add(name)
+        self.identifiers.add(node.attr)
+
+    def _function(self, node):
+        self.functions.append(node.name)
+        self.identifiers.add(node.name)
+        for arg in node.args.args + node.args.kwonlyargs:
+            self.identifiers.add(arg.arg)
+
+    def _class(self, node):
+        self.classes.append(node.name)
+        self.identifiers.add(node.name)
+
+    def _constant(self, node):
+        value_cls = node.value.__class__
+        if value_cls is str:
+            self.strings.append(node.value)
+            if node.end_lineno != node.lineno:
+                self.string_spans.append((node.lineno, node.end_lineno))
+        if value_cls in _LITERAL_TYPES:
+            self.literals += 1
+
+    def _pass(self, node):
+        self.has_pass = True
+
+    def _await(self, node):
+        self.has_await = True
+
+    HANDLERS = {
+        ast.Import: _import,
+        ast.ImportFrom: _import,
+        ast.Call: _call,
+        ast.Attribute: _attribute,
+        ast.FunctionDef: _function,
+        ast.AsyncFunctionDef: _function,
+        ast.ClassDef: _class,
+        ast.Constant: _constant,
+        ast.Pass: _pass,
+        ast.Await: _await,
+    }
+
+
+def _comment_count(code, string_spans):
+    """Baris yang isinya hanya komentar; baris di dalam string multi-baris tidak dihitung."""
+    if "#" not in code:
+        return 0
+    if not string_spans:
+        return len(_COMMENT_RE.findall(code))
+    count = 0
+    line = 1
+    pos = 0
+    for match in _COMMENT_RE.finditer(code):
+        line += code.count("\n", pos, match.start())
+        pos = match.start()
+        # _COMMENT_RE bisa mulai di baris kosong sebelumnya (\s* melewati \n)
+        lineno = line + code.count("\n", pos, match.end())
+        if not any(start < lineno <= end for start, end in string_spans):
+            count += 1
+    return count
+
+
+def _record(code, **fields):
+    record = {
+        "line_count": len(code.splitlines()),
+        "starts_with_import": code.startswith("import"),
+    }
+    record.update(fields)
+    record["call_prefixes"] = frozenset(
+        name.split(".")[0] + "." for name in record["calls"] | record["attributes"] if "." in name
+    )
+    record["identifier_text"] = " ".join(sorted(record["identifiers"])).lower()
+    record["strings_text"] = "\n".join(record["strings"])
+    return record
+
+
+def _fallback(code):
+    imports = set()
+    for from_module, modules in _IMPORT_RE.findall(code):
+        if from_module:
+            imports.add(from_module)
+        else:
+            imports.update(m.strip().split(" ")[0] for m in modules.split(",") if m.strip())
+    calls = set(_CALL_RE.findall(code))
+    functions = tuple(_DEF_RE.findall(code))
+    classes = tuple(_CLASS_RE.findall(code))
+    keywords = _KEYWORD_RE.findall(code)
+    return _record(
+        code,
+        syntax_valid=False,
+        # Tanpa AST, hitungan skor dari hasil regex yang sudah ada
+        function_count=len(functions),
+        class_count=len(classes),
+        comment_count=len(_COMMENT_RE.findall(code)),
+        variable_count=len(keywords),
+        hardcoded_values=len(_LITERAL_RE.findall(code)),
+        imports=frozenset(imports),
+        calls=frozenset(calls),
+        attributes=frozenset(calls),
+        functions=functions,
+        classes=classes,
+        keywords=frozenset(keywords),
+        # Tanpa AST, seluruh teks dianggap identifier dan string (perilaku lama)
+        identifiers=frozenset([code]),
+        strings=(code,),
+        has_pass="pass" in code,
+        has_await="await" in code,
+    )
+
+
+def extract_features(code):
+    """Record fitur (dict, jangan diubah) untuk satu script; hasil di-cache per isi kode."""
+    return _extract(code)
+
+
+@functools.lru_cache(maxsize=FEATURE_CACHE_SIZE)
+def _extract(raw):
+    code = raw.strip()
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return _fallback(code)
+
+    try:
+        # compile juga menolak yang lolos parse, mis. `return` di luar fungsi.
+        # syntax_valid mengikuti teks mentah seperti analyze_code lama: baris
+        # pertama yang menjorok tetap dianggap tidak valid
+        if raw[:1].isspace():
+            compile(raw, "<string>", "exec")
+        else:
+            compile(tree, "<string>", "exec")
+        syntax_valid = True
+    except (SyntaxError, ValueError):
+        syntax_valid = False
+
+    collector = _Collector()
+    collector.collect(tree)
+    return _record(
+        code,
+        syntax_valid=syntax_valid,
+        function_count=len(collector.functions),
+        class_count=len(collector.classes),
+        comment_count=_comment_count(code, collector.string_spans),
+        variable_count=collector.variables,
+        hardcoded_values=collector.literals,
+        imports=frozenset(collector.imports),
+        calls=frozenset(collector.calls),
+        attributes=frozenset(collector.attributes),
+        functions=tuple(collector.functions),
+        classes=tuple(collector.classes),
+        keywords=frozenset(collector.keywords),
+        identifiers=frozenset(collector.identifiers),
+        strings=tuple(collector.strings),
+        has_pass=collector.has_pass,
+        has_await=collector.has_await,
+    )
+
+
+extract_features.cache_clear = _extract.cache_clear
+extract_features.cache_info = _extract.cache_info
+
+
+def uses_module(features, module):
+    """True jika `module` (atau submodulnya) diimpor."""
+    return any(name == module or name.startswith(module + ".") for name in features["imports"])
+
+
+def calls_any(features, names):
+    """True jika salah satu nama bertitik di `names` dipanggil (mis. `requests.post`)."""
+    return any(name in features["calls"] for name in names)
@@ -1,46 +1,303 @@
-import json
+# deduplicate_generated.py
+# Buang duplikat dan near-duplicate dari generated.jsonl. Tiap sample diubah
+# jadi token yang dinormalisasi (spasi & komentar hilang, nama variabel
+# diganti urutan kemunculannya, angka/placeholder diseragamkan), lalu dibuat
+# signature MinHash (one-permutation hashing) dari shingle token. Band LSH
+# mencari kandidat di antara sample sebelumnya, lalu kandidat diverifikasi
+# dengan perkiraan Jaccard dari signature. Per sample unik hanya disimpan
+# hash berukuran tetap (signature 128 byte + kunci band, bukan teks utuh);
+# file dibaca streaming dan ditulis ulang secara atomik (file sementara + rename).
 import os
+import re
+import sys
+import json
+import zlib
+import keyword
+import functools
+import argparse
+import builtins
+from array import array
 
 GENERATED_PATH = "data/generated.jsonl"
+SIMILARITY_THRESHOLD = 0.8  # Jaccard minimum untuk dianggap near-duplicate
+NUM_BINS = 64  # panjang signature MinHash
+SHINGLE_SIZE = 5  # token per shingle
+STRING_CACHE_SIZE = 65536  # string literal yang sering berulang (header, URL) dinormalisasi sekali
+
+_MASK = (1 << 64) - 1
+_BIN_BITS = 6  # log2(NUM_BINS): bit terbawah hash menentukan bin
+_BIN_MASK = NUM_BINS - 1
+_MIX = 0x9E3779B97F4A7C15
+_SIGNATURE_BITS = 0xFFFF  # signature disimpan 16 bit per bin untuk verifikasi kandidat
+
+_TOKEN_RE = re.compile(
+    r'''[rbfuRBFU]{0,2}(?:"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')'''
+    r"|#[^\n]*|\d[\w.]*|[A-Za-z_]\w*|[^\s\w]"
+)
+_IMPORT_RE = re.compile(r"^\s*(?:from\s+[\w.]+\s+)?import\s+.+$", re.MULTILINE)
+_WORD_RE = re.compile(r"[a-z_]\w*|\d+|[^\s\w]", re.IGNORECASE)
+# Placeholder di string: <TOKEN>, {id}, YOUR_API_KEY, 0xABC..., angka
+_PLACEHOLDER_RE = re.compile(r"<[^<>]*>|\{[^{}]*\}|\byour_\w+|\b0x[0-9a-f]+|\d+")
+_KEEP_NAMES = set(keyword.kwlist) | set(dir(builtins)) | {"self", "cls"}
+
+
+@functools.lru_cache(maxsize=STRING_CACHE_SIZE)
+def _normalize_string(token):
+    return "s:" + _PLACEHOLDER_RE.sub("_", token.lstrip("rbfuRBFU").strip("'\"").lower())
+
+
+def normalize_code(code):
+    """Token kode yang tidak peduli spasi, komentar, nama variabel, dan placeholder."""
+    # Nama modul/objek hasil import tetap dipertahankan (requests, web3, ...)
+    imported = set()
+    for line in _IMPORT_RE.findall(code):
+        imported.update(re.findall(r"[A-Za-z_]\w*", line))
+
+    raw = [token for token in _TOKEN_RE.findall(code) if token[0] != "#"]
+    tokens = []
+    renamed = {}
+    depth = 0
+    for i, token in enumerate(raw):
+        first = token[0]
+        if first.isdigit():
+            token = "0"
+        elif first in ("'", '"') or (first in "rbfuRBFU" and token[-1] in ("'", '"')):
+            token = _normalize_string(token)
+        elif first.isalpha() or first == "_":
+            keep = (
+                token in _KEEP_NAMES
+                or token in imported
+                or (i and raw[i - 1] == ".")  # atribut: requests.get, driver.find_element
+                or (depth and raw[i + 1:i + 2] == ["="] and raw[i + 2:i + 3] != ["="])  # argumen keyword
+            )
+            if not keep:
+                token = renamed.setdefault(token, f"v{len(renamed)}")
+        elif first in "([{":
+            depth += 1
+        elif first in ")]}":
+            depth = max(0, depth - 1)
+        tokens.append(token)
+    return tokens
+
+
+@functools.lru_cache(maxsize=STRING_CACHE_SIZE)
+def normalize_text(text):
+    # Instruksi/input sering sama persis antar sample: hasilnya di-cache
+    return _WORD_RE.findall(_PLACEHOLDER_RE.sub("0", text.lower()))
+
+
+def sample_tokens(sample):
+    # Instruksi/input ikut dihitung: kode sama untuk tugas berbeda bukan duplikat
+    return (
+        normalize_text(sample.get("instruction", ""))
+        + ["\x00"]
+        + normalize_text(sample.get("input", ""))
+        + ["\x00"]
+        + normalize_code(sample.get("output", ""))
+    )
+
+
+def _hash64(text):
+    data = text.encode("utf-8")
+    value = zlib.crc32(data) | (zlib.crc32(data, 0x5BD1E995) << 32)
+    return (value * _MIX) & _MASK
+
+
+def minhash(tokens, shingle_size=SHINGLE_SIZE):
+    """Signature MinHash NUM_BINS nilai dengan satu hash per shingle (one-permutation hashing).
+
+    Bin kosong diisi dari bin terisi berikutnya (densifikasi rotasi) agar
+    peluang dua signature sama per bin tetap ≈ Jaccard.
+    """
+    # Satu crc32 per token; hash shingle = hash tuple id token (deterministik untuk int)
+    ids = list(map(zlib.crc32, map(str.encode, tokens)))
+    shingles = zip(*(ids[i:] for i in range(shingle_size))) if len(ids) >= shingle_size else [tuple(ids)]
+    # Bin = bit terbawah, nilai = sisanya. Diurutkan turun lalu dimasukkan ke dict:
+    # yang terakhir ditulis per bin adalah nilai terkecil (semua di level C)
+    hashes = sorted(map(_MASK.__and__, map(_MIX.__mul__, map(hash, shingles))), reverse=True)
+    minimum = dict(zip(map(_BIN_MASK.__and__, hashes), map(_BIN_BITS.__rrshift__, hashes)))
+    signature = [minimum.get(index) for index in range(NUM_BINS)]
+    filled = list(signature)
+    for index in range(NUM_BINS):
+        if filled[index] is None:
+            for distance in range(1, NUM_BINS):
+                donor = filled[(index + distance) % NUM_BINS]
+                if donor is not None:
+                    # Offset per jarak: nilai pinjaman tidak pernah sama dengan nilai asli
+                    signature[index] = donor + (distance << (64 - _BIN_BITS))
+                    break
+    return signature
+
+
+def choose_bands(threshold, num_bins=NUM_BINS, false_negative_weight=0.8):
+    """(band, baris per band) dengan error tertimbang terkecil di sekitar threshold.
 
-def remove_duplicates_from_generated():
-    if not os.path.exists(GENERATED_PATH):
+    Kandidat selalu diverifikasi, jadi false negative (duplikat lolos) diberi
+    bobot lebih besar dari false positive (kandidat ekstra yang dicek).
+    """
+    def area(f, lo, hi, steps=200):
+        width = (hi - lo) / steps
+        return sum(f(lo + (i + 0.5) * width) for i in range(steps)) * width
+
+    best = None
+    for rows in range(1, num_bins + 1):
+        bands = num_bins // rows
+        false_pos = area(lambda s: 1 - (1 - s ** rows) ** bands, 0.0, threshold)
+        false_neg = area(lambda s: (1 - s ** rows) ** bands, threshold, 1.0)
+        error = (1 - false_negative_weight) * false_pos + false_negative_weight * false_neg
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+def band_keys(signature, bands, rows):
+    return [hash((band, *signature[band * rows:(band + 1) * rows])) & _MASK or 1 for band in range(bands)]
+
+
+class HashMap64:
+    """Map hash 64-bit -> nomor record dengan open addressing di array (±24 byte per entri, load ≤ 0.5)."""
+
+    def __init__(self, capacity=1 << 16):
+        self.keys = array("Q", bytes(8 * capacity))
+        self.values = array("I", bytes(4 * capacity))
+        self.mask = capacity - 1
+        self.size = 0
+
+    def get(self, key, default=None):
+        keys, mask = self.keys, self.mask
+        i = key & mask
+        while True:
+            slot = keys[i]
+            if slot == key:
+                return self.values[i]
+            if slot == 0:
+                return default
+            i = (i + 1) & mask
+
+    def setdefault(self, key, value):
+        """Simpan `value` untuk `key` (bukan 0) jika belum ada; kembalikan nilai yang tersimpan."""
+        if (self.size + 1) * 2 > len(self.keys):
+            self._grow()
+        keys, mask = self.keys, self.mask
+        i = key & mask
+        while True:
+            slot = keys[i]
+            if slot == key:
+                return self.values[i]
+            if slot == 0:
+                keys[i] = key
+                self.values[i] = value
+                self.size += 1
+                return value
+            i = (i + 1) & mask
+
+    def _grow(self):
+        old_keys, old_values = self.keys, self.values
+        self.keys = array("Q", bytes(16 * len(old_keys)))
+        self.values = array("I", bytes(8 * len(old_keys)))
+        self.mask = len(self.keys) - 1
+        self.size = 0
+        for key, value in zip(old_keys, old_values):
+            if key:
+                self.setdefault(key, value)
+
+    def nbytes(self):
+        return len(self.keys) * (self.keys.itemsize + self.values.itemsize)
+
+
+class Deduplicator:
+    """Cek sample satu per satu: 'exact', 'near', atau None (baru, lalu diingat)."""
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, shingle_size=SHINGLE_SIZE):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.bands, self.rows = choose_bands(threshold)
+        self.exact = HashMap64()
+        self.buckets = HashMap64()  # kunci band -> record pertama dengan band itu
+        self.signatures = array("H")  # NUM_BINS nilai per record unik
+        self.count = 0
+
+    def similarity(self, signature, record):
+        """Perkiraan Jaccard dengan record tersimpan: porsi bin yang sama."""
+        stored = self.signatures[record * NUM_BINS:(record + 1) * NUM_BINS]
+        return sum(a == b for a, b in zip(signature, stored)) / NUM_BINS
+
+    def check(self, sample):
+        tokens = sample_tokens(sample)
+        exact_key = _hash64("\x01".join(tokens)) or 1
+        if self.exact.get(exact_key) is not None:
+            return "exact"
+        signature = [value & _SIGNATURE_BITS for value in minhash(tokens, self.shingle_size)]
+        keys = band_keys(signature, self.bands, self.rows)
+        checked = set()
+        for key in keys:
+            record = self.buckets.get(key)
+            if record is None or record in checked:
+                continue
+            checked.add(record)
+            if self.similarity(signature, record) >= self.threshold:
+                return "near"
+
+        record = self.count
+        self.count += 1
+        self.exact.setdefault(exact_key, record)
+        for key in keys:
+            self.buckets.setdefault(key, record)
+        self.signatures.extend(signature)
+        return None
+
+    def nbytes(self):
+        return self.exact.nbytes() + self.buckets.nbytes() + len(self.signatures) * self.signatures.itemsize
+
+
+def remove_duplicates_from_generated(path=GENERATED_PATH, threshold=SIMILARITY_THRESHOLD):
+    if not os.path.exists(path):
         print("❌ File generated.jsonl tidak ditemukan.")
-        return
+        return None
 
-    seen = set()
-    unique_samples = []
-    total = 0
-    duplicate_count = 0
+    dedup = Deduplicator(threshold)
+    stats = {"total": 0, "unique": 0, "exact": 0, "near": 0, "invalid": 0}
+    tmp = path + ".dedup.tmp"
 
-    with open(GENERATED_PATH, "r", encoding="utf-8") as f:
-        for line in f:
-            total += 1
+    # Baris unik disalin apa adanya ke file sementara; file asli baru diganti setelah selesai
+    with open(path, "rb") as src, open(tmp, "wb") as dst:
+        for line in src:
+            if not line.strip():
+                continue
+            stats["total"] += 1
             try:
                 sample = json.loads(line)
-                key = (
-    sample.get("instruction", "").strip()
-    + sample.get("input", "").strip()
-    + sample.get("output", "").strip()
-    )
-
-                if key not in seen:
-                    seen.add(key)
-                    unique_samples.append(sample)
-                else:
-                    duplicate_count += 1
-            except Exception as e:
-                print(f"⚠️ Gagal parse JSONL: {e}")
+            except json.JSONDecodeError as e:
+                stats["invalid"] += 1
+                if stats["invalid"] <= 5:
+                    print(f"⚠️ Gagal parse JSONL: {e}")
+                continue
+            duplicate = dedup.check(sample) if isinstance(sample, dict) else None
+            if duplicate:
+                stats[duplicate] += 1
+                continue
+            stats["unique"] += 1
+            dst.write(line if line.endswith(b"\n") else line + b"\n")
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.replace(tmp, path)
 
-    # Tulis ulang hanya yang unik ke file yang sama
-    with open(GENERATED_PATH, "w", encoding="utf-8") as f:
-        for sample in unique_samples:
-            f.write(json.dumps(sample, ensure_ascii=False) + "\n")
+    print(f"✅ Duplikasi dibersihkan (Jaccard ≥ {threshold}, {dedup.bands} band x {dedup.rows} baris).")
+    print(f"   - Total entri dibaca  : {stats['total']}")
+    print(f"   - Tersisa unik        : {stats['unique']}")
+    print(f"   - Duplikat persis     : {stats['exact']}")
+    print(f"   - Near-duplicate      : {stats['near']}")
+    if stats["invalid"]:
+        print(f"   - JSON rusak dibuang  : {stats['invalid']}")
+    print(f"   - Memori index hash   : {dedup.nbytes() / 1e6:.1f} MB")
+    return stats
 
-    print("✅ Duplikasi dibersihkan.")
-    print(f"   - Total entri dibaca  : {total}")
-    print(f"   - Tersisa unik        : {len(unique_samples)}")
-    print(f"   - Duplikat dibuang    : {duplicate_count}")
 
 if __name__ == "__main__":
-    remove_duplicates_from_generated()
+    parser = argparse.ArgumentParser(description="Buang duplikat & near-duplicate dari generated.jsonl")
+    parser.add_argument("--path", default=GENERATED_PATH)
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD)
+    args = parser.parse_args()
+    if not 0 < args.threshold <= 1:
+        sys.exit("❌ --threshold harus di antara 0 dan 1")
+    remove_duplicates_from_generated(args.path, args.threshold)
@@ -1,10 +1,204 @@
 # evaluator.py
+import ast
+import functools
+import importlib.machinery
 import subprocess
 import tempfile
+import threading
+import itertools
+import json
 import uuid
+import signal
+import sys
 import os
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+DEFAULT_WORKERS = os.cpu_count() or 4
+
+# "subprocess": python baru per script (lama); "fork": anak dari fork server yang sudah hangat
+EVAL_MODES = ("subprocess", "fork")
+EVAL_MODE = os.environ.get("TRAIN_AI_EVAL_MODE", "subprocess")
+FORK_SERVER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fork_server.py")
+OFFLINE_HTTP = os.environ.get("TRAIN_AI_OFFLINE_HTTP", "0") == "1"  # arahkan HTTP script ke mock lokal
+OFFLINE_SITE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "offline_site")
+USE_STATIC_GATE = True  # tolak SyntaxError / modul hilang sebelum menjalankan proses
+
+_static_stats = {"checked": 0, "rejected": 0, "syntax": 0, "missing_module": 0}
+_static_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _child_sys_path():
+    """sys.path yang dilihat script anak (tanpa folder script-nya sendiri).
+
+    sys.path proses ini berisi folder repo dan scripts/, yang tidak ada di
+    proses anak; jadi path dibaca langsung dari interpreter anak.
+    """
+    try:
+        out = subprocess.run(
+            [sys.executable, "-c", "import sys, json; print(json.dumps(sys.path[1:]))"],
+            capture_output=True, text=True, timeout=30, check=True,
+        ).stdout
+        return tuple(json.loads(out))
+    except (OSError, subprocess.SubprocessError, ValueError):
+        local = {os.path.dirname(os.path.abspath(__file__)), os.path.dirname(os.path.dirname(os.path.abspath(__file__)))}
+        return tuple(p for p in sys.path[1:] if p and os.path.abspath(p) not in local)
+
+
+@functools.lru_cache(maxsize=None)
+def module_available(name):
+    """Apakah `import name` berhasil di proses anak (bukan di proses ini)."""
+    if name in sys.builtin_module_names:
+        return True
+    try:
+        return (
+            importlib.machinery.FrozenImporter.find_spec(name) is not None
+            or importlib.machinery.PathFinder.find_spec(name, list(_child_sys_path())) is not None
+        )
+    except (ImportError, ValueError):
+        return False
+
+
+def _top_level_imports(tree):
+    # Hanya import di level modul (bukan di dalam try/if), karena itu pasti dieksekusi
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name.split(".")[0], node.lineno
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            yield node.module.split(".")[0], node.lineno
+
+
+def static_check(script_code):
+    """Cek statis sebelum eksekusi. Kembalikan dict hasil jika pasti gagal, None jika lolos."""
+    error_type = stderr = None
+    try:
+        tree = ast.parse(script_code, filename="script.py")
+    except SyntaxError as e:
+        error_type = "syntax"
+        text = (e.text or "").rstrip()
+        stderr = f'  File "script.py", line {e.lineno}\n    {text.strip()}\nSyntaxError: {e.msg}\n'
+    else:
+        for name, lineno in _top_level_imports(tree):
+            if not module_available(name):
+                error_type = "missing_module"
+                stderr = (
+                    f'  File "script.py", line {lineno}, in <module>\n'
+                    f"ModuleNotFoundError: No module named '{name}'\n"
+                )
+                break
+
+    with _static_lock:
+        _static_stats["checked"] += 1
+        if error_type:
+            _static_stats["rejected"] += 1
+            _static_stats[error_type] += 1
+
+    if error_type is None:
+        return None
+    return {
+        "success": False,
+        "stdout": "",
+        "stderr": stderr,
+        "error_type": error_type,
+        "stage": "static",
+    }
+
+
+def static_gate_stats():
+    """Statistik gate statis; `rejected` = jumlah proses yang tidak perlu dijalankan."""
+    with _static_lock:
+        return dict(_static_stats)
+
+def offline_env(mock_url, session_id):
+    """Variabel env yang membuat sitecustomize offline mengarahkan HTTP ke mock."""
+    pythonpath = os.environ.get("PYTHONPATH")
+    return {
+        "TRAIN_AI_MOCK_URL": mock_url,
+        "TRAIN_AI_MOCK_SESSION": session_id,
+        "NO_PROXY": "127.0.0.1,localhost",
+        "no_proxy": "127.0.0.1,localhost",
+        "PYTHONPATH": OFFLINE_SITE_DIR + (os.pathsep + pythonpath if pythonpath else ""),
+    }
+
+
+class CancelToken:
+    """Pegangan untuk mematikan satu evaluasi yang sedang berjalan.
+
+    Runner memasang fungsi `kill` untuk prosesnya lewat `attach`; `cancel`
+    memanggilnya (atau langsung saat attach jika sudah dibatalkan lebih dulu).
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self._kill = None
+        self._lock = threading.Lock()
+
+    def attach(self, kill):
+        with self._lock:
+            self._kill = kill
+            cancelled = self.cancelled
+        if cancelled:
+            kill()
+
+    def detach(self):
+        with self._lock:
+            self._kill = None
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            kill = self._kill
+        if kill is not None:
+            kill()
+
+
+def cancelled_result():
+    return {"success": False, "stdout": "", "stderr": "Script execution cancelled.", "error_type": "cancelled"}
+
+
+def _killpg(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def evaluate_script(script_code: str, timeout=10, mode=None, static_gate=None,
+                    sample=None, offline_http=None, cancel=None) -> dict:
+    if USE_STATIC_GATE if static_gate is None else static_gate:
+        rejected = static_check(script_code)
+        if rejected is not None:
+            return rejected
+
+    mode = mode or EVAL_MODE
+    if mode not in EVAL_MODES:
+        raise ValueError(f"Mode evaluasi tidak dikenal: {mode} (pilih salah satu dari {EVAL_MODES})")
+
+    if cancel is not None and cancel.cancelled:
+        return cancelled_result()
+
+    if not (OFFLINE_HTTP if offline_http is None else offline_http):
+        return _run_script(script_code, timeout, mode, cancel=cancel)
+
+    # Mode offline: satu sesi mock per evaluasi, dijawab sesuai request di input sample
+    from http_mock import get_mock_server, parse_har_input
+
+    server = get_mock_server()
+    expected = parse_har_input(sample.get("input", "")) if sample else []
+    session_id = server.open_session(expected)
+    try:
+        result = _run_script(script_code, timeout, mode, env=offline_env(server.url, session_id), cancel=cancel)
+    finally:
+        session = server.close_session(session_id)
+    result.update(session.summary())
+    return result
+
+
+def _run_script(script_code, timeout, mode, env=None, cancel=None):
+    if mode == "fork":
+        return get_fork_server().evaluate(script_code, timeout, env, cancel=cancel)
 
-def evaluate_script(script_code: str, timeout=10) -> dict:
     result = {
         "success": False,
         "stdout": "",
@@ -17,22 +211,202 @@ def evaluate_script(script_code: str, timeout=10) -> dict:
         tmp_path = tmp.name
 
     try:
-        # Jalankan script Python
-        proc = subprocess.run(
-            ["python", tmp_path],
-            capture_output=True,
+        # Jalankan script Python (grup proses sendiri agar bisa dimatikan bersama anaknya)
+        proc = subprocess.Popen(
+            [sys.executable, tmp_path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
-            timeout=timeout
+            env={**os.environ, **env} if env else None,
+            start_new_session=True,
         )
-        result["success"] = proc.returncode == 0
-        result["stdout"] = proc.stdout
-        result["stderr"] = proc.stderr
-    except subprocess.TimeoutExpired:
-        result["stderr"] = "Script execution timed out."
+        if cancel is not None:
+            cancel.attach(lambda: _killpg(proc))
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _killpg(proc)
+            proc.communicate()
+            result["stderr"] = "Script execution timed out."
+        else:
+            result["success"] = proc.returncode == 0
+            result["stdout"] = stdout
+            result["stderr"] = stderr
     except Exception as e:
         result["stderr"] = f"Unexpected error: {str(e)}"
     finally:
+        if cancel is not None:
+            cancel.detach()
         # Hapus file sementara
         os.remove(tmp_path)
 
+    if cancel is not None and cancel.cancelled:
+        return cancelled_result()
     return result
+
+
+class ForkServerEvaluator:
+    """Klien untuk fork_server.py: satu proses induk hangat, satu fork per script.
+
+    Script dikirim lewat pipe (tanpa file sementara) dan boleh berjalan
+    bersamaan; hasil dicocokkan ke Future berdasarkan id request.
+    """
+
+    def __init__(self):
+        self.proc = subprocess.Popen(
+            [sys.executable, FORK_SERVER_PATH],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+        )
+        ready = json.loads(self.proc.stdout.readline() or "{}")
+        if not ready.get("ready"):
+            raise RuntimeError("Fork server gagal dijalankan")
+        self.preloaded = ready.get("preloaded", [])
+        self._ids = itertools.count()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_results, daemon=True)
+        self._reader.start()
+
+    def _read_results(self):
+        for line in self.proc.stdout:
+            result = json.loads(line)
+            with self._lock:
+                future = self._pending.pop(result.pop("id"), None)
+            if future is not None:
+                future.set_result(result)
+        # Fork server mati: gagalkan semua yang masih menunggu
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(RuntimeError("Fork server berhenti"))
+
+    def submit(self, script_code, timeout=10, env=None, cancel=None):
+        future = Future()
+        request_id = next(self._ids)
+        line = json.dumps({"id": request_id, "code": script_code, "timeout": timeout, "env": env or {}})
+        with self._lock:
+            if self.proc.poll() is not None:
+                raise RuntimeError("Fork server berhenti")
+            self._pending[request_id] = future
+            self.proc.stdin.write(line + "\n")
+            self.proc.stdin.flush()
+        if cancel is not None:
+            cancel.attach(lambda: self.cancel(request_id))
+        return future
+
+    def cancel(self, request_id):
+        """Minta server mematikan grup proses anak request ini; hasilnya tetap dikirim."""
+        with self._lock:
+            if request_id not in self._pending or self.proc.poll() is not None:
+                return
+            try:
+                self.proc.stdin.write(json.dumps({"cancel": request_id}) + "\n")
+                self.proc.stdin.flush()
+            except (BrokenPipeError, ValueError):
+                pass
+
+    def evaluate(self, script_code, timeout=10, env=None, cancel=None):
+        try:
+            # Batas waktu di sisi server; beri kelonggaran untuk komunikasi
+            raw = self.submit(script_code, timeout, env, cancel=cancel).result(timeout + 5)
+        except Exception as e:
+            return {"success": False, "stdout": "", "stderr": f"Unexpected error: {str(e)}"}
+        finally:
+            if cancel is not None:
+                cancel.detach()
+        if cancel is not None and cancel.cancelled:
+            return cancelled_result()
+        return {"success": raw["success"], "stdout": raw["stdout"], "stderr": raw["stderr"]}
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.proc.stdin.close()
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+
+_fork_server = None
+_fork_server_lock = threading.Lock()
+
+
+def get_fork_server():
+    global _fork_server
+    with _fork_server_lock:
+        if _fork_server is None or _fork_server.proc.poll() is not None:
+            _fork_server = ForkServerEvaluator()
+        return _fork_server
+
+
+class EvaluatorPool:
+    """Menjalankan beberapa evaluate_script sekaligus dengan konkurensi terbatas.
+
+    Tiap eksekusi tetap subprocess terpisah, jadi thread cukup untuk
+    menunggu hasilnya. `submit` memblok jika sudah ada `max_pending` script
+    yang antre atau berjalan, supaya generator tidak menumpuk pekerjaan.
+    `cancel(future)` membatalkan script yang belum jalan atau mematikan
+    proses yang sedang berjalan.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, timeout=10, max_pending=None, mode=None):
+        self.workers = workers
+        self.timeout = timeout
+        self.mode = mode
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="evaluator")
+        self._slots = threading.BoundedSemaphore(max_pending or workers * 2)
+        self._tokens = {}
+        self._tokens_lock = threading.Lock()
+
+    def submit(self, script_code, sample=None):
+        self._slots.acquire()
+        token = CancelToken()
+        future = self._executor.submit(
+            evaluate_script, script_code, self.timeout, self.mode, sample=sample, cancel=token
+        )
+        with self._tokens_lock:
+            self._tokens[future] = token
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        with self._tokens_lock:
+            self._tokens.pop(future, None)
+        self._slots.release()
+
+    def cancel(self, future):
+        """Batalkan satu submission. True jika belum selesai saat dibatalkan."""
+        if future.cancel():
+            return True
+        with self._tokens_lock:
+            token = self._tokens.get(future)
+        if token is None:
+            return False
+        token.cancel()
+        return True
+
+    def imap_unordered(self, scripts):
+        """Yield (index, result) sesuai urutan selesai."""
+        futures = {}
+        for i, code in enumerate(scripts):
+            futures[self.submit(code)] = i
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+    def map(self, scripts):
+        results = [None] * len(scripts)
+        for i, result in self.imap_unordered(scripts):
+            results[i] = result
+        return results
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
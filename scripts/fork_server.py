@@ -0,0 +1,271 @@
+# fork_server.py
+# Proses induk yang sudah mengimpor modul umum (requests, aiohttp, ...) lalu
+# mem-fork satu anak bersih per script. Protokol: satu JSON per baris lewat
+# stdin (request) dan stdout (hasil); {"cancel": id} mematikan job yang masih
+# berjalan. Dijalankan oleh evaluator.ForkServerEvaluator.
+import sys
+import os
+import json
+import time
+import random
+import signal
+import builtins
+import importlib
+import importlib.util
+import selectors
+import traceback
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+COMMON_MODULES = ["json", "re", "time", "random", "asyncio", "base64", "hashlib", "datetime", "urllib.request"]
+MAX_OUTPUT_BYTES = 1024 * 1024  # potong stdout/stderr yang terlalu besar
+SCRIPT_FILENAME = "script.py"
+POLL_INTERVAL = 0.002
+OFFLINE_SHIM_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "offline_site", "sitecustomize.py")
+
+
+def preload_modules():
+    from semantic_checker_automation import automation_keywords
+
+    loaded = []
+    for name in COMMON_MODULES + automation_keywords:
+        try:
+            if importlib.util.find_spec(name) is None:
+                continue
+            importlib.import_module(name)
+            loaded.append(name)
+        except Exception:
+            continue  # modul rusak / bukan modul (mis. "claim") diabaikan
+    return loaded
+
+
+def install_offline_shim():
+    # Sama dengan sitecustomize pada mode subprocess, tapi modul sudah terimpor
+    spec = importlib.util.spec_from_file_location("offline_http_shim", OFFLINE_SHIM_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+
+def reseed_child():
+    # Anak fork mewarisi state PRNG server: tanpa reseed semua script mendapat
+    # angka acak yang sama, beda dengan `python script.py` di mode subprocess.
+    # `random` global sudah di-reseed CPython saat fork; numpy (bila ikut
+    # terimpor oleh modul preload) tidak
+    random.seed()
+    numpy = sys.modules.get("numpy")
+    if numpy is not None:
+        numpy.random.seed()
+
+
+def run_child(code, env):
+    """Dijalankan di proses anak; tidak pernah kembali."""
+    status = 0
+    try:
+        os.environ.update(env)
+        if env.get("TRAIN_AI_MOCK_URL"):
+            install_offline_shim()
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        sys.argv = [SCRIPT_FILENAME]
+        globals_ = {"__name__": "__main__", "__file__": SCRIPT_FILENAME, "__builtins__": builtins}
+        exec(compile(code, SCRIPT_FILENAME, "exec"), globals_)
+    except SystemExit as e:
+        if e.code is None:
+            status = 0
+        elif isinstance(e.code, int):
+            status = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            status = 1
+    except BaseException:
+        # Lewati frame run_child supaya traceback sama seperti `python script.py`
+        etype, value, tb = sys.exc_info()
+        traceback.print_exception(etype, value, tb.tb_next)
+        status = 1
+
+    # Tiru shutdown interpreter: tunggu thread non-daemon dan jalankan atexit
+    try:
+        import threading
+        threading._shutdown()
+        import atexit
+        atexit._run_exitfuncs()
+    except BaseException:
+        traceback.print_exc()
+        status = status or 1
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(status & 0xFF)
+
+
+class Job:
+    def __init__(self, request_id, pid, out_fd, err_fd, timeout):
+        self.id = request_id
+        self.pid = pid
+        self.started = time.perf_counter()
+        self.deadline = self.started + timeout
+        self.buffers = {out_fd: bytearray(), err_fd: bytearray()}
+        self.out_fd = out_fd
+        self.err_fd = err_fd
+        self.open_fds = {out_fd, err_fd}
+        self.timed_out = False
+        self.cancelled = False
+        self.status = None
+
+
+class ForkServer:
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self.jobs = {}  # pid -> Job
+        self.fd_jobs = {}  # fd pipe -> Job
+        self.stdin_buffer = b""
+        self.running = True
+
+    def send(self, payload):
+        try:
+            sys.stdout.write(json.dumps(payload, ensure_ascii=False) + "\n")
+            sys.stdout.flush()
+        except BrokenPipeError:
+            self.running = False  # klien sudah pergi
+
+    def start_job(self, request):
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                reseed_child()
+                os.setpgid(0, 0)
+                devnull = os.open(os.devnull, os.O_RDONLY)
+                os.dup2(devnull, 0)
+                os.dup2(out_w, 1)
+                os.dup2(err_w, 2)
+                # Tutup fd protokol & pipe milik job lain agar EOF terdeteksi benar
+                os.closerange(3, 65536)
+            except BaseException:
+                os._exit(70)
+            run_child(request["code"], request.get("env") or {})
+
+        os.close(out_w)
+        os.close(err_w)
+        job = Job(request["id"], pid, out_r, err_r, float(request.get("timeout", 10)))
+        self.jobs[pid] = job
+        for fd in (out_r, err_r):
+            os.set_blocking(fd, False)
+            self.fd_jobs[fd] = job
+            self.selector.register(fd, selectors.EVENT_READ)
+
+    def read_pipe(self, fd):
+        job = self.fd_jobs[fd]
+        try:
+            chunk = os.read(fd, 65536)
+        except BlockingIOError:
+            return
+        if chunk:
+            buf = job.buffers[fd]
+            if len(buf) < MAX_OUTPUT_BYTES:
+                buf.extend(chunk[:MAX_OUTPUT_BYTES - len(buf)])
+            return
+        self.selector.unregister(fd)
+        os.close(fd)
+        job.open_fds.discard(fd)
+        del self.fd_jobs[fd]
+
+    def read_requests(self):
+        chunk = os.read(0, 65536)
+        if not chunk:
+            self.running = False
+            return
+        self.stdin_buffer += chunk
+        while b"\n" in self.stdin_buffer:
+            line, self.stdin_buffer = self.stdin_buffer.split(b"\n", 1)
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            if "cancel" in request:
+                self.cancel_job(request["cancel"])
+            else:
+                self.start_job(request)
+
+    def cancel_job(self, request_id):
+        # Hasil tetap dikirim lewat finish() setelah proses anak di-reap
+        for job in self.jobs.values():
+            if job.id == request_id and job.status is None:
+                job.cancelled = True
+                self.kill(job)
+
+    def kill(self, job):
+        try:
+            os.killpg(job.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def check_jobs(self):
+        now = time.perf_counter()
+        for pid, job in list(self.jobs.items()):
+            if job.status is None:
+                done_pid, status = os.waitpid(pid, os.WNOHANG)
+                if done_pid:
+                    job.status = status
+                    # Bersihkan proses cucu yang mungkin masih hidup
+                    self.kill(job)
+                elif now > job.deadline and not job.timed_out:
+                    job.timed_out = True
+                    self.kill(job)
+            if job.status is not None and not job.open_fds:
+                self.finish(job)
+
+    def finish(self, job):
+        del self.jobs[job.pid]
+        stdout = job.buffers[job.out_fd].decode("utf-8", "replace")
+        stderr = job.buffers[job.err_fd].decode("utf-8", "replace")
+        if job.cancelled:
+            returncode, success, stderr = -signal.SIGKILL, False, "Script execution cancelled."
+        elif job.timed_out:
+            returncode, success, stderr = -signal.SIGKILL, False, "Script execution timed out."
+        else:
+            returncode = os.waitstatus_to_exitcode(job.status)
+            success = returncode == 0
+        self.send({
+            "id": job.id,
+            "success": success,
+            "stdout": stdout,
+            "stderr": stderr,
+            "returncode": returncode,
+            "duration_ms": round((time.perf_counter() - job.started) * 1000, 2),
+        })
+
+    def serve(self):
+        os.set_blocking(0, False)
+        self.selector.register(0, selectors.EVENT_READ)
+        while self.running or self.jobs:
+            # Polling singkat selama ada job untuk reaping & cek timeout
+            timeout = POLL_INTERVAL if self.jobs else None
+            for key, _ in self.selector.select(timeout):
+                if key.fd == 0:
+                    try:
+                        self.read_requests()
+                    except BlockingIOError:
+                        pass
+                    if not self.running:
+                        self.selector.unregister(0)
+                else:
+                    self.read_pipe(key.fd)
+            self.check_jobs()
+            if not self.running:
+                for job in self.jobs.values():
+                    self.kill(job)
+
+
+def main():
+    loaded = preload_modules()
+    server = ForkServer()
+    server.send({"ready": True, "preloaded": loaded})
+    server.serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+
+from prompts import build_prompt
+
+CACHE_PATH = "data/gen_cache.sqlite"
+CACHE_MAX_ENTRIES = 50000  # batas jumlah output tersimpan, lebih dari ini dibuang (LRU)
+SAMPLED_REUSE = int(os.environ.get("TRAIN_AI_CACHE_REUSE", "0"))  # kandidat sampling yang boleh dipakai ulang per prompt
+MODEL_PATH = "model"
+MODEL_CONFIG_FILES = ("config.json", "generation_config.json", "tokenizer.json")
+WEIGHT_SUFFIXES = (".safetensors", ".bin", ".pt")
+EVICT_EVERY = 100  # cek batas ukuran setiap sekian penulisan
+
+
+def model_revision(model_path=MODEL_PATH, backend=None):
+    """Sidik jari model: isi file config + ukuran/mtime file bobot + backend."""
+    h = hashlib.sha256()
+    for name in MODEL_CONFIG_FILES:
+        path = os.path.join(model_path, name)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                h.update(name.encode() + b"\0" + f.read())
+    if os.path.isdir(model_path):
+        for name in sorted(os.listdir(model_path)):
+            if name.endswith(WEIGHT_SUFFIXES):
+                st = os.stat(os.path.join(model_path, name))
+                h.update(f"{name}:{st.st_size}:{int(st.st_mtime)}".encode())
+    h.update(str(backend).encode())
+    return h.hexdigest()[:16]
+
+
+def cache_key(sample, params, revision):
+    # Prompt yang dipakai model adalah hasil prompts.fit_sample, yang hanya
+    # bergantung pada prompt mentah, params["input_budget"] dan tokenizer
+    # (bagian dari `revision`); karena itu anggaran wajib ada di params
+    if "input_budget" not in params:
+        raise ValueError("params cache harus menyertakan input_budget")
+    payload = json.dumps(
+        {"prompt": build_prompt(sample), "params": params, "model": revision},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """Cache output generate di SQLite, dialamatkan dengan hash prompt + parameter + model.
+
+    Greedy (do_sample=False) selalu deterministik sehingga langsung dipakai.
+    Untuk sampling, tiap prompt boleh menyajikan hingga `reuse_sampled`
+    kandidat berbeda per run; setelah itu generate baru tetap dijalankan.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES, reuse_sampled=SAMPLED_REUSE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_entries = max_entries
+        self.reuse_sampled = reuse_sampled
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.served = Counter()  # kandidat yang sudah dipakai per key di run ini
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0  # sampling tanpa reuse: cache tidak mungkin dipakai, bukan miss
+        self._puts = 0
+        with self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS generations ("
+                " key TEXT NOT NULL, idx INTEGER NOT NULL, output TEXT NOT NULL,"
+                " last_access REAL NOT NULL, PRIMARY KEY (key, idx))"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS generations_lru ON generations (last_access)"
+            )
+
+    def _reusable(self, params):
+        return not params.get("do_sample", True) or self.reuse_sampled > 0
+
+    def get(self, key, params):
+        with self.lock:
+            if not self._reusable(params):
+                self.bypassed += 1
+                return None
+            idx = 0 if not params.get("do_sample", True) else self.served[key]
+            if params.get("do_sample", True) and idx >= self.reuse_sampled:
+                self.misses += 1
+                return None
+            row = self.conn.execute(
+                "SELECT output FROM generations WHERE key = ? AND idx = ?", (key, idx)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE generations SET last_access = ? WHERE key = ? AND idx = ?",
+                    (time.time(), key, idx),
+                )
+            self.served[key] += 1
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, params, output):
+        with self.lock:
+            if not self._reusable(params):
+                return
+            if params.get("do_sample", True):
+                idx = self.served[key]
+                if idx >= self.reuse_sampled:
+                    return
+                # Kandidat baru ini sudah dipakai di run sekarang
+                self.served[key] += 1
+            else:
+                idx = 0
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO generations (key, idx, output, last_access) VALUES (?, ?, ?, ?)",
+                    (key, idx, output, time.time()),
+                )
+                self._puts += 1
+                if self._puts % EVICT_EVERY == 0:
+                    self._evict()
+
+    def _evict(self):
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM generations").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM generations WHERE rowid IN ("
+                " SELECT rowid FROM generations ORDER BY last_access LIMIT ?)",
+                (excess,),
+            )
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "bypassed": self.bypassed,
+        }
+
+    def close(self):
+        with self.lock:
+            with self.conn:
+                self._evict()
+            self.conn.close()
@@ -1,21 +1,92 @@
 # generator.py
+import copy
 import json
 import os
+import time
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import (
+    AutoTokenizer,
+    AutoModelForCausalLM,
+    DynamicCache,
+    StoppingCriteria,
+    StoppingCriteriaList,
+)
+
+from prompts import (
+    PROMPT_PREAMBLE, INPUT_TOKEN_BUDGET, PROMPT_LOG_PATH,
+    build_prompt, build_prompt_suffix, clean_output, fit_sample,
+)
+from jsonl_sink import get_sink
 
 MODEL_PATH = "model"  # Ubah jika direktori model berbeda
+DEFAULT_BATCH_SIZE = 8
+USE_PREFIX_CACHE = True  # False untuk mematikan cache KV preamble
+LOG_PROMPT_TOKENS = True  # catat token prompt + latensi batch per sample ke PROMPT_LOG_PATH
+
+# Backend inferensi: "cuda", "cpu-fp32" atau "cpu-int8".
+# Bisa diatur lewat env TRAIN_AI_BACKEND per node.
+BACKENDS = ("cuda", "cpu-fp32", "cpu-int8")
+DEFAULT_BACKEND = os.environ.get("TRAIN_AI_BACKEND") or (
+    "cuda" if torch.cuda.is_available() else "cpu-fp32"
+)
+CPU_THREADS = int(os.environ.get("TRAIN_AI_THREADS", "0"))  # 0 = semua core yang tersedia
+
+FENCE = "```"
+STOP_MARKERS = ("\nInstruction:",)  # Model mulai menulis blok prompt baru
+
+# Cache KV preamble per model yang sudah di-load: id(model) -> (token ids, past_key_values)
+_prefix_cache = {}
+
+def _set_cpu_threads():
+    threads = CPU_THREADS
+    if threads <= 0:
+        try:
+            threads = len(os.sched_getaffinity(0))
+        except AttributeError:
+            threads = os.cpu_count() or 1
+    torch.set_num_threads(threads)
+    try:
+        # Generate berjalan satu op per langkah, inter-op paralel hanya menambah kontensi
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # sudah diset sebelumnya di proses ini
+
+
+def load_model(backend=None):
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend tidak dikenal: {backend} (pilih salah satu dari {BACKENDS})")
 
-def load_model():
     tokenizer = AutoTokenizer.from_pretrained(
         MODEL_PATH, trust_remote_code=True, local_files_only=True
     )
-    model = AutoModelForCausalLM.from_pretrained(
-        MODEL_PATH,
-        trust_remote_code=True,
-        local_files_only=True,
-        torch_dtype=torch.float16
-    ).cuda()
+
+    if backend == "cuda":
+        model = AutoModelForCausalLM.from_pretrained(
+            MODEL_PATH,
+            trust_remote_code=True,
+            local_files_only=True,
+            torch_dtype=torch.float16
+        ).cuda()
+    else:
+        _set_cpu_threads()
+        model = AutoModelForCausalLM.from_pretrained(
+            MODEL_PATH,
+            trust_remote_code=True,
+            local_files_only=True,
+            torch_dtype=torch.float32
+        )
+        if backend == "cpu-int8":
+            # Kuantisasi dinamis: bobot Linear jadi int8, aktivasi dikuantisasi saat runtime
+            model = torch.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+    model.eval()
+
+    # Batch generation butuh left-padding dan pad token
+    tokenizer.padding_side = "left"
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
     return model, tokenizer
 
 
@@ -38,76 +109,255 @@ def save_outputs(data, output_path="data/generated.jsonl"):
         for item in data:
             f.write(json.dumps(item, ensure_ascii=False) + "\n")
 
-def generate_script(model, tokenizer, sample, max_tokens=300):
-    prompt = (
-        "You are a Python coding assistant.\n"
-        "Generate a complete and runnable Python script based on the instruction and HAR data below.\n"
-        "Include all necessary `import` statements.\n"
-        "Only return code. Do not add any explanations or comments.\n"
-        "Use short placeholder strings for large values in headers or body (e.g., 'token123', 'sample_data').\n"
-        "Do not include actual long data.\n"
-        "Limit the script to essential logic only.\n\n"
-        f"Instruction:\n{sample['instruction']}\n\n"
-        f"HAR:\n{sample['input']}\n\n"
-        f"Python Code:\n"
-    )
+def get_prefix_cache(model, tokenizer):
+    """Hitung past_key_values untuk PROMPT_PREAMBLE sekali per model."""
+    key = id(model)
+    if key not in _prefix_cache:
+        prefix_ids = tokenizer(PROMPT_PREAMBLE)["input_ids"]
+        with torch.no_grad():
+            out = model(
+                input_ids=torch.tensor([prefix_ids], device=model.device),
+                use_cache=True,
+            )
+        past = out.past_key_values
+        if isinstance(past, tuple):
+            past = DynamicCache.from_legacy_cache(past)
+        _prefix_cache[key] = (prefix_ids, past)
+    return _prefix_cache[key]
 
-    inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
-    outputs = model.generate(
-        **inputs,
-        max_new_tokens=max_tokens,
-        do_sample=True,
-        temperature=0.5,
-        pad_token_id=tokenizer.eos_token_id
-    )
-    generated = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    cleaned = generated[len(prompt):].strip()
 
-    # 🔍 Bersihkan blok markdown ```python
-    if "```" in cleaned:
-        parts = cleaned.split("```")
-        for part in parts:
-            if "import" in part or "def " in part or "requests" in part:
-                cleaned = part.replace("python", "", 1).strip()
-                break
+def _pad_after_prefix(prefix_ids, suffixes, pad_token_id, device):
+    # Padding diletakkan di antara preamble dan suffix agar posisi preamble
+    # tetap sama dengan cache; attention_mask menutup padding tersebut.
+    width = max(len(suffix) for suffix in suffixes)
+    input_ids, attention_mask = [], []
+    for suffix in suffixes:
+        pad = width - len(suffix)
+        input_ids.append(prefix_ids + [pad_token_id] * pad + suffix)
+        attention_mask.append([1] * len(prefix_ids) + [0] * pad + [1] * len(suffix))
+    return {
+        "input_ids": torch.tensor(input_ids, device=device),
+        "attention_mask": torch.tensor(attention_mask, device=device),
+    }
+
+
+class IncrementalDecoder:
+    """Detokenisasi bertahap: hanya token baru yang di-decode tiap langkah.
+
+    Beberapa token terakhir tetap didecode ulang sebagai konteks agar spasi
+    dan karakter multi-byte BPE tidak terpotong.
+    """
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.tokens = []
+        self.prefix_offset = 0
+        self.read_offset = 0
+        self.text = ""
+
+    def _decode(self, tokens):
+        return self.tokenizer.decode(tokens, skip_special_tokens=True)
+
+    def push(self, token_id, final=False):
+        if token_id is not None:
+            self.tokens.append(token_id)
+        prefix_text = self._decode(self.tokens[self.prefix_offset:self.read_offset])
+        new_text = self._decode(self.tokens[self.prefix_offset:])
+        # Tahan dulu jika token terakhir masih potongan karakter UTF-8
+        if len(new_text) > len(prefix_text) and (final or not new_text.endswith("\ufffd")):
+            self.text += new_text[len(prefix_text):]
+            self.prefix_offset = self.read_offset
+            self.read_offset = len(self.tokens)
+
+    def flush(self):
+        if self.read_offset < len(self.tokens):
+            self.push(None, final=True)
+        return self.text
+
+
+class CodeStopCriteria(StoppingCriteria):
+    """Hentikan tiap baris batch saat EOS, fence ``` ditutup, atau muncul "Instruction:" baru."""
+
+    def __init__(self, tokenizer, prompt_len, batch_size):
+        self.eos_token_id = tokenizer.eos_token_id
+        self.decoders = [IncrementalDecoder(tokenizer) for _ in range(batch_size)]
+        self.done = [False] * batch_size
+        self._scan_pos = [0] * batch_size
+        self._fence_end = [0] * batch_size
+        self._fences = [0] * batch_size
+        self._overlap = max(len(m) for m in STOP_MARKERS + (FENCE,)) - 1
+        self._seen = prompt_len
 
-    # 🧹 Hapus baris dengan kutip tidak seimbang atau dict tidak tertutup
-    cleaned_lines = []
-    open_brace = 0
-    for line in cleaned.splitlines():
-        if line.count('"') % 2 != 0 or line.count("'") % 2 != 0:
-            continue  # lewati jika kutip tidak seimbang
+    def _should_stop(self, row):
+        text = self.decoders[row].text
+        # Mundur secukupnya agar marker yang terpotong antar langkah tetap terdeteksi
+        start = max(0, self._scan_pos[row] - self._overlap)
+        self._scan_pos[row] = len(text)
 
-        open_brace += line.count("{") - line.count("}")
-        if open_brace < 0:
-            open_brace = 0
-            continue  # lewati jika brace ditutup berlebih
+        if any(marker in text[start:] for marker in STOP_MARKERS):
+            return True
 
-        cleaned_lines.append(line)
+        pos = text.find(FENCE, max(start, self._fence_end[row]))
+        while pos != -1:
+            self._fence_end[row] = pos + len(FENCE)
+            self._fences[row] += 1
+            before = text[:pos]
+            # Fence kedua menutup blok; fence pertama setelah kode juga berarti penutup
+            if self._fences[row] >= 2 or "import" in before or "def " in before:
+                return True
+            pos = text.find(FENCE, self._fence_end[row])
+        return False
 
-    # Potong bagian akhir jika masih ada kurung kurawal terbuka
-    if open_brace != 0:
-        for i in range(len(cleaned_lines) - 1, -1, -1):
-            if "{" in cleaned_lines[i]:
-                cleaned_lines = cleaned_lines[:i]
-                break
+    def __call__(self, input_ids, scores, **kwargs):
+        new_tokens = input_ids[:, self._seen:].tolist()
+        self._seen = input_ids.shape[1]
+        for row, tokens in enumerate(new_tokens):
+            if self.done[row]:
+                continue
+            for token_id in tokens:
+                if token_id == self.eos_token_id:
+                    self.done[row] = True
+                    break
+                self.decoders[row].push(token_id)
+            if not self.done[row] and self._should_stop(row):
+                self.done[row] = True
+        return torch.tensor(self.done, dtype=torch.bool, device=input_ids.device)
 
-    cleaned = "\n".join(cleaned_lines)
+    def text(self, row):
+        text = self.decoders[row].flush()
+        for marker in STOP_MARKERS:
+            cut = text.find(marker)
+            if cut != -1:
+                text = text[:cut]
+        return text
 
-    return cleaned
 
+def _token_counter(tokenizer):
+    return lambda text: len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+
+def generate_scripts(model, tokenizer, samples, batch_size=DEFAULT_BATCH_SIZE, max_tokens=300,
+                     use_prefix_cache=None, temperature=0.5, do_sample=True, input_budget=INPUT_TOKEN_BUDGET,
+                     num_return_sequences=1):
+    """Generate script untuk banyak sample sekaligus.
+
+    Prompt diurutkan berdasarkan panjang token lalu dipotong per batch,
+    supaya padding (kiri) dalam satu batch seminimal mungkin. Hasil yang
+    sudah dibersihkan dikembalikan sesuai urutan `samples`.
+
+    Jika `use_prefix_cache` aktif (default: USE_PREFIX_CACHE), KV preamble
+    diambil dari cache sehingga prefill hanya menghitung bagian
+    Instruction/HAR tiap sample.
+
+    `do_sample=False` memakai greedy decoding (deterministik).
+
+    Input HAR yang melebihi `input_budget` token (dihitung dengan tokenizer
+    model) diringkas dulu lewat prompts.fit_sample; None mematikannya.
+
+    `num_return_sequences` > 1 (hanya dengan sampling) mengambil sekian
+    kandidat per sample dalam satu panggilan generate; hasilnya list kandidat
+    per sample. Jumlah sample per batch dibagi n agar baris per generate tetap
+    sekitar `batch_size`.
+    """
+    if use_prefix_cache is None:
+        use_prefix_cache = USE_PREFIX_CACHE
+
+    if use_prefix_cache:
+        prefix_ids, prefix_past = get_prefix_cache(model, tokenizer)
+    else:
+        prefix_ids, prefix_past = tokenizer(PROMPT_PREAMBLE)["input_ids"], None
+
+    # Preamble dan suffix selalu ditokenisasi terpisah, supaya token prompt
+    # identik dengan atau tanpa cache.
+    fitted = [fit_sample(sample, input_budget, _token_counter(tokenizer)) for sample in samples]
+    suffixes = [tokenizer(build_prompt_suffix(sample))["input_ids"] for sample, _ in fitted]
+    order = sorted(range(len(samples)), key=lambda i: len(suffixes[i]))
+
+    sampling = {"do_sample": True, "temperature": temperature} if do_sample else {"do_sample": False}
+    n = num_return_sequences if do_sample else 1
+    if n > 1:
+        sampling["num_return_sequences"] = n
+        batch_size = max(1, batch_size // n)
+
+    results = [None] * len(samples)
+    for start in range(0, len(order), batch_size):
+        batch_idx = order[start:start + batch_size]
+        batch_suffixes = [suffixes[i] for i in batch_idx]
+
+        if prefix_past is not None:
+            inputs = _pad_after_prefix(prefix_ids, batch_suffixes, tokenizer.pad_token_id, model.device)
+            past = copy.deepcopy(prefix_past)
+            # Semua baris berbagi preamble yang sama, jadi cache cukup diulang per baris hasil
+            past.batch_repeat_interleave(len(batch_idx) * n)
+            extra = {"past_key_values": past}
+        else:
+            inputs = tokenizer.pad(
+                {"input_ids": [prefix_ids + suffix for suffix in batch_suffixes]},
+                padding=True,
+                return_tensors="pt",
+            ).to(model.device)
+            extra = {}
+
+        # Stopping criteria sekaligus men-decode token baru secara bertahap
+        stopper = CodeStopCriteria(tokenizer, inputs["input_ids"].shape[1], len(batch_idx) * n)
+        batch_start = time.perf_counter()
+        with torch.inference_mode():
+            model.generate(
+                **inputs,
+                **extra,
+                **sampling,
+                max_new_tokens=max_tokens,
+                pad_token_id=tokenizer.pad_token_id,
+                stopping_criteria=StoppingCriteriaList([stopper]),
+            )
+
+        batch_seconds = time.perf_counter() - batch_start
+
+        for row, i in enumerate(batch_idx):
+            # Baris hasil generate: n kandidat berurutan per sample
+            candidates = [clean_output(stopper.text(row * n + k)) for k in range(n)]
+            results[i] = candidates if num_return_sequences > 1 else candidates[0]
+            if LOG_PROMPT_TOKENS:
+                get_sink(PROMPT_LOG_PATH).write({
+                    "id": samples[i].get("id"),
+                    "prompt_tokens": len(prefix_ids) + len(suffixes[i]),
+                    **fitted[i][1],
+                    "batch_size": len(batch_idx),
+                    "padded_tokens": inputs["input_ids"].shape[1],
+                    "batch_seconds": round(batch_seconds, 4),
+                })
+
+    return results
+
+
+def generate_script(model, tokenizer, sample, max_tokens=300, use_prefix_cache=None,
+                    temperature=0.5, do_sample=True):
+    return generate_scripts(
+        model, tokenizer, [sample], batch_size=1, max_tokens=max_tokens,
+        use_prefix_cache=use_prefix_cache, temperature=temperature, do_sample=do_sample,
+    )[0]
 
 
 if __name__ == "__main__":
-    model, tokenizer = load_model()
+    from model_client import get_generator
+
+    generator = get_generator()
     data = load_dataset()
     output_data = []
 
-    for sample in data:
-        print(f"🛠️  Generating for input ID: {sample['id'][:8]}...")
-        output = generate_script(model, tokenizer, sample)
-        sample["output"] = output
-        output_data.append(sample)
+    for start in range(0, len(data), DEFAULT_BATCH_SIZE):
+        batch = data[start:start + DEFAULT_BATCH_SIZE]
+        print(f"🛠️  Generating batch {start // DEFAULT_BATCH_SIZE + 1} ({len(batch)} sample)...")
+        outputs = generator.generate(batch)
+        for sample, output in zip(batch, outputs):
+            sample["output"] = output
+            output_data.append(sample)
 
     save_outputs(output_data)
     print(f"✅ {len(output_data)} script selesai dibuat dan disimpan di generated.jsonl")
+    if LOG_PROMPT_TOKENS and not generator.remote:
+        from jsonl_sink import flush_all
+        from prompts import prompt_token_report
+
+        flush_all()
+        prompt_token_report()
@@ -0,0 +1,153 @@
+# http_mock.py
+# Mock server HTTP lokal untuk evaluasi offline. Script yang dievaluasi
+# diarahkan ke sini oleh offline_site/sitecustomize.py; jawaban ditentukan
+# oleh request yang tercatat di `input` sample (format parser_har).
+import re
+import json
+import uuid
+import threading
+from urllib.parse import urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ORIGINAL_URL_HEADER = "X-Mock-Original-Url"
+SESSION_HEADER = "X-Mock-Session"
+MAX_LOGGED_BODY = 2000  # karakter body yang disimpan di log per request
+URL_PATTERN = re.compile(r"https?://[^\s\"'<>]+")
+REQUEST_LINE = re.compile(r"^\[(?P<method>[A-Z]+)\]\s+(?P<url>\S+)")
+
+
+def parse_har_input(text):
+    """Ambil request yang diharapkan dari input sample.
+
+    Format utama: "[METHOD] URL\\nHeaders:\\nK: V\\n\\nBody:\\n..." dari
+    parser_har. Untuk input teks bebas, setiap URL dianggap GET.
+    """
+    text = text or ""
+    match = REQUEST_LINE.match(text.strip())
+    if match:
+        headers = {}
+        body = ""
+        head, _, body = text.partition("\n\nBody:\n")
+        in_headers = False
+        for line in head.splitlines()[1:]:
+            if line.strip() == "Headers:":
+                in_headers = True
+                continue
+            if in_headers and ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip()] = value.strip()
+        return [{"method": match.group("method"), "url": match.group("url"), "headers": headers, "body": body}]
+    return [{"method": "GET", "url": url.rstrip(".,)"), "headers": {}, "body": ""} for url in URL_PATTERN.findall(text)]
+
+
+def _route(url):
+    parts = urlsplit(url)
+    return parts.netloc.lower(), parts.path.rstrip("/") or "/"
+
+
+class MockSession:
+    def __init__(self, expected):
+        self.expected = expected
+        self.routes = {(e["method"].upper(),) + _route(e["url"]): e for e in expected}
+        self.log = []
+        self.lock = threading.Lock()
+
+    def summary(self):
+        """Ringkasan untuk hasil evaluasi: log request dan berapa request HAR yang benar-benar dipanggil."""
+        with self.lock:
+            hit = {(r["method"],) + _route(r["url"]) for r in self.log if r["matched"]}
+            return {
+                "http_log": list(self.log),
+                "http_expected": len(self.routes),
+                "http_matched": len(hit),
+            }
+
+    def handle(self, method, url, headers, body):
+        expected = self.routes.get((method,) + _route(url))
+        with self.lock:
+            self.log.append({
+                "method": method,
+                "url": url,
+                "headers": headers,
+                "body": body[:MAX_LOGGED_BODY],
+                "matched": expected is not None,
+            })
+        if expected is None:
+            return 404, {"ok": False, "mock": True, "error": "request tidak ada di HAR"}
+        return 200, {"ok": True, "mock": True, "status": "success", "data": {}}
+
+
+class MockHTTPServer:
+    """Mock server di thread latar; satu sesi per evaluasi script."""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def open_session(self, expected):
+        session_id = uuid.uuid4().hex
+        with self.lock:
+            self.sessions[session_id] = MockSession(expected)
+        return session_id
+
+    def close_session(self, session_id):
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        return session
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode("utf-8", "replace") if length else ""
+                headers = {
+                    k: v for k, v in self.headers.items()
+                    if k.lower() not in (ORIGINAL_URL_HEADER.lower(), SESSION_HEADER.lower())
+                }
+                with server.lock:
+                    session = server.sessions.get(self.headers.get(SESSION_HEADER, ""))
+                url = self.headers.get(ORIGINAL_URL_HEADER, self.path)
+                if session is None:
+                    status, payload = 410, {"ok": False, "mock": True, "error": "sesi mock tidak dikenal"}
+                else:
+                    status, payload = session.handle(self.command, url, headers, body)
+
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = do_OPTIONS = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+_mock_server = None
+_mock_lock = threading.Lock()
+
+
+def get_mock_server():
+    global _mock_server
+    with _mock_lock:
+        if _mock_server is None:
+            _mock_server = MockHTTPServer()
+        return _mock_server
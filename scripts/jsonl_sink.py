@@ -0,0 +1,105 @@
+# jsonl_sink.py
+# Penulis JSONL/log berbuffer: handle file tetap terbuka, record dikumpulkan
+# lalu ditulis sekaligus saat buffer penuh, saat sudah lewat FLUSH_INTERVAL,
+# dan saat proses selesai. Satu sink per path, aman untuk banyak thread.
+import os
+import json
+import time
+import atexit
+import threading
+
+FLUSH_RECORDS = 256  # tulis ke file setelah sekian record
+FLUSH_INTERVAL = 1.0  # ... atau setelah sekian detik sejak flush terakhir
+FSYNC = os.environ.get("TRAIN_AI_FSYNC") == "1"  # fsync tiap flush (lebih aman, lebih lambat)
+
+_sinks = {}
+_sinks_lock = threading.Lock()
+_flusher = None
+
+
+class JsonlSink:
+    def __init__(self, path, flush_records=FLUSH_RECORDS, flush_interval=FLUSH_INTERVAL, fsync=FSYNC):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.file = open(path, "a", encoding="utf-8")
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+
+    def write(self, item):
+        self.write_line(json.dumps(item, ensure_ascii=False))
+
+    def write_line(self, line):
+        with self.lock:
+            self.buffer.append(line + "\n")
+            if len(self.buffer) >= self.flush_records or time.monotonic() - self.last_flush >= self.flush_interval:
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        self.last_flush = time.monotonic()
+        if not self.buffer or self.file.closed:
+            return
+        self.file.write("".join(self.buffer))
+        self.buffer.clear()
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+
+    def stale(self):
+        return bool(self.buffer) and time.monotonic() - self.last_flush >= self.flush_interval
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            self.file.close()
+
+
+def _flush_loop():
+    # Buffer yang tidak bertambah tetap ditulis paling lambat ~FLUSH_INTERVAL
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        with _sinks_lock:
+            sinks = list(_sinks.values())
+        for sink in sinks:
+            if sink.stale():
+                sink.flush()
+
+
+def get_sink(path, **kwargs):
+    """Sink bersama untuk `path` (dibuat saat pertama dipakai)."""
+    global _flusher
+    key = os.path.abspath(path)
+    with _sinks_lock:
+        sink = _sinks.get(key)
+        if sink is None:
+            sink = _sinks[key] = JsonlSink(path, **kwargs)
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name="jsonl-sink-flusher", daemon=True)
+            _flusher.start()
+    return sink
+
+
+def flush_all():
+    """Tulis semua buffer, mis. sebelum file dibaca ulang oleh checker."""
+    with _sinks_lock:
+        sinks = list(_sinks.values())
+    for sink in sinks:
+        sink.flush()
+
+
+def close_all():
+    with _sinks_lock:
+        sinks = list(_sinks.values())
+        _sinks.clear()
+    for sink in sinks:
+        sink.close()
+
+
+atexit.register(close_all)
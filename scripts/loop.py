@@ -3,122 +3,239 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import json
-import uuid
-from scripts.score_checker import run_score_checker
-from data.semantic_checker import run_semantic_checker
+from collections import Counter
 from scripts import extract_failed_to_dataset
-from generator import load_model, load_dataset, generate_script
-from evaluator import evaluate_script
-from scripts.semantic_checker_automation import run_semantic_checker_automation
+from model_client import get_generator
+from evaluator import evaluate_script, DEFAULT_WORKERS, static_gate_stats
+from pipeline import Pipeline, print_stats
+from progress import ProgressJournal, RunCursor, compact_eval, ensure_id
+from jsonl_sink import get_sink, flush_all
+from check_engine import run_checks
 
 
 # Path dataset
 DATA_PATH = "data/dataset.jsonl"
 GENERATED_PATH = "data/generated.jsonl"
 FAILED_DIR = "data/failed_outputs"
+BATCH_SIZE = 8
+# Sample per panggilan generate = beberapa batch, supaya generate_scripts bisa
+# mengelompokkan prompt dengan panjang mirip ke batch yang sama
+GENERATE_WINDOW = 4
+EVAL_WORKERS = DEFAULT_WORKERS
+# Generate greedy (deterministik): output bisa diambil dari gen_cache di run
+# berikutnya, tapi sample yang gagal akan mendapat output yang sama lagi
+GREEDY = os.environ.get("TRAIN_AI_GREEDY", "0") == "1"
+QUEUE_SIZE = BATCH_SIZE * GENERATE_WINDOW  # batas antrean antar stage (backpressure), muat satu window
+# Status error sementara: tidak ditandai `done`, sample dicoba lagi di run berikutnya
+ERROR_STATUSES = ("generate_error", "filter_error", "eval_error")
 os.makedirs(FAILED_DIR, exist_ok=True)
 
 
 def save_jsonl_line(path, item):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(item, ensure_ascii=False) + "\n")
-
+    sink = get_sink(path)
+    sink.write(item)
+    return sink
+
+
+def mark_error(status):
+    """Handler `on_error` pipeline: record yang gagal di stage diteruskan ke writer sebagai `status`."""
+    def handle(records, error):
+        for record in records:
+            record["status"] = status
+            record["error"] = str(error)
+        return records
+    return handle
+
+
+def generate_stage(generator, journal):
+    def run(records):
+        # Record yang output-nya sudah ada di jurnal tidak di-generate ulang
+        todo = [r for r in records if not r["generated"]]
+        if not todo:
+            return records
+        print(f"\n🛠️  Generate batch ({len(todo)} item)...")
+        try:
+            outputs = generator.generate([r["sample"] for r in todo], do_sample=not GREEDY)
+        except Exception as e:
+            print("🚨 Error tak terduga saat generate:", e)
+            for record in todo:
+                record["status"] = "generate_error"
+                record["error"] = str(e)
+            return records
+        for record, output in zip(todo, outputs):
+            record["sample"]["output"] = output.strip()
+            record["generated"] = True
+        journal.record_many([(r["key"], "generated", {"output": r["sample"]["output"]}) for r in todo])
+        return records
+    return run
+
+
+def filter_stage(record):
+    if record["status"] is None:
+        script_code = record["sample"]["output"]
+        # Filter 1: Output seperti JSON
+        if script_code.startswith("{") or script_code.startswith("["):
+            record["status"] = "json"
+        # Filter 2: Terlalu pendek
+        elif len(script_code.splitlines()) < 2:
+            record["status"] = "short"
+    return [record]
+
+
+def evaluate_stage(journal):
+    def run(record):
+        # Record yang sudah ditolak / sudah dievaluasi hanya diteruskan ke writer
+        if record["status"] is None:
+            sample = record["sample"]
+            try:
+                record["eval"] = evaluate_script(sample["output"], sample=sample)
+                record["status"] = "evaluated"
+                journal.record(record["key"], "evaluated", {
+                    "output": sample["output"],
+                    "eval": compact_eval(record["eval"]),
+                })
+            except Exception as e:
+                record["status"] = "eval_error"
+                record["error"] = str(e)
+        return [record]
+    return run
+
+
+def writer_stage(stats, journal, cursor):
+    def write(record, written, finished):
+        sample = record["sample"]
+        status = record["status"]
+        print(f"\n🎯 ID: {sample['id'][:8]}")
+
+        if status == "json":
+            print("⚠️ Output tampaknya JSON, bukan Python.")
+            stats["json"] += 1
+            written.add(save_jsonl_line(f"{FAILED_DIR}/non_python.jsonl", sample))
+        elif status == "short":
+            print("⚠️ Output terlalu pendek.")
+            stats["short"] += 1
+            written.add(save_jsonl_line(f"{FAILED_DIR}/too_short.jsonl", sample))
+        elif status in ERROR_STATUSES:
+            print("🚨 Error tak terduga:", record.get("error", status))
+            stats["other"] += 1
+            stats["fail"] += 1
+        elif record["eval"]["success"]:
+            print("✅ Script berhasil dijalankan.")
+            stats["success"] += 1
+            written.add(save_jsonl_line(GENERATED_PATH, sample))
+        else:
+            stderr = record["eval"]["stderr"]
+            print("❌ Script gagal.")
+            print("🪲 Error:", stderr)
+
+            if "SyntaxError" in stderr:
+                stats["syntax"] += 1
+            else:
+                stats["other"] += 1
+
+            stats["fail"] += 1
+            written.add(save_jsonl_line(f"{FAILED_DIR}/errors.jsonl", {
+                "instruction": sample["instruction"],
+                "input": sample["input"],
+                "generated": sample["output"],
+                "error": stderr
+            }))
+
+        # Error generate/evaluasi bisa sementara; sample dicoba lagi di run berikutnya
+        if status not in ERROR_STATUSES:
+            if status == "evaluated":
+                status = "success" if record["eval"]["success"] else "failed"
+            finished.append((record["key"], "done", {"status": status}))
+
+    def run(records):
+        # Group commit: tulis seluruh batch, flush tiap sink sekali, lalu catat
+        # `done` satu batch dalam satu transaksi. Baris output harus sudah di
+        # file sebelum jurnal menandai `done`, kalau tidak crash di antaranya
+        # membuat output hilang permanen
+        written = set()
+        finished = []
+        for record in records:
+            write(record, written, finished)
+        for sink in written:
+            sink.flush()
+        journal.record_many(finished)
+        cursor.finish_many([record["seq"] for record in records])
+        return []
+    return run
+
+
+def writer_error(cursor):
+    """Handler `on_error` writer: baris tetap selesai di cursor tanpa `done`, jadi dicoba lagi run berikutnya."""
+    def handle(records, error):
+        cursor.finish_many([record["seq"] for record in records])
+        return []
+    return handle
+
+
+def iter_pending(journal, cursor):
+    """Loader: baca dataset mulai dari offset run dan lanjutkan dari tahap terakhir di jurnal."""
+    for seq, sample in cursor.iter_samples(DATA_PATH):
+        key = ensure_id(sample)
+        stage, result = journal.get(key)
+        if stage == "done":
+            cursor.finish(seq)
+            continue
 
-def load_existing_ids(path):
-    ids = set()
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                try:
-                    ids.add(json.loads(line)["id"])
-                except:
-                    continue
-    return ids
+        record = {"key": key, "seq": seq, "sample": sample, "status": None, "generated": False}
+        if stage in ("generated", "evaluated"):
+            sample["output"] = result["output"]
+            record["generated"] = True
+        if stage == "evaluated":
+            record["eval"] = result["eval"]
+            record["status"] = "evaluated"
+        yield record
 
 
 def main_loop():
     print("🔁 Memulai loop self-training...")
 
-    model, tokenizer = load_model()
-
-    existing_ids = load_existing_ids(GENERATED_PATH)
-
-    # Statistik
-    success_count = fail_count = 0
-    json_count = short_count = syntax_error_count = other_error_count = 0
-
-    data = []
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        for line in f:
-            sample = json.loads(line)
-            if "id" not in sample:
-                sample["id"] = str(uuid.uuid4())
-            data.append(sample)
-
-    print(f"📦 Memproses {len(data)} item...")
-
-    for sample in data:
-        print(f"\n🎯 Memproses ID: {sample['id'][:8]}")
-
-        if sample["id"] in existing_ids:
-            print("⚠️ Sudah ada di generated.jsonl, lewati.")
-            continue
-
-        try:
-            script_code = generate_script(model, tokenizer, sample).strip()
-
-            sample["output"] = script_code
-
-            # Filter 1: Output seperti JSON
-            if script_code.startswith("{") or script_code.startswith("["):
-                print("⚠️ Output tampaknya JSON, bukan Python.")
-                json_count += 1
-                save_jsonl_line(f"{FAILED_DIR}/non_python.jsonl", sample)
-                continue
-
-            # Filter 2: Terlalu pendek
-            if len(script_code.splitlines()) < 2:
-                print("⚠️ Output terlalu pendek.")
-                short_count += 1
-                save_jsonl_line(f"{FAILED_DIR}/too_short.jsonl", sample)
-                continue
-
-            # Evaluasi eksekusi script
-            eval_result = evaluate_script(script_code)
-
-            if eval_result["success"]:
-                print("✅ Script berhasil dijalankan.")
-                success_count += 1
-                save_jsonl_line(GENERATED_PATH, sample)
-            else:
-                print("❌ Script gagal.")
-                print("🪲 Error:", eval_result["stderr"])
-                stderr = eval_result["stderr"]
-
-                if "SyntaxError" in stderr:
-                    syntax_error_count += 1
-                else:
-                    other_error_count += 1
-
-                fail_count += 1
-                save_jsonl_line(f"{FAILED_DIR}/errors.jsonl", {
-                    "instruction": sample["instruction"],
-                    "input": sample["input"],
-                    "generated": script_code,
-                    "error": stderr
-                })
-
-        except Exception as e:
-            print("🚨 Error tak terduga:", e)
-            other_error_count += 1
-            fail_count += 1
+    generator = get_generator(batch_size=BATCH_SIZE)
+
+    journal = ProgressJournal()
+    migrated = journal.import_legacy(GENERATED_PATH)
+    if migrated:
+        print(f"📒 {migrated} sample lama dari generated.jsonl ditandai selesai di jurnal.")
+    offset = journal.begin_run()
+    if offset:
+        print(f"📒 Melanjutkan run yang terhenti dari byte {offset} dataset.")
+    cursor = RunCursor(journal, offset)
+
+    # Statistik (hanya diubah oleh stage writer)
+    stats = Counter()
+
+    # loader -> generate -> filter -> evaluate (paralel) -> writer
+    pipeline = (
+        Pipeline()
+        .add("generate", generate_stage(generator, journal), batch_size=BATCH_SIZE * GENERATE_WINDOW,
+             queue_size=QUEUE_SIZE, on_error=mark_error("generate_error"))
+        .add("filter", filter_stage, queue_size=QUEUE_SIZE, on_error=mark_error("filter_error"))
+        .add("evaluate", evaluate_stage(journal), workers=EVAL_WORKERS, queue_size=QUEUE_SIZE,
+             on_error=mark_error("eval_error"))
+        .add("writer", writer_stage(stats, journal, cursor), batch_size=QUEUE_SIZE, queue_size=QUEUE_SIZE,
+             on_error=writer_error(cursor))
+    )
+    pipeline_stats = pipeline.run(iter_pending(journal, cursor))
+    # Run berikutnya mulai dari awal dan mencoba lagi sample yang belum sukses
+    journal.end_run()
+    journal.close()
+    # Checker berikutnya membaca ulang file output
+    flush_all()
 
     # Ringkasan akhir
     print("\n📊 Ringkasan:")
-    print(f"✅ Berhasil: {success_count}")
-    print(f"❌ Gagal: {fail_count}")
-    print(f"⚠️ JSON: {json_count} | Terlalu pendek: {short_count} | Syntax: {syntax_error_count} | Lain: {other_error_count}")
+    print(f"✅ Berhasil: {stats['success']}")
+    print(f"❌ Gagal: {stats['fail']}")
+    print(f"⚠️ JSON: {stats['json']} | Terlalu pendek: {stats['short']} | Syntax: {stats['syntax']} | Lain: {stats['other']}")
+    gate = static_gate_stats()
+    print(f"🚧 Gate statis: {gate['rejected']} proses dihemat dari {gate['checked']} script "
+          f"(syntax {gate['syntax']}, modul hilang {gate['missing_module']})")
+    print(f"🔌 Generator: {json.dumps(generator.stats(), ensure_ascii=False)}")
+    print_stats(pipeline_stats)
 
 
 if __name__ == "__main__":
@@ -126,10 +243,6 @@ if __name__ == "__main__":
     print("\n🔁 Menambahkan error ke dataset...")
     extract_failed_to_dataset.extract_failed_to_dataset()
 
-    run_semantic_checker_automation()
-    print("soft cheker")
-    print("\n🧠 Menjalankan semantic checker...")
-    run_semantic_checker()
-
-    print("\n📐 Menjalankan score checker...")
-    run_score_checker()
+    # Satu kali baca generated.jsonl untuk checker automation, semantic, dan score
+    print("\n🧠 Menjalankan semantic & score checker...")
+    run_checks()
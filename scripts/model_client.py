@@ -0,0 +1,149 @@
+import sys
+import os
+import json
+import time
+import urllib.request
+import urllib.error
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from model_server import SERVER_HOST, SERVER_PORT
+from gen_cache import GenerationCache, cache_key, model_revision
+from prompts import INPUT_TOKEN_BUDGET
+
+SERVER_URL = os.environ.get("TRAIN_AI_SERVER_URL", f"http://{SERVER_HOST}:{SERVER_PORT}")
+REQUEST_TIMEOUT = 600  # generate batch besar di CPU bisa lama
+USE_GEN_CACHE = True  # False untuk mematikan cache output generate
+SERVER_RETRIES = 2  # percobaan ulang saat koneksi ke server putus, sebelum pindah ke model lokal
+RETRY_DELAY = 1.0
+
+
+def _get_json(path, timeout):
+    with urllib.request.urlopen(SERVER_URL + path, timeout=timeout) as resp:
+        return json.loads(resp.read())
+
+
+def server_health(timeout=0.5):
+    try:
+        health = _get_json("/health", timeout)
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+    return health if health.get("ok") else None
+
+
+def server_available(timeout=0.5):
+    return server_health(timeout) is not None
+
+
+class Generator:
+    """Klien generate: pakai model server jika hidup, kalau tidak load model di proses ini.
+
+    Jika server mati di tengah jalan, `generate` mencoba ulang koneksi lalu
+    pindah ke model lokal.
+    """
+
+    def __init__(self, backend=None, batch_size=None, use_server=True, use_cache=USE_GEN_CACHE):
+        health = server_health() if use_server else None
+        self.remote = health is not None
+        self.batch_size = batch_size
+        self.requests = 0
+        self.total_latency = 0.0
+        if self.remote:
+            print(f"🔌 Memakai model server di {SERVER_URL}")
+            self.backend = health.get("backend")
+        else:
+            print("⏳ Model server tidak ditemukan, memuat model di proses ini...")
+            self._load_local(backend)
+
+        self.cache = GenerationCache() if use_cache else None
+        self.revision = model_revision(backend=self.backend)
+
+    def _load_local(self, backend=None):
+        from generator import DEFAULT_BACKEND, DEFAULT_BATCH_SIZE, load_model
+
+        self.backend = backend or DEFAULT_BACKEND
+        self.batch_size = self.batch_size or DEFAULT_BATCH_SIZE
+        self.model, self.tokenizer = load_model(self.backend)
+        self.remote = False
+
+    def generate(self, samples, max_tokens=300, temperature=0.5, do_sample=True, num_return_sequences=1,
+                 input_budget=INPUT_TOKEN_BUDGET):
+        """Satu output per sample; dengan `num_return_sequences` > 1, list kandidat per sample."""
+        # Anggaran input selalu dikirim eksplisit: prompt yang benar-benar dipakai
+        # bergantung padanya, jadi ikut menentukan cache key
+        params = {"max_tokens": max_tokens, "temperature": temperature, "do_sample": do_sample,
+                  "input_budget": input_budget}
+        if num_return_sequences > 1:
+            params["num_return_sequences"] = num_return_sequences
+        outputs = [None] * len(samples)
+        keys = [None] * len(samples)
+        # Kandidat best-of-N tidak di-cache: tiap panggilan memang harus sampling baru
+        if self.cache is not None and num_return_sequences == 1:
+            for i, sample in enumerate(samples):
+                keys[i] = cache_key(sample, params, self.revision)
+                outputs[i] = self.cache.get(keys[i], params)
+
+        missing = [i for i, output in enumerate(outputs) if output is None]
+        if not missing:
+            return outputs
+
+        start = time.perf_counter()
+        batch = [samples[i] for i in missing]
+        generated = self._generate_remote(batch, params) if self.remote else None
+        if generated is None:
+            from generator import generate_scripts
+
+            generated = generate_scripts(
+                self.model, self.tokenizer, batch, batch_size=self.batch_size, **params
+            )
+        self.requests += 1
+        self.total_latency += time.perf_counter() - start
+
+        for i, output in zip(missing, generated):
+            outputs[i] = output
+            if keys[i] is not None:
+                self.cache.put(keys[i], params, output)
+        return outputs
+
+    def _generate_remote(self, samples, params):
+        """Output dari server; None jika server tidak bisa dihubungi lagi (model lokal sudah dimuat)."""
+        payload = json.dumps({"samples": samples, **params}, ensure_ascii=False)
+        for attempt in range(SERVER_RETRIES + 1):
+            req = urllib.request.Request(
+                SERVER_URL + "/generate",
+                data=payload.encode("utf-8"),
+                headers={"Content-Type": "application/json"},
+            )
+            try:
+                with urllib.request.urlopen(req, timeout=REQUEST_TIMEOUT) as resp:
+                    return json.loads(resp.read())["outputs"]
+            except urllib.error.HTTPError as e:
+                raise RuntimeError(f"Model server error {e.code}: {e.read().decode('utf-8', 'replace')}")
+            except (urllib.error.URLError, ConnectionError) as e:
+                # Koneksi ditolak/putus (server restart atau mati): tunggu sebentar lalu coba lagi
+                print(f"⚠️ Model server tidak bisa dihubungi ({e}), percobaan {attempt + 1}/{SERVER_RETRIES + 1}")
+                if attempt < SERVER_RETRIES:
+                    time.sleep(RETRY_DELAY)
+
+        print("⏳ Model server tetap tidak bisa dihubungi, memuat model di proses ini...")
+        self._load_local(self.backend)
+        return None
+
+    def stats(self):
+        stats = {
+            "mode": "server" if self.remote else "lokal",
+            "requests": self.requests,
+            "avg_latency_ms": round(self.total_latency / self.requests * 1000, 1) if self.requests else None,
+        }
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        if self.remote:
+            try:
+                stats["server"] = _get_json("/stats", 2)
+            except (urllib.error.URLError, OSError, ValueError):
+                pass
+        return stats
+
+
+def get_generator(backend=None, batch_size=None):
+    return Generator(backend=backend, batch_size=batch_size)
@@ -0,0 +1,236 @@
+import sys
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = int(os.environ.get("TRAIN_AI_SERVER_PORT", "8765"))
+BATCH_WAIT = 0.05  # detik menunggu request lain untuk digabung ke satu batch
+LATENCY_WINDOW = 500  # jumlah latency terakhir yang disimpan untuk statistik
+
+
+class Job:
+    def __init__(self, samples, params):
+        self.samples = samples
+        self.params = params  # max_tokens, temperature, do_sample, [num_return_sequences, input_budget]
+        self.enqueued_at = time.perf_counter()
+        self.started_at = None
+        self.done = threading.Event()
+        self.outputs = None
+        self.error = None
+
+
+class GenerationServer:
+    """Menyimpan model di memori dan melayani request generate lewat antrean.
+
+    Satu worker mengambil request dari antrean dan menggabungkan beberapa
+    request (dengan parameter sampling sama) menjadi satu panggilan generate_scripts.
+    """
+
+    def __init__(self, model, tokenizer, batch_size, backend=None):
+        self.model = model
+        self.backend = backend
+        self.tokenizer = tokenizer
+        self.batch_size = batch_size
+        self.jobs = queue.Queue()
+        self.lock = threading.Lock()
+        self.queued_samples = 0
+        self.served_requests = 0
+        self.served_samples = 0
+        self.failed_requests = 0
+        self.busy_seconds = 0.0
+        self.started = time.time()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.queue_waits = deque(maxlen=LATENCY_WINDOW)
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, samples, params):
+        job = Job(samples, params)
+        with self.lock:
+            self.queued_samples += len(samples)
+        self.jobs.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise RuntimeError(job.error)
+        return job.outputs
+
+    def _collect(self):
+        first = self.jobs.get()
+        batch = [first]
+        size = len(first.samples)
+        deadline = time.perf_counter() + BATCH_WAIT
+        held = []
+        while size < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                job = self.jobs.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if job.params == first.params:
+                batch.append(job)
+                size += len(job.samples)
+            else:
+                held.append(job)
+        # Request dengan parameter berbeda dikembalikan ke antrean
+        for job in held:
+            self.jobs.put(job)
+        return batch
+
+    def _run(self):
+        from generator import generate_scripts
+
+        while True:
+            batch = self._collect()
+            samples = [sample for job in batch for sample in job.samples]
+            start = time.perf_counter()
+            for job in batch:
+                job.started_at = start
+            with self.lock:
+                self.queued_samples -= len(samples)
+
+            try:
+                outputs = generate_scripts(
+                    self.model, self.tokenizer, samples,
+                    batch_size=self.batch_size, **batch[0].params,
+                )
+                error = None
+            except Exception as e:
+                outputs, error = None, str(e)
+
+            end = time.perf_counter()
+            offset = 0
+            with self.lock:
+                self.busy_seconds += end - start
+                for job in batch:
+                    n = len(job.samples)
+                    if error is None:
+                        job.outputs = outputs[offset:offset + n]
+                        self.served_requests += 1
+                        self.served_samples += n
+                    else:
+                        job.error = error
+                        self.failed_requests += 1
+                    offset += n
+                    self.latencies.append(end - job.enqueued_at)
+                    self.queue_waits.append(job.started_at - job.enqueued_at)
+            for job in batch:
+                job.done.set()
+
+    def stats(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            waits = sorted(self.queue_waits)
+            uptime = time.time() - self.started
+            return {
+                "queue_depth": self.jobs.qsize(),
+                "queued_samples": self.queued_samples,
+                "served_requests": self.served_requests,
+                "served_samples": self.served_samples,
+                "failed_requests": self.failed_requests,
+                "utilization": round(self.busy_seconds / uptime, 3) if uptime else 0.0,
+                "latency_ms": _percentiles(latencies),
+                "queue_wait_ms": _percentiles(waits),
+                "uptime_s": round(uptime, 1),
+            }
+
+
+def _percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "max": None}
+    pick = lambda q: round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 1)
+    return {"p50": pick(0.5), "p95": pick(0.95), "max": round(values[-1] * 1000, 1)}
+
+
+def make_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(200, {"ok": True, "backend": server.backend})
+            elif self.path == "/stats":
+                self._reply(200, server.stats())
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/generate":
+                self._reply(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length))
+                samples = request["samples"]
+                params = {
+                    "max_tokens": int(request.get("max_tokens", 300)),
+                    "temperature": float(request.get("temperature", 0.5)),
+                    "do_sample": bool(request.get("do_sample", True)),
+                }
+                if int(request.get("num_return_sequences", 1)) > 1:
+                    params["num_return_sequences"] = int(request["num_return_sequences"])
+                if "input_budget" in request:
+                    # Anggaran dari klien (ikut di cache key), None = input tidak diringkas
+                    budget = request["input_budget"]
+                    params["input_budget"] = None if budget is None else int(budget)
+            except (ValueError, KeyError) as e:
+                self._reply(400, {"error": f"request tidak valid: {e}"})
+                return
+
+            start = time.perf_counter()
+            try:
+                outputs = server.submit(samples, params)
+            except RuntimeError as e:
+                self._reply(500, {"error": str(e)})
+                return
+            self._reply(200, {
+                "outputs": outputs,
+                "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            })
+
+        def log_message(self, format, *args):
+            pass  # jangan penuhi stdout dengan log akses
+
+    return Handler
+
+
+def main():
+    from generator import BACKENDS, DEFAULT_BACKEND, DEFAULT_BATCH_SIZE, load_model
+
+    parser = argparse.ArgumentParser(description="Server generate lokal yang menyimpan model di memori")
+    parser.add_argument("--backend", default=None, choices=BACKENDS)
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    print("⏳ Memuat model...")
+    backend = args.backend or DEFAULT_BACKEND
+    model, tokenizer = load_model(backend)
+    server = GenerationServer(model, tokenizer, args.batch_size, backend=backend)
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(server))
+    print(f"🚀 Model server siap di http://{args.host}:{args.port} (batch {args.batch_size})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Server dihentikan.")
+        print(json.dumps(server.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# sitecustomize.py untuk mode evaluasi offline (lihat scripts/http_mock.py).
+# Jika TRAIN_AI_MOCK_URL diset, semua HTTP keluar dari requests / httpx /
+# aiohttp / urllib diarahkan ke mock server lokal dengan URL asli di header,
+# dan resolusi DNS ke host lain langsung gagal agar tidak menunggu timeout.
+import os
+import sys
+import socket
+import importlib.util
+
+MOCK_URL_ENV = "TRAIN_AI_MOCK_URL"
+MOCK_SESSION_ENV = "TRAIN_AI_MOCK_SESSION"
+ORIGINAL_URL_HEADER = "X-Mock-Original-Url"
+SESSION_HEADER = "X-Mock-Session"
+LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+
+
+def _mock_headers(original_url):
+    return {ORIGINAL_URL_HEADER: str(original_url), SESSION_HEADER: os.environ.get(MOCK_SESSION_ENV, "")}
+
+
+def _mock_url():
+    return os.environ[MOCK_URL_ENV].rstrip("/") + "/"
+
+
+def _patch_requests(requests):
+    adapter = requests.adapters.HTTPAdapter
+    original_send = adapter.send
+    if getattr(original_send, "_mocked", False):
+        return
+
+    def send(self, request, *args, **kwargs):
+        request.headers.update(_mock_headers(request.url))
+        request.url = _mock_url()
+        kwargs["proxies"] = {}
+        return original_send(self, request, *args, **kwargs)
+
+    send._mocked = True
+    adapter.send = send
+
+
+def _patch_httpx(httpx):
+    for cls, name in ((httpx.HTTPTransport, "handle_request"), (httpx.AsyncHTTPTransport, "handle_async_request")):
+        original = getattr(cls, name)
+        if getattr(original, "_mocked", False):
+            continue
+
+        def make(original):
+            def handle(self, request):
+                for key, value in _mock_headers(request.url).items():
+                    request.headers[key] = value
+                request.url = httpx.URL(_mock_url())
+                return original(self, request)
+            handle._mocked = True
+            return handle
+
+        setattr(cls, name, make(original))
+
+
+def _patch_aiohttp(aiohttp):
+    session = aiohttp.ClientSession
+    original_request = session._request
+    if getattr(original_request, "_mocked", False):
+        return
+
+    def _request(self, method, str_or_url, **kwargs):
+        headers = dict(kwargs.get("headers") or {})
+        headers.update(_mock_headers(str_or_url))
+        kwargs["headers"] = headers
+        kwargs.pop("proxy", None)
+        return original_request(self, method, _mock_url(), **kwargs)
+
+    _request._mocked = True
+    session._request = _request
+
+
+def _patch_urllib(urllib_request):
+    opener = urllib_request.OpenerDirector
+    original_open = opener.open
+    if getattr(original_open, "_mocked", False):
+        return
+
+    def open_(self, fullurl, data=None, *args, **kwargs):
+        if isinstance(fullurl, str):
+            fullurl = urllib_request.Request(fullurl, data=data)
+        if fullurl.host not in LOCAL_HOSTS and fullurl.host.split(":")[0] not in LOCAL_HOSTS:
+            for key, value in _mock_headers(fullurl.full_url).items():
+                fullurl.add_header(key, value)
+            fullurl.full_url = _mock_url()
+        return original_open(self, fullurl, data, *args, **kwargs)
+
+    open_._mocked = True
+    opener.open = open_
+
+
+_PATCHERS = {
+    "requests": _patch_requests,
+    "httpx": _patch_httpx,
+    "aiohttp": _patch_aiohttp,
+    "urllib.request": _patch_urllib,
+}
+
+
+class _PostImportPatcher:
+    """Meta path finder: jalankan patcher setelah modul target selesai diimpor."""
+
+    def __init__(self):
+        self._busy = set()
+
+    def find_spec(self, name, path=None, target=None):
+        if name not in _PATCHERS or name in self._busy:
+            return None
+        self._busy.add(name)
+        try:
+            spec = importlib.util.find_spec(name)
+        finally:
+            self._busy.discard(name)
+        if spec is None or spec.loader is None or not hasattr(spec.loader, "exec_module"):
+            return spec
+
+        loader = spec.loader
+        original_exec = loader.exec_module
+
+        def exec_module(module):
+            original_exec(module)
+            try:
+                _PATCHERS[name](module)
+            except AttributeError:
+                pass  # versi library tidak dikenal; DNS tetap diblokir
+
+        loader.exec_module = exec_module
+        return spec
+
+
+def _block_dns():
+    original_getaddrinfo = socket.getaddrinfo
+    if getattr(original_getaddrinfo, "_mocked", False):
+        return
+
+    def getaddrinfo(host, *args, **kwargs):
+        name = host.decode() if isinstance(host, bytes) else host
+        if name is not None and name not in LOCAL_HOSTS:
+            raise socket.gaierror(socket.EAI_NONAME, f"Offline mode: host '{name}' diblokir")
+        return original_getaddrinfo(host, *args, **kwargs)
+
+    getaddrinfo._mocked = True
+    socket.getaddrinfo = getaddrinfo
+
+
+def install():
+    if not os.environ.get(MOCK_URL_ENV):
+        return
+    _block_dns()
+    for name, patch in _PATCHERS.items():
+        module = sys.modules.get(name)
+        if module is not None:
+            try:
+                patch(module)
+            except AttributeError:
+                pass  # versi library tidak dikenal; DNS tetap diblokir
+    if not any(isinstance(f, _PostImportPatcher) for f in sys.meta_path):
+        sys.meta_path.insert(0, _PostImportPatcher())
+
+
+install()
@@ -1,50 +1,503 @@
-import json
+# parser_har.py
+# Ubah capture HAR (DevTools / proxy) menjadi sample dataset. File dibaca
+# lewat mmap dan dipindai tanpa json.load seluruh file: setiap item
+# log.entries[] di-parse satu per satu, dan body response (content.text,
+# biasanya bagian terbesar capture) dilompati tanpa pernah disalin. Filter
+# method/host/MIME diterapkan per entry. Request yang sama bentuknya
+# (method, host, template path, nama header, bentuk body) digabung menjadi
+# satu sample perwakilan dengan `count`, dan nilai panjang/rahasia di header
+# dan body diringkas ke anggaran token.
 import os
+import re
+import sys
+import json
+import mmap
 import uuid
+import shutil
+import hashlib
+import argparse
+import tempfile
+from urllib.parse import urlparse, urlsplit, parse_qsl
+from concurrent.futures import ProcessPoolExecutor
+
+from prompts import estimate_tokens, truncate_text, elide_json
+
+DATASET_PATH = "data/dataset.jsonl"
+INSTRUCTION = "Buatkan script Python menggunakan modul requests berdasarkan permintaan HTTP berikut."
+# Path (relatif ke satu entry) yang nilainya dilompati dan diganti null
+SKIP_PATHS = {("response", "content", "text")}
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# Clustering request: header yang ada/tidaknya berubah-ubah tidak ikut membedakan
+VOLATILE_HEADERS = {"content-length", "cookie", "if-none-match", "if-modified-since", "cache-control", "pragma"}
+SHAPE_VALUE_KEYS = {"method", "operationName"}  # JSON-RPC / GraphQL: nilainya menentukan operasi
+# Anggaran token untuk nilai di input sample
+HEADER_VALUE_TOKENS = 32
+BODY_TOKENS = 256
+
+_SEGMENT_TEMPLATES = [
+    (re.compile(r"^0x[0-9a-fA-F]{40}$"), "{address}"),
+    (re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"), "{uuid}"),
+    (re.compile(r"^\d+$"), "{int}"),
+    (re.compile(r"^(?:0x)?[0-9a-fA-F]{12,}$"), "{hex}"),
+    (re.compile(r"^(?=.*\d)[A-Za-z0-9_\-.=~]{20,}$"), "{token}"),
+]
+_SECRET_HEADER_RE = re.compile(r"auth|token|api[-_]?key|secret|cookie|session|signature|csrf", re.IGNORECASE)
+
+_STRUCTURE_RE = re.compile(rb'["{}\[\]]')
+_STRING_END_RE = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_COLON_RE = re.compile(rb"\s*:\s*")
+_SPACE_RE = re.compile(rb"[\s,]*")
+_SCALAR_END_RE = re.compile(rb"[^,}\]\s]*")
+
+
+class HarFormatError(ValueError):
+    pass
+
+
+def _string_end(buf, pos):
+    """`pos` tepat setelah tanda kutip pembuka; kembalikan posisi setelah kutip penutup."""
+    match = _STRING_END_RE.match(buf, pos)
+    if match is None:
+        raise HarFormatError(f"String tidak ditutup di byte {pos}")
+    return match.end()
+
+
+def _value_end(buf, pos):
+    """Posisi setelah nilai JSON yang dimulai di `pos` (tanpa mem-parse isinya)."""
+    first = buf[pos:pos + 1]
+    if first == b'"':
+        return _string_end(buf, pos + 1)
+    if first not in (b"{", b"["):
+        return _SCALAR_END_RE.match(buf, pos).end()
+    depth = 0
+    while True:
+        match = _STRUCTURE_RE.search(buf, pos)
+        if match is None:
+            raise HarFormatError("Objek/array tidak ditutup")
+        char = match.group()
+        pos = match.end()
+        if char == b'"':
+            pos = _string_end(buf, pos)
+        elif char in (b"{", b"["):
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return pos
+
+
+def _read_entry(buf, start, skip_paths):
+    """Parse objek entry yang dimulai di `start`; nilai di `skip_paths` diganti null. -> (dict, posisi akhir)."""
+    pieces = []
+    piece_start = start
+    pos = start
+    # Tumpukan kontainer: [jenis, key saat ini]; path entry = key di tiap level objek
+    stack = []
+    while True:
+        match = _STRUCTURE_RE.search(buf, pos)
+        if match is None:
+            raise HarFormatError("Entry tidak ditutup")
+        char = match.group()
+        pos = match.end()
+        if char == b'"':
+            end = _string_end(buf, pos)
+            colon = _COLON_RE.match(buf, end)
+            if colon is not None and stack and stack[-1][0] == b"{":
+                stack[-1][1] = buf[pos:end - 1].decode("utf-8", "replace")
+                path = tuple(frame[1] for frame in stack if frame[0] == b"{")
+                if path in skip_paths:
+                    pieces.append(buf[piece_start:colon.end()])
+                    pieces.append(b"null")
+                    pos = piece_start = _value_end(buf, colon.end())
+                    continue
+            pos = end
+        elif char in (b"{", b"["):
+            stack.append([char, None])
+        else:
+            stack.pop()
+            if not stack:
+                pieces.append(buf[piece_start:pos])
+                return json.loads(b"".join(pieces)), pos
+
+
+def _find_entries(buf):
+    """Posisi setelah '[' dari log.entries."""
+    pos = 0
+    stack = []
+    while True:
+        match = _STRUCTURE_RE.search(buf, pos)
+        if match is None:
+            raise HarFormatError("log.entries tidak ditemukan")
+        char = match.group()
+        pos = match.end()
+        if char == b'"':
+            end = _string_end(buf, pos)
+            colon = _COLON_RE.match(buf, end)
+            if colon is not None and stack and stack[-1][0] == b"{":
+                key = buf[pos:end - 1].decode("utf-8", "replace")
+                stack[-1][1] = key
+                value = colon.end()
+                path = [frame[1] for frame in stack]
+                if path == ["log", "entries"] and buf[value:value + 1] == b"[":
+                    return value + 1
+                if len(stack) >= 2 or (len(stack) == 1 and key != "log"):
+                    # Bukan jalan menuju log.entries: lompati nilainya sekaligus
+                    pos = _value_end(buf, value)
+                    continue
+            pos = end
+        elif char in (b"{", b"["):
+            stack.append([char, None])
+        else:
+            stack.pop()
+
+
+def iter_har_entries(har_path, skip_paths=SKIP_PATHS):
+    """Yield item log.entries[] satu per satu (body response tidak ikut dibaca)."""
+    with open(har_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            pos = _find_entries(buf)
+            while True:
+                pos = _SPACE_RE.match(buf, pos).end()
+                first = buf[pos:pos + 1]
+                if first == b"]" or not first:
+                    return
+                if first != b"{":
+                    pos = _value_end(buf, pos)  # bukan objek: abaikan
+                    continue
+                entry, pos = _read_entry(buf, pos, skip_paths)
+                yield entry
+
+
+def entry_matches(entry, methods=None, hosts=None, mime_types=None):
+    """Filter per entry: method request, host (termasuk subdomain), MIME type response."""
+    req = entry.get("request") or {}
+    if methods and req.get("method", "GET").upper() not in methods:
+        return False
+    if hosts:
+        host = (urlparse(req.get("url", "")).hostname or "").lower()
+        if not any(host == h or host.endswith("." + h) for h in hosts):
+            return False
+    if mime_types:
+        content = (entry.get("response") or {}).get("content") or {}
+        mime = (content.get("mimeType") or "").split(";")[0].strip().lower()
+        if not any(mime.startswith(m) for m in mime_types):
+            return False
+    return True
+
+
+def _path_template(path):
+    segments = []
+    for segment in path.split("/"):
+        for pattern, placeholder in _SEGMENT_TEMPLATES:
+            if pattern.match(segment):
+                segment = placeholder
+                break
+        segments.append(segment)
+    return "/".join(segments)
+
+
+def _shape(value, key=None):
+    """Bentuk JSON: nama key + tipe nilai. Nilai key seperti `method` (JSON-RPC) ikut karena menentukan operasinya."""
+    if isinstance(value, dict):
+        return {k: _shape(v, k) for k, v in sorted(value.items())}
+    if isinstance(value, list):
+        return [_shape(value[0])] if value else []
+    if isinstance(value, str):
+        return f"string:{value}" if key in SHAPE_VALUE_KEYS else "string"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        return "number"
+    return "null"
+
+
+def _body_shape(req):
+    post = req.get("postData") or {}
+    text = post.get("text") or ""
+    mime = (post.get("mimeType") or "").split(";")[0].strip().lower()
+    if not text:
+        params = post.get("params") or []
+        return ["form", sorted({p.get("name", "") for p in params})] if params else None
+    try:
+        return ["json", _shape(json.loads(text))]
+    except ValueError:
+        pass
+    pairs = parse_qsl(text, keep_blank_values=True)
+    if pairs and "form" in mime:
+        return ["form", sorted({name for name, _ in pairs})]
+    return ["raw", mime]
+
+
+def canonical_request(entry):
+    """Bentuk kanonik request: method, host, template path, nama query, nama header, bentuk body.
+
+    Request yang hanya berbeda nonce, timestamp, token, atau ID di path jatuh
+    ke bentuk yang sama.
+    """
+    req = entry.get("request") or {}
+    url = urlsplit(req.get("url", ""))
+    header_names = {
+        (h.get("name") or "").lower() for h in req.get("headers", [])
+    }
+    return [
+        req.get("method", "GET").upper(),
+        (url.hostname or "").lower(),
+        _path_template(url.path),
+        sorted({name for name, _ in parse_qsl(url.query, keep_blank_values=True)}),
+        sorted(name for name in header_names if name and not name.startswith(":") and name not in VOLATILE_HEADERS),
+        _body_shape(req),
+    ]
+
+
+def cluster_key(entry):
+    canonical = json.dumps(canonical_request(entry), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def _placeholder_header(name, value):
+    if name.lower() in ("cookie", "set-cookie"):
+        return "; ".join(f"{part.split('=', 1)[0].strip()}=<value>" for part in value.split(";") if part.strip())
+    scheme, _, rest = value.partition(" ")
+    if rest and scheme.lower() in ("bearer", "basic", "token", "digest"):
+        return f"{scheme} <token>"
+    return "<token>"
 
-def parse_har_file(har_path):
-    with open(har_path, "r", encoding="utf-8") as f:
-        har_data = json.load(f)
-
-    entries = har_data.get("log", {}).get("entries", [])
-    parsed = []
-
-    for entry in entries:
-        req = entry.get("request", {})
-        method = req.get("method", "GET")
-        url = req.get("url", "")
-        headers = {h["name"]: h["value"] for h in req.get("headers", [])}
-        post_data = req.get("postData", {}).get("text", "")
-
-        # Buat input untuk AI
-        input_text = f"[{method}] {url}\nHeaders:\n"
-        input_text += "\n".join([f"{k}: {v}" for k, v in headers.items()])
-        if post_data:
-            input_text += f"\n\nBody:\n{post_data}"
-
-        data = {
-            "id": str(uuid.uuid4()),
-            "instruction": "Buatkan script Python menggunakan modul requests berdasarkan permintaan HTTP berikut.",
-            "input": input_text,
-            "output": ""  # nanti diisi AI
-        }
-        parsed.append(data)
-
-    return parsed
-
-def save_dataset(parsed_data, output_file="data/dataset.jsonl"):
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+
+def compact_headers(headers, value_tokens=HEADER_VALUE_TOKENS):
+    """Nilai rahasia (token, cookie) jadi placeholder; nilai panjang dipotong ke `value_tokens`."""
+    compacted = {}
+    for name, value in headers.items():
+        if _SECRET_HEADER_RE.search(name):
+            value = _placeholder_header(name, value)
+        elif value_tokens is not None and estimate_tokens(value) > value_tokens:
+            value = truncate_text(value, value_tokens)
+        compacted[name] = value
+    return compacted
+
+
+def compact_body(text, body_tokens=BODY_TOKENS, value_tokens=HEADER_VALUE_TOKENS):
+    """Body dalam anggaran token dibiarkan; JSON yang terlalu besar diringkas bentuknya, sisanya dipotong."""
+    if body_tokens is None or estimate_tokens(text) <= body_tokens:
+        return text
+    try:
+        text = json.dumps(elide_json(json.loads(text), value_tokens), ensure_ascii=False)
+    except ValueError:
+        pass
+    return truncate_text(text, body_tokens)
+
+
+def entry_to_sample(entry, value_tokens=HEADER_VALUE_TOKENS, body_tokens=BODY_TOKENS):
+    """Sample dataset dari satu entry; `None` untuk anggaran berarti nilai tidak diringkas."""
+    req = entry.get("request", {})
+    method = req.get("method", "GET")
+    url = req.get("url", "")
+    headers = {h["name"]: h["value"] for h in req.get("headers", [])}
+    post_data = (req.get("postData") or {}).get("text", "")
+    if value_tokens is not None:
+        headers = compact_headers(headers, value_tokens)
+    if post_data:
+        post_data = compact_body(post_data, body_tokens, value_tokens or HEADER_VALUE_TOKENS)
+
+    # Buat input untuk AI
+    input_text = f"[{method}] {url}\nHeaders:\n"
+    input_text += "\n".join([f"{k}: {v}" for k, v in headers.items()])
+    if post_data:
+        input_text += f"\n\nBody:\n{post_data}"
+
+    return {
+        "id": str(uuid.uuid4()),
+        "instruction": INSTRUCTION,
+        "input": input_text,
+        "output": ""  # nanti diisi AI
+    }
+
+
+class RequestClusters:
+    """Satu sample perwakilan per bentuk kanonik request (urutan kemunculan pertama) + jumlah anggotanya."""
+
+    def __init__(self):
+        self.clusters = {}
+        self.entries = 0
+
+    def add(self, entry):
+        self.entries += 1
+        key = cluster_key(entry)
+        sample = self.clusters.get(key)
+        if sample is None:
+            self.clusters[key] = dict(entry_to_sample(entry), cluster=key, count=1)
+        else:
+            sample["count"] += 1
+
+    def merge(self, other):
+        # Perwakilan dari `self` (file lebih awal) dipertahankan
+        self.entries += other.entries
+        for key, sample in other.clusters.items():
+            if key in self.clusters:
+                self.clusters[key]["count"] += sample["count"]
+            else:
+                self.clusters[key] = sample
+
+
+def _normalize_filters(methods=None, hosts=None, mime_types=None):
+    return (
+        {m.upper() for m in methods} if methods else None,
+        [h.lower().lstrip(".") for h in hosts] if hosts else None,
+        [m.lower() for m in mime_types] if mime_types else None,
+    )
+
+
+def parse_har_file(har_path, methods=None, hosts=None, mime_types=None):
+    """Yield sample dataset untuk setiap entry yang lolos filter (tanpa clustering)."""
+    methods, hosts, mime_types = _normalize_filters(methods, hosts, mime_types)
+    for entry in iter_har_entries(har_path):
+        if entry_matches(entry, methods, hosts, mime_types):
+            yield entry_to_sample(entry)
+
+
+def cluster_har_file(har_path, methods=None, hosts=None, mime_types=None, clusters=None):
+    """Kelompokkan entry yang lolos filter ke `clusters` (RequestClusters)."""
+    clusters = clusters if clusters is not None else RequestClusters()
+    methods, hosts, mime_types = _normalize_filters(methods, hosts, mime_types)
+    for entry in iter_har_entries(har_path):
+        if entry_matches(entry, methods, hosts, mime_types):
+            clusters.add(entry)
+    return clusters
+
+
+def save_dataset(parsed_data, output_file=DATASET_PATH):
+    """Tulis sample (list atau generator) satu per satu; kembalikan jumlahnya."""
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    count = 0
     with open(output_file, "a", encoding="utf-8") as f:
         for item in parsed_data:
             f.write(json.dumps(item) + "\n")
+            count += 1
+    return count
+
+
+def existing_clusters(output_file=DATASET_PATH):
+    """Key cluster yang sudah ada di dataset (dari import sebelumnya)."""
+    keys = set()
+    if not os.path.exists(output_file):
+        return keys
+    with open(output_file, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                key = json.loads(line).get("cluster")
+            except (ValueError, AttributeError):
+                continue
+            if key:
+                keys.add(key)
+    return keys
+
+
+def _import_file(task):
+    # Worker: satu file HAR -> RequestClusters, atau file JSONL sementara
+    # jika tanpa clustering. Capture yang terpotong (browser crash) tetap
+    # menyumbang entry yang sudah lengkap.
+    har_path, tmp_path, filters, cluster = task
+    result = RequestClusters() if cluster else 0
+    try:
+        if cluster:
+            cluster_har_file(har_path, *filters, clusters=result)
+        else:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for item in parse_har_file(har_path, *filters):
+                    f.write(json.dumps(item) + "\n")
+                    result += 1
+    except (OSError, ValueError) as e:
+        return result, str(e)
+    return result, None
+
+
+def import_har(har_files, output_file=DATASET_PATH, workers=DEFAULT_WORKERS, methods=None, hosts=None,
+               mime_types=None, cluster=True):
+    """Import satu atau banyak file HAR (process pool jika lebih dari satu) ke `output_file`.
+
+    Dengan `cluster`, hanya satu perwakilan per bentuk request yang ditulis
+    (dengan `count`), dan cluster yang sudah ada di dataset dilewati. Hasil
+    digabung sesuai urutan file, jadi sama dengan memproses file satu per satu.
+    """
+    filters = (methods, hosts, mime_types)
+    merged = RequestClusters()
+    stats = {"files": len(har_files), "entries": 0, "clusters": 0, "existing": 0, "written": 0}
+    tmp_dir = tempfile.mkdtemp(prefix="har_")
+    try:
+        tasks = [(path, os.path.join(tmp_dir, f"{i:05d}.jsonl"), filters, cluster) for i, path in enumerate(har_files)]
+        if len(tasks) > 1 and workers > 1:
+            pool = ProcessPoolExecutor(max_workers=min(workers, len(tasks)))
+            results = pool.map(_import_file, tasks)
+        else:
+            pool = None
+            results = map(_import_file, tasks)
+        try:
+            for (path, tmp_path, _, _), (result, error) in zip(tasks, results):
+                entries = result.entries if cluster else result
+                if error:
+                    print(f"⚠️ {path}: {error} ({entries} request sebelum error tetap dipakai)")
+                print(f"   - {os.path.basename(path)}: {entries} request")
+                stats["entries"] += entries
+                if cluster:
+                    merged.merge(result)
+                elif os.path.exists(tmp_path):
+                    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+                    with open(tmp_path, "rb") as src, open(output_file, "ab") as dst:
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+                    stats["written"] += entries
+        finally:
+            if pool is not None:
+                pool.shutdown()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if cluster:
+        known = existing_clusters(output_file)
+        stats["clusters"] = len(merged.clusters)
+        stats["existing"] = sum(1 for key in merged.clusters if key in known)
+        stats["written"] = save_dataset(
+            (sample for key, sample in merged.clusters.items() if key not in known), output_file
+        )
+    stats["avoided"] = stats["entries"] - stats["written"]
+    return stats
+
+
+def parse_har_directory(directory, output_file=DATASET_PATH, workers=DEFAULT_WORKERS, methods=None, hosts=None,
+                        mime_types=None, cluster=True):
+    """Import semua *.har di `directory` (urut nama file)."""
+    har_files = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory) if name.lower().endswith(".har")
+    )
+    return import_har(har_files, output_file, workers, methods, hosts, mime_types, cluster)
+
+
+def print_import_stats(stats, output_file):
+    print(f"✅ {stats['written']} sample disimpan ke {output_file}")
+    print(f"   - Request dibaca      : {stats['entries']} dari {stats['files']} file")
+    if stats["clusters"]:
+        print(f"   - Cluster request     : {stats['clusters']} ({stats['existing']} sudah ada di dataset)")
+    print(f"   - Generate dihindari  : {stats['avoided']} panggilan generate + evaluasi")
+
 
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) < 2:
-        print("Usage: python parse_har.py yourfile.har")
-        exit(1)
-
-    har_file = sys.argv[1]
-    dataset = parse_har_file(har_file)
-    save_dataset(dataset)
-    print(f"✅ {len(dataset)} request disimpan ke dataset.jsonl")
+    parser = argparse.ArgumentParser(description="Ubah file HAR (atau folder berisi *.har) menjadi dataset.jsonl")
+    parser.add_argument("path", help="file .har atau folder")
+    parser.add_argument("--output", default=DATASET_PATH)
+    parser.add_argument("--method", action="append", help="hanya method ini (bisa diulang), mis. --method POST")
+    parser.add_argument("--host", action="append", help="hanya host ini beserta subdomainnya")
+    parser.add_argument("--mime", action="append", help="hanya response dengan MIME ini, mis. application/json")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--no-cluster", action="store_true", help="simpan setiap request (tanpa dedup per bentuk request)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"❌ Tidak ditemukan: {args.path}")
+        sys.exit(1)
+    filters = (args.method, args.host, args.mime)
+    if os.path.isdir(args.path):
+        stats = parse_har_directory(args.path, args.output, args.workers, *filters, cluster=not args.no_cluster)
+    else:
+        stats = import_har([args.path], args.output, args.workers, *filters, cluster=not args.no_cluster)
+    print_import_stats(stats, args.output)
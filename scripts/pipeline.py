@@ -0,0 +1,155 @@
+# pipeline.py
+# Pipeline bertahap dengan antrean terbatas: tiap stage punya worker sendiri,
+# dan antrean penuh menahan stage sebelumnya (backpressure).
+import time
+import queue
+import threading
+
+_DONE = object()  # sentinel akhir aliran
+
+
+class Stage:
+    """Satu tahap pipeline.
+
+    `fn(item)` (atau `fn(list_item)` jika batch_size > 1) mengembalikan
+    iterable hasil yang diteruskan ke stage berikutnya; kosong berarti item
+    berhenti di stage ini. Jika `fn` melempar exception, `on_error(items, e)`
+    (items selalu list) mengembalikan hasil pengganti agar item tidak hilang;
+    tanpa `on_error` item dibuang.
+    """
+
+    def __init__(self, name, fn, workers=1, batch_size=1, queue_size=16, on_error=None):
+        self.name = name
+        self.fn = fn
+        self.on_error = on_error
+        self.workers = workers
+        self.batch_size = batch_size
+        self.inbox = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.busy_seconds = 0.0
+        self.queue_wait_seconds = 0.0
+        self.blocked_seconds = 0.0  # waktu menunggu antrean stage berikutnya
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self._finished_workers = 0
+
+    def _take(self):
+        """Ambil satu item (atau satu batch). Kembalikan (items, selesai)."""
+        items = []
+        while len(items) < self.batch_size:
+            try:
+                entry = self.inbox.get() if not items else self.inbox.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _DONE:
+                # Kembalikan sentinel agar worker lain juga berhenti
+                self.inbox.put(_DONE)
+                return items, True
+            enqueued_at, item = entry
+            with self.lock:
+                self.queue_wait_seconds += time.perf_counter() - enqueued_at
+            items.append(item)
+        return items, False
+
+
+class Pipeline:
+    def __init__(self):
+        self.stages = []
+        self.started = None
+        self.finished = None
+
+    def add(self, name, fn, workers=1, batch_size=1, queue_size=16, on_error=None):
+        self.stages.append(Stage(name, fn, workers, batch_size, queue_size, on_error))
+        return self
+
+    def _emit(self, index, item):
+        # Item yang keluar dari stage terakhir dibuang
+        if index + 1 < len(self.stages):
+            target = self.stages[index + 1]
+            start = time.perf_counter()
+            target.inbox.put((time.perf_counter(), item))
+            with self.stages[index].lock:
+                self.stages[index].blocked_seconds += time.perf_counter() - start
+
+    def _worker(self, index):
+        stage = self.stages[index]
+        while True:
+            items, done = stage._take()
+            if items:
+                start = time.perf_counter()
+                try:
+                    results = list(stage.fn(items if stage.batch_size > 1 else items[0]))
+                except Exception as e:
+                    print(f"🚨 Stage {stage.name} error: {e}")
+                    results = list(stage.on_error(items, e)) if stage.on_error is not None else []
+                    with stage.lock:
+                        stage.errors += 1
+                with stage.lock:
+                    stage.busy_seconds += time.perf_counter() - start
+                    stage.items_in += len(items)
+                    stage.items_out += len(results)
+                for result in results:
+                    self._emit(index, result)
+            if done:
+                break
+
+        with stage.lock:
+            stage._finished_workers += 1
+            last = stage._finished_workers == stage.workers
+        if last and index + 1 < len(self.stages):
+            self.stages[index + 1].inbox.put(_DONE)
+
+    def run(self, source):
+        """Jalankan pipeline sampai `source` habis dan semua stage selesai."""
+        self.started = time.perf_counter()
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                t = threading.Thread(target=self._worker, args=(index,), name=f"{stage.name}-{n}", daemon=True)
+                t.start()
+                threads.append(t)
+
+        # Loader: isi antrean stage pertama (memblok jika penuh)
+        first = self.stages[0]
+        load_blocked = 0.0
+        for item in source:
+            start = time.perf_counter()
+            first.inbox.put((time.perf_counter(), item))
+            load_blocked += time.perf_counter() - start
+        first.inbox.put(_DONE)
+
+        for t in threads:
+            t.join()
+        self.finished = time.perf_counter()
+        self.loader_blocked_seconds = load_blocked
+        return self.stats()
+
+    def stats(self):
+        wall = (self.finished or time.perf_counter()) - self.started
+        result = {"wall_seconds": round(wall, 2), "loader_blocked_seconds": round(getattr(self, "loader_blocked_seconds", 0.0), 2)}
+        for stage in self.stages:
+            capacity = wall * stage.workers
+            result[stage.name] = {
+                "workers": stage.workers,
+                "items_in": stage.items_in,
+                "items_out": stage.items_out,
+                "errors": stage.errors,
+                "utilization": round(stage.busy_seconds / capacity, 3) if capacity else 0.0,
+                "avg_queue_wait_ms": round(stage.queue_wait_seconds / stage.items_in * 1000, 1) if stage.items_in else 0.0,
+                "blocked_seconds": round(stage.blocked_seconds, 2),
+            }
+        return result
+
+
+def print_stats(stats):
+    print(f"⏱️  Pipeline: {stats['wall_seconds']}s (loader tertahan {stats['loader_blocked_seconds']}s)")
+    for name, s in stats.items():
+        if not isinstance(s, dict):
+            continue
+        print(
+            f"   - {name:<10} x{s['workers']}: util {s['utilization'] * 100:5.1f}% | "
+            f"antre rata-rata {s['avg_queue_wait_ms']:8.1f} ms | "
+            f"tertahan {s['blocked_seconds']:6.2f}s | in {s['items_in']} / out {s['items_out']}"
+            + (f" | error {s['errors']}" if s["errors"] else "")
+        )
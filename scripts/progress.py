@@ -0,0 +1,197 @@
+# progress.py
+# Jurnal progres tahan crash untuk loop self-training. Tiap sample dikenali
+# dari kunci yang diturunkan dari isinya (instruction + input), jadi sample
+# tanpa `id` tetap dikenali antar run.
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+JOURNAL_PATH = "data/progress.sqlite"
+MAX_STORED_OUTPUT = 20000  # potong stdout/stderr panjang di hasil evaluasi
+FINAL_STATUSES = ("success", "legacy")  # `done` dengan status lain dibuka lagi di run berikutnya
+
+
+def sample_key(sample):
+    content = sample.get("instruction", "") + "\0" + sample.get("input", "")
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def ensure_id(sample):
+    """Beri `id` stabil (kunci konten) jika sample belum punya."""
+    key = sample_key(sample)
+    if "id" not in sample:
+        sample["id"] = key
+    return key
+
+
+def compact_eval(result):
+    """Hasil evaluasi yang cukup kecil untuk disimpan di jurnal."""
+    compact = dict(result)
+    for field in ("stdout", "stderr"):
+        if isinstance(compact.get(field), str):
+            compact[field] = compact[field][-MAX_STORED_OUTPUT:]
+    compact.pop("http_log", None)
+    return compact
+
+
+class ProgressJournal:
+    """Tahap terakhir yang selesai per sample, disimpan di SQLite (WAL).
+
+    Setiap `record` langsung di-commit (`record_many`: satu transaksi untuk
+    satu batch) sehingga run yang terhenti bisa dilanjutkan dari tahap
+    terakhir tanpa membaca ulang seluruh riwayat.
+    `done` hanya berlaku selama satu run: run baru (`begin_run` setelah
+    `end_run`) mencoba lagi semua sample yang belum sukses.
+    """
+
+    def __init__(self, path=JOURNAL_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS progress ("
+                " key TEXT PRIMARY KEY, stage TEXT NOT NULL, result TEXT, updated REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT stage, result FROM progress WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None, None
+        return row[0], json.loads(row[1]) if row[1] else None
+
+    def record(self, key, stage, result=None):
+        self.record_many([(key, stage, result)])
+
+    def record_many(self, entries):
+        """Catat banyak (kunci, tahap, hasil) dalam satu transaksi."""
+        now = time.time()
+        rows = [
+            (key, stage, json.dumps(result, ensure_ascii=False) if result is not None else None, now)
+            for key, stage, result in entries
+        ]
+        if not rows:
+            return
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO progress (key, stage, result, updated) VALUES (?, ?, ?, ?)", rows
+            )
+
+    def begin_run(self):
+        """Offset dataset untuk mulai membaca.
+
+        Jika run sebelumnya terhenti, lanjutkan dari offset terakhirnya. Jika
+        sudah selesai, mulai run baru dari awal dan buka lagi sample `done`
+        yang tidak sukses (gagal/ditolak) agar di-generate ulang.
+        """
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT value FROM meta WHERE name = 'run_offset'").fetchone()
+            if row is not None:
+                return int(row[0])
+            placeholders = ", ".join("?" * len(FINAL_STATUSES))
+            self.conn.execute(
+                "DELETE FROM progress WHERE stage = 'done'"
+                f" AND COALESCE(json_extract(result, '$.status'), '') NOT IN ({placeholders})",
+                FINAL_STATUSES,
+            )
+            self.conn.execute("INSERT INTO meta (name, value) VALUES ('run_offset', '0')")
+        return 0
+
+    def advance(self, offset):
+        """Semua baris dataset sebelum `offset` sudah selesai di run ini."""
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('run_offset', ?)", (str(offset),))
+
+    def end_run(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM meta WHERE name = 'run_offset'")
+
+    def import_legacy(self, generated_path):
+        """Sekali saja: tandai sample di generated.jsonl lama sebagai selesai."""
+        with self.lock:
+            done = self.conn.execute("SELECT value FROM meta WHERE name = 'legacy_import'").fetchone()
+        if done or not os.path.exists(generated_path):
+            return 0
+
+        count = 0
+        with open(generated_path, "r", encoding="utf-8") as f, self.lock, self.conn:
+            for line in f:
+                try:
+                    sample = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO progress (key, stage, result, updated) VALUES (?, 'done', ?, ?)",
+                    (sample_key(sample), json.dumps({"status": "legacy"}), time.time()),
+                )
+                count += 1
+            self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('legacy_import', ?)", (str(count),))
+        return count
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class RunCursor:
+    """Posisi baca dataset yang aman untuk melanjutkan run.
+
+    Baris dibaca berurutan tapi selesai tidak berurutan (batch, evaluasi
+    paralel, retry). Offset di jurnal hanya maju sampai akhir prefiks baris
+    yang semuanya sudah `finish`, jadi resume cukup membaca ulang baris yang
+    masih dalam proses saat berhenti, bukan seluruh dataset.
+    """
+
+    def __init__(self, journal, offset=0):
+        self.journal = journal
+        self.offset = offset
+        self.lock = threading.Lock()
+        self._ends = {}  # nomor baris -> offset akhir baris
+        self._finished = set()
+        self._next = 0
+        self._low = 0
+
+    def iter_samples(self, path):
+        """Yield (nomor, sample) mulai dari offset; baris rusak langsung dianggap selesai."""
+        if self.offset > os.path.getsize(path):
+            self.offset = 0  # dataset ditulis ulang sejak run terhenti
+        with open(path, "rb") as f:
+            f.seek(self.offset)
+            end = self.offset
+            for line in f:
+                end += len(line)
+                with self.lock:
+                    seq = self._next
+                    self._next += 1
+                    self._ends[seq] = end
+                try:
+                    sample = json.loads(line)
+                except ValueError:
+                    self.finish(seq)
+                    continue
+                yield seq, sample
+
+    def finish(self, seq):
+        self.finish_many([seq])
+
+    def finish_many(self, seqs):
+        """Tandai beberapa baris selesai; offset baru dicatat sekali."""
+        with self.lock:
+            self._finished.update(seqs)
+            moved = False
+            while self._low in self._finished:
+                self._finished.remove(self._low)
+                self.offset = self._ends.pop(self._low)
+                self._low += 1
+                moved = True
+            if moved:
+                self.journal.advance(self.offset)
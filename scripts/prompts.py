@@ -0,0 +1,247 @@
+# prompts.py
+# Penyusunan prompt dan pembersihan output; tidak butuh torch sehingga
+# bisa dipakai klien/cache tanpa memuat model.
+import os
+import sys
+import json
+from collections import Counter
+
+from aggregates import new_moments, add_moment, mean, new_sketch, add_sketch, quantile
+
+CHARS_PER_TOKEN = 4  # perkiraan kasar untuk teks/kode campuran tanpa tokenizer
+
+# Anggaran token untuk bagian HAR (sample["input"]) di prompt; None = tanpa batas
+INPUT_TOKEN_BUDGET = int(os.environ.get("TRAIN_AI_INPUT_TOKENS", "1024")) or None
+ELIDE_VALUE_TOKENS = 32  # nilai header/string JSON lebih panjang dari ini diringkas
+MAX_LIST_ITEMS = 3  # list panjang di body JSON cukup diwakili beberapa item pertama
+# Header yang jarang dibutuhkan untuk menulis script; dibuang pertama kali saat over budget
+LOW_VALUE_HEADERS = {
+    "cookie", "user-agent", "accept-language", "accept-encoding", "referer", "origin", "priority",
+    "dnt", "connection", "cache-control", "pragma", "upgrade-insecure-requests", "te",
+}
+LOW_VALUE_PREFIXES = ("sec-",)
+PROMPT_LOG_PATH = "logs/prompt_tokens.jsonl"
+TOKEN_BUCKET = 256  # lebar bucket token prompt di laporan latensi
+
+PROMPT_PREAMBLE = (
+    "You are a Python coding assistant.\n"
+    "Generate a complete and runnable Python script based on the instruction and HAR data below.\n"
+    "Include all necessary `import` statements.\n"
+    "Only return code. Do not add any explanations or comments.\n"
+    "Use short placeholder strings for large values in headers or body (e.g., 'token123', 'sample_data').\n"
+    "Do not include actual long data.\n"
+    "Limit the script to essential logic only.\n\n"
+)
+
+
+def estimate_tokens(text):
+    """Perkiraan jumlah token tanpa memuat tokenizer."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def truncate_text(text, tokens):
+    limit = tokens * CHARS_PER_TOKEN
+    return text if len(text) <= limit else text[:limit] + "...<truncated>"
+
+
+def elide_json(value, value_tokens=ELIDE_VALUE_TOKENS):
+    """String panjang jadi "<data>", list dipotong ke MAX_LIST_ITEMS; struktur lain tetap."""
+    if isinstance(value, dict):
+        return {k: elide_json(v, value_tokens) for k, v in value.items()}
+    if isinstance(value, list):
+        return [elide_json(v, value_tokens) for v in value[:MAX_LIST_ITEMS]]
+    if isinstance(value, str) and estimate_tokens(value) > value_tokens:
+        return "<data>"
+    return value
+
+
+def summarize_json(value):
+    """Hanya key dan tipe nilai: {"a": "<string>", "b": ["<number>"]}."""
+    if isinstance(value, dict):
+        return {k: summarize_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [summarize_json(value[0])] if value else []
+    if isinstance(value, bool):
+        return "<bool>"
+    if isinstance(value, (int, float)):
+        return "<number>"
+    if isinstance(value, str):
+        return "<string>"
+    return None
+
+
+def split_input(text):
+    """Pecah input parser_har ("[METHOD] URL\nHeaders:\n...\n\nBody:\n...") jadi
+    (baris request, [(nama, nilai)], body); None jika formatnya lain."""
+    head, sep, body = text.partition("\n\nBody:\n")
+    request_line, marker, header_block = head.partition("\nHeaders:\n")
+    if not request_line.startswith("[") or not marker:
+        return None
+    headers = []
+    for line in header_block.splitlines():
+        name, _, value = line.partition(": ")
+        headers.append((name, value))
+    return request_line, headers, body if sep else None
+
+
+def join_input(request_line, headers, body):
+    text = f"{request_line}\nHeaders:\n" + "\n".join(f"{k}: {v}" for k, v in headers)
+    if body is not None:
+        text += f"\n\nBody:\n{body}"
+    return text
+
+
+def _low_value(name):
+    name = name.lower()
+    return name in LOW_VALUE_HEADERS or name.startswith(LOW_VALUE_PREFIXES)
+
+
+def _json_body(body, transform):
+    try:
+        return json.dumps(transform(json.loads(body)), ensure_ascii=False)
+    except ValueError:
+        return None
+
+
+def fit_input(text, budget=INPUT_TOKEN_BUDGET, count_tokens=estimate_tokens):
+    """Ringkas input sampai muat `budget` token; kembalikan (teks, tahap terakhir).
+
+    Tahap dijalankan berurutan dan berhenti begitu muat: buang header bernilai
+    rendah ("headers"), ringkas nilai panjang ("values"), ganti body JSON dengan
+    ringkasan key-nya ("body"), terakhir potong paksa ("truncated"). Input yang
+    sudah muat dikembalikan apa adanya (tahap None), jadi prompt-nya tidak berubah.
+    """
+    if budget is None or count_tokens(text) <= budget:
+        return text, None
+    parts = split_input(text)
+    if parts is not None:
+        request_line, headers, body = parts
+
+        headers = [(k, v) for k, v in headers if not _low_value(k)]
+        text = join_input(request_line, headers, body)
+        if count_tokens(text) <= budget:
+            return text, "headers"
+
+        headers = [
+            (k, truncate_text(v, ELIDE_VALUE_TOKENS) if estimate_tokens(v) > ELIDE_VALUE_TOKENS else v)
+            for k, v in headers
+        ]
+        if body is not None:
+            body = _json_body(body, elide_json) or body
+        text = join_input(request_line, headers, body)
+        if count_tokens(text) <= budget:
+            return text, "values"
+
+        if body is not None:
+            summary = _json_body(body, summarize_json)
+            if summary is None:
+                # Body bukan JSON: sisakan anggaran setelah request line + header
+                rest = budget - count_tokens(join_input(request_line, headers, ""))
+                summary = truncate_text(body, max(rest, 0))
+            text = join_input(request_line, headers, summary)
+            if count_tokens(text) <= budget:
+                return text, "body"
+
+    # Estimasi karakter per token bisa meleset, jadi potong ulang sampai muat
+    while True:
+        tokens = count_tokens(text)
+        if tokens <= budget:
+            return text, "truncated"
+        text = text[:max(0, len(text) * budget // tokens - 1)]
+
+
+def fit_sample(sample, budget=INPUT_TOKEN_BUDGET, count_tokens=estimate_tokens):
+    """Sample dengan input yang muat anggaran + info {input_tokens, fitted_tokens, stage}."""
+    text = sample.get("input", "")
+    input_tokens = count_tokens(text)
+    if budget is None or input_tokens <= budget:
+        return sample, {"input_tokens": input_tokens, "fitted_tokens": input_tokens, "stage": None}
+    fitted, stage = fit_input(text, budget, count_tokens)
+    info = {"input_tokens": input_tokens, "fitted_tokens": count_tokens(fitted), "stage": stage}
+    return dict(sample, input=fitted), info
+
+
+def build_prompt_suffix(sample):
+    return (
+        f"Instruction:\n{sample['instruction']}\n\n"
+        f"HAR:\n{sample['input']}\n\n"
+        f"Python Code:\n"
+    )
+
+
+def build_prompt(sample):
+    return PROMPT_PREAMBLE + build_prompt_suffix(sample)
+
+
+def clean_output(generated):
+    cleaned = generated.strip()
+
+    # 🔍 Bersihkan blok markdown ```python
+    if "```" in cleaned:
+        parts = cleaned.split("```")
+        for part in parts:
+            if "import" in part or "def " in part or "requests" in part:
+                cleaned = part.replace("python", "", 1).strip()
+                break
+
+    # 🧹 Hapus baris dengan kutip tidak seimbang atau dict tidak tertutup
+    cleaned_lines = []
+    open_brace = 0
+    for line in cleaned.splitlines():
+        if line.count('"') % 2 != 0 or line.count("'") % 2 != 0:
+            continue  # lewati jika kutip tidak seimbang
+
+        open_brace += line.count("{") - line.count("}")
+        if open_brace < 0:
+            open_brace = 0
+            continue  # lewati jika brace ditutup berlebih
+
+        cleaned_lines.append(line)
+
+    # Potong bagian akhir jika masih ada kurung kurawal terbuka
+    if open_brace != 0:
+        for i in range(len(cleaned_lines) - 1, -1, -1):
+            if "{" in cleaned_lines[i]:
+                cleaned_lines = cleaned_lines[:i]
+                break
+
+    return "\n".join(cleaned_lines)
+
+
+def prompt_token_report(path=PROMPT_LOG_PATH):
+    """Sebaran token prompt per sample dan latensi batch per bucket token (dari log generate)."""
+    if not os.path.exists(path):
+        print(f"❌ Log tidak ditemukan: {path}")
+        return None
+    tokens = new_moments()
+    sketch = new_sketch()
+    stages = Counter()
+    buckets = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue
+            add_moment(tokens, item["prompt_tokens"])
+            add_sketch(sketch, item["prompt_tokens"])
+            stages[item.get("stage") or "utuh"] += 1
+            bucket = buckets.setdefault(item["prompt_tokens"] // TOKEN_BUCKET * TOKEN_BUCKET, new_moments())
+            add_moment(bucket, item["batch_seconds"])
+    if not tokens["count"]:
+        print("⚠️ Log prompt masih kosong.")
+        return None
+
+    print(f"📏 {tokens['count']} prompt | token rata-rata {mean(tokens):.0f} | "
+          f"p50 {quantile(sketch, 0.5):.0f} | p90 {quantile(sketch, 0.9):.0f} | "
+          f"p99 {quantile(sketch, 0.99):.0f} | max {tokens['max']}")
+    print("   - Input diringkas   : " + ", ".join(f"{stage} {n}" for stage, n in stages.most_common()))
+    print("   - Latensi batch per bucket token prompt:")
+    for start in sorted(buckets):
+        bucket = buckets[start]
+        print(f"     {start:>6}-{start + TOKEN_BUCKET - 1:<6}: {bucket['count']:>6} sample | rata-rata {mean(bucket):.2f}s")
+    return {"tokens": tokens, "stages": dict(stages), "buckets": buckets}
+
+
+if __name__ == "__main__":
+    prompt_token_report(sys.argv[1] if len(sys.argv) > 1 else PROMPT_LOG_PATH)
@@ -0,0 +1,318 @@
+# rules.py
+# Rule semantik deklaratif. Rule ditulis sebagai data Python lalu dikompilasi
+# sekali saat load: semua kata kunci untuk satu teks (instruction, input,
+# identifier kode, string literal) digabung menjadi satu regex, jadi menambah
+# rule/library baru tidak menambah scan baru per script. Urutan cek diatur
+# dari statistik run sebelumnya (rule yang paling sering menolak, per biaya,
+# dicek lebih dulu), tapi alasan penolakan selalu dari rule gagal pertama
+# menurut urutan definisi. Penghitung per rule bisa diekspor.
+#
+# Format rule:
+#   {"name": ..., "reason": ..., "when": KONDISI, "require": KONDISI, "reject_if": KONDISI}
+# KONDISI berupa dict (lolos jika SALAH SATU kunci terpenuhi) atau list dict
+# (semua dict harus terpenuhi). "when" kosong = selalu berlaku. Sample ditolak
+# jika "require" tidak terpenuhi atau "reject_if" terpenuhi.
+import os
+import re
+import json
+import time
+import threading
+from urllib.parse import urlparse
+
+from code_features import extract_features
+
+RULE_STATS_PATH = "data/rule_stats.json"
+
+# Kunci "<teks>_any": daftar kata kunci yang dicari sebagai substring
+TEXT_FIELDS = {
+    "instruction": lambda sample, features: sample["instruction"].lower(),
+    "input": lambda sample, features: sample["input"].lower(),
+    "identifiers": lambda sample, features: features["identifier_text"],
+    "strings": lambda sample, features: features["strings_text"],
+    "strings_lower": lambda sample, features: features["strings_text"].lower(),
+}
+
+# Kunci lain: (sample, fitur, nilai) -> bool
+FEATURE_CONDITIONS = {
+    "imports_any": lambda s, f, v: any(name == m or name.startswith(m + ".") for m in v for name in f["imports"]),
+    "calls_any": lambda s, f, v: not f["calls"].isdisjoint(v),
+    "keywords_any": lambda s, f, v: not f["keywords"].isdisjoint(v),
+    "call_prefix_any": lambda s, f, v: not f["call_prefixes"].isdisjoint(v),
+    "starts_with_import": lambda s, f, v: f["starts_with_import"] == v,
+    "has_functions": lambda s, f, v: bool(f["functions"]) == v,
+    "has_classes": lambda s, f, v: bool(f["classes"]) == v,
+    "has_await": lambda s, f, v: f["has_await"] == v,
+    "has_pass": lambda s, f, v: f["has_pass"] == v,
+    "min_lines": lambda s, f, v: f["line_count"] >= v,
+    "max_lines": lambda s, f, v: f["line_count"] <= v,
+}
+
+_URL_RE = re.compile(r"https?://[^\s\"']+")
+
+
+def _missing_input_url(sample, features, mode):
+    """URL (atau domain-nya) dari input yang tidak ada di string literal kode; None jika semua ada."""
+    for url in _URL_RE.findall(sample["input"].lower()):
+        needle = urlparse(url).netloc if mode == "domain" else url
+        if needle not in features["strings_text"]:
+            return needle
+    return None
+
+
+def _keyword_matcher(keywords):
+    """Satu regex untuk semua kata kunci; kembalikan fungsi teks -> set kata kunci yang muncul.
+
+    Lookahead di tiap posisi menangkap kata kunci terpanjang; kata kunci lain
+    yang menjadi awalannya ditambahkan lewat tabel, jadi hasilnya sama dengan
+    `kw in text` untuk setiap kata kunci.
+    """
+    ordered = sorted(set(keywords), key=len, reverse=True)
+    pattern = re.compile("(?=(" + "|".join(re.escape(k) for k in ordered) + "))")
+    prefixes = {k: {p for p in ordered if k.startswith(p)} for k in ordered}
+
+    def match(text):
+        found = set()
+        for keyword in set(pattern.findall(text)):
+            found |= prefixes[keyword]
+        return found
+
+    return match
+
+
+class _Context:
+    """Hasil per sample yang dihitung sekali dan hanya jika dibutuhkan."""
+
+    def __init__(self, rules, sample):
+        self.rules = rules
+        self.sample = sample
+        self._features = None
+        self._hits = {}
+
+    @property
+    def features(self):
+        if self._features is None:
+            self._features = extract_features(self.sample["output"])
+        return self._features
+
+    def hits(self, field):
+        found = self._hits.get(field)
+        if found is None:
+            features = self.features if field not in ("instruction", "input") else None
+            found = self._hits[field] = self.rules.matchers[field](TEXT_FIELDS[field](self.sample, features))
+        return found
+
+
+def _compile_clause(clause, keywords):
+    """dict kondisi -> fungsi(ctx) -> (terpenuhi, detail). Salah satu kunci cukup."""
+    tests = []
+    for key, value in clause.items():
+        if key.endswith("_any") and key[:-4] in TEXT_FIELDS:
+            field = key[:-4]
+            wanted = frozenset(value)
+            keywords.setdefault(field, set()).update(wanted)
+            tests.append(lambda ctx, field=field, wanted=wanted: (not ctx.hits(field).isdisjoint(wanted), None))
+        elif key == "input_urls_in_strings":
+            def test(ctx, mode=value):
+                missing = _missing_input_url(ctx.sample, ctx.features, mode)
+                return missing is None, missing
+            tests.append(test)
+        elif key in FEATURE_CONDITIONS:
+            condition = FEATURE_CONDITIONS[key]
+            if isinstance(value, list):
+                value = frozenset(value)
+            tests.append(lambda ctx, c=condition, v=value: (c(ctx.sample, ctx.features, v), None))
+        else:
+            raise ValueError(f"Kondisi rule tidak dikenal: {key}")
+
+    def run(ctx):
+        detail = None
+        for test in tests:
+            ok, info = test(ctx)
+            if ok:
+                return True, None
+            detail = detail or info
+        return False, detail
+
+    return run
+
+
+def _compile_condition(condition, keywords):
+    """KONDISI (dict atau list dict) -> fungsi(ctx) -> (terpenuhi, detail)."""
+    if not condition:
+        return None
+    clauses = [_compile_clause(c, keywords) for c in (condition if isinstance(condition, list) else [condition])]
+
+    def run(ctx):
+        for clause in clauses:
+            ok, detail = clause(ctx)
+            if not ok:
+                return False, detail
+        return True, None
+
+    return run
+
+
+class _Rule:
+    def __init__(self, spec, keywords):
+        self.name = spec["name"]
+        self.reason = spec["reason"]
+        self.when = _compile_condition(spec.get("when"), keywords)
+        self.require = _compile_condition(spec.get("require"), keywords)
+        self.reject_if = _compile_condition(spec.get("reject_if"), keywords)
+        self.evaluated = 0
+        self.rejected = 0
+        self.seconds = 0.0
+
+    def apply(self, ctx):
+        """None jika lolos, alasan penolakan jika gagal."""
+        if self.when is not None and not self.when(ctx)[0]:
+            return None
+        if self.require is not None:
+            ok, detail = self.require(ctx)
+            if not ok:
+                return self.reason.format(detail=detail)
+        if self.reject_if is not None and self.reject_if(ctx)[0]:
+            return self.reason.format(detail=None)
+        return None
+
+
+class CompiledRules:
+    """Rule hasil kompilasi. `check(sample)` -> (lolos, alasan).
+
+    `rules` tetap dalam urutan definisi (menentukan alasan yang dilaporkan);
+    `check_order` adalah urutan cek untuk menemukan penolakan secepatnya.
+    """
+
+    def __init__(self, name, specs, stats_path=RULE_STATS_PATH):
+        self.name = name
+        keywords = {}
+        self.rules = [_Rule(spec, keywords) for spec in specs]
+        self.position = {rule: i for i, rule in enumerate(self.rules)}
+        self.matchers = {field: _keyword_matcher(words) for field, words in keywords.items()}
+        self.lock = threading.Lock()
+        self._order_by_stats(load_rule_stats(stats_path).get(name, {}))
+
+    def _order_by_stats(self, saved):
+        # Urutan filter optimal: peluang menolak / biaya rata-rata, terbesar dulu.
+        # Rule tanpa statistik tetap di urutan definisinya.
+        def priority(item):
+            index, rule = item
+            stat = saved.get(rule.name)
+            if not stat or not stat.get("evaluated"):
+                return (0, 0.0, index)
+            rate = stat["rejected"] / stat["evaluated"]
+            cost = stat["seconds"] / stat["evaluated"] or 1e-9
+            return (0, -rate / cost, index)
+
+        self.check_order = [rule for _, rule in sorted(enumerate(self.rules), key=priority)]
+
+    def check(self, sample):
+        ctx = _Context(self, sample)
+        ctx.features  # parse (di-cache) di luar timing per rule supaya biaya rule sebanding
+        timings = []
+
+        def run(rule):
+            start = time.perf_counter()
+            reason = rule.apply(ctx)
+            timings.append((rule, time.perf_counter() - start, reason is not None))
+            return reason
+
+        # Cari penolakan dengan urutan statistik; sample yang lolos cukup satu putaran
+        failed = reason = None
+        checked = set()
+        for rule in self.check_order:
+            checked.add(rule)
+            reason = run(rule)
+            if reason is not None:
+                failed = rule
+                break
+        # Ditolak: alasan dari rule gagal pertama menurut urutan definisi, jadi
+        # rule sebelumnya yang belum dicek dijalankan dulu
+        if failed is not None:
+            for rule in self.rules[:self.position[failed]]:
+                if rule in checked:
+                    continue
+                earlier = run(rule)
+                if earlier is not None:
+                    reason = earlier
+                    break
+        with self.lock:
+            for rule, seconds, rejected in timings:
+                rule.evaluated += 1
+                rule.rejected += rejected
+                rule.seconds += seconds
+        return reason is None, reason
+
+    def stats(self):
+        with self.lock:
+            return {
+                rule.name: {"evaluated": rule.evaluated, "rejected": rule.rejected, "seconds": rule.seconds}
+                for rule in self.check_order
+            }
+
+    def merge_stats(self, stats):
+        """Tambahkan penghitung dari proses lain (mis. worker paralel)."""
+        with self.lock:
+            for rule in self.rules:
+                stat = stats.get(rule.name)
+                if stat:
+                    rule.evaluated += stat["evaluated"]
+                    rule.rejected += stat["rejected"]
+                    rule.seconds += stat["seconds"]
+
+    def order(self):
+        return [rule.name for rule in self.check_order]
+
+    def set_order(self, names):
+        """Pakai urutan cek dari proses lain (alasan penolakan tidak terpengaruh)."""
+        position = {name: i for i, name in enumerate(names)}
+        self.check_order.sort(key=lambda rule: position.get(rule.name, len(position)))
+
+    def reset_stats(self):
+        with self.lock:
+            for rule in self.rules:
+                rule.evaluated = rule.rejected = 0
+                rule.seconds = 0.0
+
+
+def compile_rules(name, specs):
+    return CompiledRules(name, specs)
+
+
+def load_rule_stats(path=RULE_STATS_PATH):
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            pass
+    return {}
+
+
+def save_rule_stats(compiled, path=RULE_STATS_PATH):
+    """Gabungkan penghitung run ini ke statistik tersimpan lalu reset penghitung."""
+    saved = load_rule_stats(path)
+    for rules in compiled:
+        current = saved.setdefault(rules.name, {})
+        for name, stat in rules.stats().items():
+            total = current.setdefault(name, {"evaluated": 0, "rejected": 0, "seconds": 0.0})
+            for field in ("evaluated", "rejected", "seconds"):
+                total[field] += stat[field]
+        rules.reset_stats()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(saved, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+    return saved
+
+
+def print_rule_stats(rules):
+    print(f"📏 Rule {rules.name}:")
+    for name, stat in rules.stats().items():
+        if not stat["evaluated"]:
+            continue
+        print(
+            f"   - {name:<24} dicek {stat['evaluated']:>6} | tolak {stat['rejected']:>6} | "
+            f"{stat['seconds'] / stat['evaluated'] * 1e6:7.1f} µs/sample"
+        )
@@ -1,85 +1,126 @@
-import json
+import sys
 import os
-import re
+import json
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from jsonl_sink import get_sink
+from code_features import extract_features
+from aggregates import (
+    new_moments, add_moment, merge_moments, mean, variance,
+    new_histogram, add_histogram, merge_histogram, histogram_labels,
+    new_sketch, add_sketch, merge_sketch, quantile,
+)
 
 INPUT_PATH = "data/generated.jsonl"
 SCORE_LOG = "data/score_log.jsonl"
 SUMMARY_PATH = "data/score_summary.json"
+# Arti field skor. 1: regex pada teks (ikut menghitung isi string/komentar).
+# 2: dari AST — function_count = def + async def, class_count = class,
+# comment_count = baris komentar di luar string, variable_count = nama yang
+# di-assign, hardcoded_values = literal str/bytes/angka. Ringkasan dan state
+# agregat dengan versi lain dibangun ulang.
+SCORE_VERSION = 2
 
 def analyze_code(code):
-    lines = code.strip().splitlines()
-    line_count = len(lines)
-
-    function_count = len(re.findall(r"^\s*def\s+\w+", code, re.MULTILINE))
-    class_count = len(re.findall(r"^\s*class\s+\w+", code, re.MULTILINE))
-    comment_count = len(re.findall(r"^\s*#.*", code, re.MULTILINE))
-    variable_count = len(re.findall(r"\b\w+\s*=", code))
-
-    hardcoded_values = len(re.findall(r"[^a-zA-Z](\"[^\"]*\"|'[^']*'|\d+)", code))
+    features = extract_features(code)
+    return {
+        "line_count": features["line_count"],
+        "function_count": features["function_count"],
+        "class_count": features["class_count"],
+        "comment_count": features["comment_count"],
+        "variable_count": features["variable_count"],
+        "hardcoded_values": features["hardcoded_values"],
+        "syntax_valid": features["syntax_valid"],
+        "syntax_valid_percent": 100.0 if features["syntax_valid"] else 0.0,  # ✅ Tambahkan ini
+    }
 
-    try:
-        compile(code, "<string>", "exec")
-        syntax_valid = True
-    except Exception:
-        syntax_valid = False
+# Field skor yang dirata-rata di ringkasan
+AVERAGED_FIELDS = ["line_count", "function_count", "comment_count", "variable_count"]
+# Field dengan statistik lengkap (mean, stdev, min/max, kuantil)
+STAT_FIELDS = ["line_count", "function_count", "class_count", "comment_count", "variable_count", "hardcoded_values"]
+HISTOGRAMS = {"line_count": (10, 500), "function_count": (1, 30)}  # field: (lebar bin, batas overflow)
+QUANTILES = [0.5, 0.9, 0.99]
 
+def new_aggregates():
     return {
-        "line_count": line_count,
-        "function_count": function_count,
-        "class_count": class_count,
-        "comment_count": comment_count,
-        "variable_count": variable_count,
-        "hardcoded_values": hardcoded_values,
-        "syntax_valid": syntax_valid,
-        "syntax_valid_percent": 100.0 if syntax_valid else 0.0,  # ✅ Tambahkan ini
+        "total": 0,
+        "syntax_valid": 0,
+        "fields": {field: {"moments": new_moments(), "sketch": new_sketch()} for field in STAT_FIELDS},
+        "histograms": {field: new_histogram(width, limit) for field, (width, limit) in HISTOGRAMS.items()},
     }
 
-def run_score_checker():
-    if not os.path.exists(INPUT_PATH):
-        print(f"❌ File tidak ditemukan: {INPUT_PATH}")
-        return
-
-    all_scores = []
-    with open(INPUT_PATH, "r", encoding="utf-8") as f:
-        for line in f:
-            sample = json.loads(line)
-            code = sample.get("output", "").strip()
-            if not code:
-                continue
-            score = analyze_code(code)
-            all_scores.append(score)
-
-            # Simpan log per sample (opsional)
-            log_item = {
-                "id": sample.get("id"),
-                "instruction": sample["instruction"],
-                "score": score,
-            }
-            with open(SCORE_LOG, "a", encoding="utf-8") as log_f:
-                log_f.write(json.dumps(log_item, ensure_ascii=False) + "\n")
-
-    if not all_scores:
-        print("⚠️ Tidak ada script yang bisa dinilai.")
-        return
-
-    # Ringkasan statistik
-    summary = {
-        "total": len(all_scores),
-        "avg_line_count": round(sum(s["line_count"] for s in all_scores) / len(all_scores), 2),
-        "avg_function_count": round(sum(s["function_count"] for s in all_scores) / len(all_scores), 2),
-        "avg_comment_count": round(sum(s["comment_count"] for s in all_scores) / len(all_scores), 2),
-        "avg_variable_count": round(sum(s["variable_count"] for s in all_scores) / len(all_scores), 2),
-        "syntax_valid_percent": round(
-            sum(1 for s in all_scores if s["syntax_valid"]) / len(all_scores) * 100, 2
-        ),
-    }
+def add_score(aggregates, score):
+    # Di-update per sample: memori tetap, berapa pun jumlah sample
+    aggregates["total"] += 1
+    aggregates["syntax_valid"] += int(score["syntax_valid"])
+    for field, stats in aggregates["fields"].items():
+        add_moment(stats["moments"], score[field])
+        add_sketch(stats["sketch"], score[field])
+    for field, histogram in aggregates["histograms"].items():
+        add_histogram(histogram, score[field])
+
+def merge_aggregates(aggregates, other):
+    # Agregat dari chunk paralel atau ringkasan run lain
+    aggregates["total"] += other["total"]
+    aggregates["syntax_valid"] += other["syntax_valid"]
+    for field, stats in other["fields"].items():
+        merge_moments(aggregates["fields"][field]["moments"], stats["moments"])
+        merge_sketch(aggregates["fields"][field]["sketch"], stats["sketch"])
+    for field, histogram in other["histograms"].items():
+        merge_histogram(aggregates["histograms"][field], histogram)
+
+def summarize(aggregates):
+    total = aggregates["total"]
+    if not total:
+        return None
+    summary = {"score_version": SCORE_VERSION, "total": total}
+    for field in AVERAGED_FIELDS:
+        summary[f"avg_{field}"] = round(mean(aggregates["fields"][field]["moments"]), 2)
+    summary["syntax_valid_percent"] = round(aggregates["syntax_valid"] / total * 100, 2)
+
+    summary["fields"] = {}
+    for field, stats in aggregates["fields"].items():
+        moments = stats["moments"]
+        summary["fields"][field] = {
+            "mean": round(mean(moments), 2),
+            "stdev": round(variance(moments) ** 0.5, 2),
+            "min": moments["min"],
+            "max": moments["max"],
+            # Perkiraan sketch dijepit ke rentang data yang sebenarnya
+            **{
+                f"p{round(q * 100)}": round(min(max(quantile(stats["sketch"], q), moments["min"]), moments["max"]), 2)
+                for q in QUANTILES
+            },
+        }
+    summary["histograms"] = {field: histogram_labels(h) for field, h in aggregates["histograms"].items()}
+    return summary
 
-    with open(SUMMARY_PATH, "w", encoding="utf-8") as f:
+def save_summary(aggregates, summary_path=SUMMARY_PATH):
+    """Tulis score_summary.json. State agregat mentah disimpan check_engine di
+    check_state.json bersama watermark, jadi run berikutnya hanya menambah baris baru."""
+    summary = summarize(aggregates)
+    tmp = summary_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(summary, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, summary_path)
+    return summary
+
+def run_score_checker(workers=None):
+    """Nilai sample baru di generated.jsonl (lihat check_engine)."""
+    from check_engine import run_checks
+    run_checks(["score"], workers=workers)
+
+def score_log_item(sample, score):
+    return {
+        "id": sample.get("id"),
+        "instruction": sample["instruction"],
+        "score": score,
+    }
 
-    print("📊 Ringkasan Skor Kode:")
-    for key, val in summary.items():
-        print(f"   - {key}: {val}")
+def log_score(sample, score):
+    # Simpan log per sample (opsional)
+    get_sink(SCORE_LOG).write(score_log_item(sample, score))
 
 def compute_score(code):
     return analyze_code(code)
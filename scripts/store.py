@@ -0,0 +1,307 @@
+# store.py
+# Indeks SQLite (WAL) dari file JSONL yang tersebar, untuk query dan ekspor
+# offline. Tabel: samples, attempts (output per percobaan), evaluations (hasil
+# runtime) dan verdicts (hasil checker: semantic, automation, score, ...).
+# Loop dan checker tidak menulis ke sini; sumber kebenarannya tetap file JSONL
+# dan jurnal progress, jadi isi store dibangun ulang lewat `store.py import`.
+import sys
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from progress import sample_key
+
+STORE_PATH = "data/transactions.sqlite"
+WRITE_BATCH = 200  # jumlah tulisan yang dikumpulkan sebelum satu transaksi
+MAX_STORED_OUTPUT = 20000
+
+# Field yang bukan bagian dari sample asli (hasil proses)
+RESULT_FIELDS = ("output", "generated", "error", "rejected_reason")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    key TEXT PRIMARY KEY,
+    id TEXT,
+    instruction TEXT NOT NULL,
+    input TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    id TEXT PRIMARY KEY,
+    sample_key TEXT NOT NULL,
+    attempt INTEGER NOT NULL,
+    output TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attempts_sample ON attempts (sample_key);
+CREATE TABLE IF NOT EXISTS evaluations (
+    attempt_id TEXT PRIMARY KEY,
+    success INTEGER NOT NULL,
+    returncode INTEGER,
+    stage TEXT,
+    stderr TEXT,
+    duration_ms REAL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS evaluations_success ON evaluations (success);
+CREATE TABLE IF NOT EXISTS verdicts (
+    attempt_id TEXT NOT NULL,
+    checker TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    reason TEXT,
+    score TEXT,
+    created REAL NOT NULL,
+    PRIMARY KEY (attempt_id, checker)
+);
+CREATE INDEX IF NOT EXISTS verdicts_checker ON verdicts (checker, passed);
+"""
+
+# Kolom yang dibaca untuk merekonstruksi sample + output
+SAMPLE_COLUMNS = "s.data, s.id, a.id, a.output"
+
+
+def attempt_id(key, output):
+    """Id percobaan deterministik: output yang sama untuk sample yang sama = satu baris."""
+    return hashlib.sha1((key + "\0" + output).encode("utf-8")).hexdigest()
+
+
+def _row_to_sample(row):
+    data, sample_id, aid, output = row[:4]
+    sample = json.loads(data)
+    if sample_id:
+        sample["id"] = sample_id
+    sample["output"] = output
+    return aid, sample
+
+
+class SampleStore:
+    """Akses ke data/transactions.sqlite.
+
+    Tulisan dikumpulkan lalu ditulis per `WRITE_BATCH` dalam satu transaksi;
+    setiap query membuang buffer dulu sehingga pembaca selalu melihat data terbaru.
+    Aman dipakai dari beberapa thread.
+    """
+
+    def __init__(self, path=STORE_PATH, write_batch=WRITE_BATCH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.write_batch = write_batch
+        self.buffer = []  # (sql, params)
+        with self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+
+    # ---------- tulis ----------
+
+    def _write(self, sql, params):
+        with self.lock:
+            self.buffer.append((sql, params))
+            if len(self.buffer) >= self.write_batch:
+                self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self.buffer:
+                return
+            with self.conn:
+                # Kelompokkan statement yang sama agar bisa executemany
+                start = 0
+                for i in range(1, len(self.buffer) + 1):
+                    if i == len(self.buffer) or self.buffer[i][0] != self.buffer[start][0]:
+                        self.conn.executemany(self.buffer[start][0], [p for _, p in self.buffer[start:i]])
+                        start = i
+            self.buffer = []
+
+    def add_sample(self, sample):
+        key = sample_key(sample)
+        data = {k: v for k, v in sample.items() if k not in RESULT_FIELDS and k != "id"}
+        self._write(
+            "INSERT OR IGNORE INTO samples (key, id, instruction, input, data, created) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, sample.get("id"), sample.get("instruction", ""), sample.get("input", ""),
+             json.dumps(data, ensure_ascii=False), time.time()),
+        )
+        return key
+
+    def add_attempt(self, sample, output, attempt=0):
+        """Simpan sample (jika baru) dan output-nya; kembalikan id percobaan."""
+        key = self.add_sample(sample)
+        aid = attempt_id(key, output)
+        self._write(
+            "INSERT OR IGNORE INTO attempts (id, sample_key, attempt, output, created) VALUES (?, ?, ?, ?, ?)",
+            (aid, key, attempt, output, time.time()),
+        )
+        return aid
+
+    def add_evaluation(self, aid, result):
+        stderr = result.get("stderr")
+        self._write(
+            "INSERT OR REPLACE INTO evaluations (attempt_id, success, returncode, stage, stderr, duration_ms, created) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (aid, int(bool(result.get("success"))), result.get("returncode"), result.get("stage"),
+             stderr[-MAX_STORED_OUTPUT:] if isinstance(stderr, str) else None,
+             result.get("duration_ms"), time.time()),
+        )
+
+    def add_verdict(self, aid, checker, passed, reason=None, score=None):
+        self._write(
+            "INSERT OR REPLACE INTO verdicts (attempt_id, checker, passed, reason, score, created) VALUES (?, ?, ?, ?, ?, ?)",
+            (aid, checker, int(bool(passed)), reason,
+             json.dumps(score, ensure_ascii=False) if score is not None else None, time.time()),
+        )
+
+    # ---------- query ----------
+
+    def _query(self, sql, params=()):
+        with self.lock:
+            self.flush()
+            return self.conn.execute(sql, params).fetchall()
+
+    def successful(self):
+        """Semua percobaan yang berhasil dijalankan (isi generated.jsonl)."""
+        rows = self._query(
+            f"SELECT {SAMPLE_COLUMNS} FROM attempts a"
+            " JOIN evaluations e ON e.attempt_id = a.id AND e.success = 1"
+            " JOIN samples s ON s.key = a.sample_key ORDER BY a.created"
+        )
+        return [_row_to_sample(row) for row in rows]
+
+    def verdicts(self, checker, passed=None):
+        """Percobaan yang sudah dinilai `checker`: [(attempt_id, sample, reason, score)]."""
+        sql = (
+            f"SELECT {SAMPLE_COLUMNS}, v.reason, v.score FROM verdicts v"
+            " JOIN attempts a ON a.id = v.attempt_id"
+            " JOIN samples s ON s.key = a.sample_key WHERE v.checker = ?"
+        )
+        params = [checker]
+        if passed is not None:
+            sql += " AND v.passed = ?"
+            params.append(int(passed))
+        results = []
+        for row in self._query(sql + " ORDER BY a.created", params):
+            aid, sample = _row_to_sample(row)
+            results.append((aid, sample, row[4], json.loads(row[5]) if row[5] else None))
+        return results
+
+    def counts(self):
+        result = {}
+        for table in ("samples", "attempts", "evaluations", "verdicts"):
+            result[table] = self._query(f"SELECT COUNT(*) FROM {table}")[0][0]
+        result["evaluations_success"] = self._query("SELECT COUNT(*) FROM evaluations WHERE success = 1")[0][0]
+        for checker, passed, n in self._query("SELECT checker, passed, COUNT(*) FROM verdicts GROUP BY checker, passed"):
+            result[f"{checker}_{'passed' if passed else 'failed'}"] = n
+        return result
+
+    # ---------- JSONL ----------
+
+    def import_jsonl(self, path, kind):
+        """Impor file JSONL lama. `kind` menentukan arti tiap baris (lihat LEGACY_FILES)."""
+        if not os.path.exists(path):
+            return 0
+        count = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not isinstance(item, dict):
+                    continue
+                count += 1
+                if kind == "dataset":
+                    self.add_sample(item)
+                    continue
+
+                output = item.get("output") or item.get("generated") or ""
+                aid = self.add_attempt(item, output)
+                if kind == "generated":
+                    self.add_evaluation(aid, {"success": True, "returncode": 0, "stage": "legacy"})
+                elif kind == "errors":
+                    if item.get("rejected_reason"):
+                        self.add_verdict(aid, "semantic", False, item["rejected_reason"])
+                    else:
+                        self.add_evaluation(aid, {"success": False, "stage": "legacy", "stderr": item.get("error")})
+                elif kind in ("non_python", "too_short"):
+                    self.add_verdict(aid, "prefilter", False, kind)
+                else:
+                    # final / final_soft / rejected*: semuanya berasal dari generated.jsonl
+                    self.add_evaluation(aid, {"success": True, "returncode": 0, "stage": "legacy"})
+                    checker = "automation" if kind in ("final_soft", "rejected_automation") else "semantic"
+                    passed = kind not in ("rejected", "rejected_automation")
+                    self.add_verdict(aid, checker, passed, item.get("rejected_reason"))
+        self.flush()
+        return count
+
+    def export_jsonl(self, path, samples):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for sample in samples:
+                f.write(json.dumps(sample, ensure_ascii=False) + "\n")
+        return len(samples)
+
+    def close(self):
+        with self.lock:
+            self.flush()
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# File lama -> jenis impor
+LEGACY_FILES = [
+    ("data/dataset.jsonl", "dataset"),
+    ("data/generated.jsonl", "generated"),
+    ("data/failed_outputs/errors.jsonl", "errors"),
+    ("data/failed_outputs/non_python.jsonl", "non_python"),
+    ("data/failed_outputs/too_short.jsonl", "too_short"),
+    ("data/final_dataset.jsonl", "final"),
+    ("data/final_dataset_soft.jsonl", "final_soft"),
+    ("data/rejected_semantic.jsonl", "rejected"),
+    ("data/rejected_automation.jsonl", "rejected_automation"),
+]
+
+
+def export_all(store, out_dir="data"):
+    """Tulis ulang file JSONL utama dari isi store."""
+    exported = {
+        "generated.jsonl": store.successful(),
+        "final_dataset.jsonl": [s for _, s, _, _ in store.verdicts("semantic", passed=True)],
+        "final_dataset_soft.jsonl": [s for _, s, _, _ in store.verdicts("automation", passed=True)],
+    }
+    for name, samples in exported.items():
+        path = os.path.join(out_dir, name)
+        store.export_jsonl(path, samples)
+        print(f"   - {len(samples)} → {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kelola data/transactions.sqlite")
+    parser.add_argument("command", choices=["import", "export", "stats"])
+    parser.add_argument("--db", default=STORE_PATH)
+    parser.add_argument("--out-dir", default="data")
+    args = parser.parse_args()
+
+    with SampleStore(args.db) as store:
+        if args.command == "import":
+            for path, kind in LEGACY_FILES:
+                print(f"📥 {path}: {store.import_jsonl(path, kind)} baris")
+        elif args.command == "export":
+            print("📤 Ekspor JSONL:")
+            export_all(store, args.out_dir)
+        print(f"🗃️  {json.dumps(store.counts(), ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    main()
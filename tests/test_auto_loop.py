@@ -0,0 +1,72 @@
+# auto_loop.main dengan generator palsu: semua baris dataset harus selesai
+# (termasuk baris kembar) supaya cursor maju sampai akhir file.
+import os
+import sys
+import json
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "scripts"))
+sys.path.append(ROOT)
+
+import auto_loop
+from progress import RunCursor
+
+SCRIPT = "import os\n\nprint(os.getcwd())\nprint('ok')\n"
+
+
+class FakeGenerator:
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, samples, **kwargs):
+        self.calls += 1
+        return [SCRIPT for _ in samples]
+
+    def stats(self):
+        return {"mode": "palsu", "requests": self.calls}
+
+
+def test_duplicate_dataset_lines_finish(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    lines = [
+        {"instruction": "buat script", "input": "GET /a"},
+        {"instruction": "buat script", "input": "GET /a"},
+        {"instruction": "buat script lain", "input": "GET /b"},
+        {"instruction": "buat script", "input": "GET /a"},
+    ]
+    with open(auto_loop.DATA_PATH, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(json.dumps(line) + "\n")
+
+    cursors = []
+
+    class RecordingCursor(RunCursor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            cursors.append(self)
+
+    monkeypatch.setattr(auto_loop, "get_generator", lambda **kwargs: FakeGenerator())
+    monkeypatch.setattr(auto_loop, "judge", lambda sample, result: (result["success"], None if result["success"] else "runtime"))
+    monkeypatch.setattr(auto_loop, "RunCursor", RecordingCursor)
+
+    auto_loop.main()
+
+    cursor = cursors[0]
+    assert cursor.offset == os.path.getsize(auto_loop.DATA_PATH)
+    assert cursor._low == len(lines)
+
+
+def test_greedy_first_attempt(monkeypatch):
+    calls = []
+
+    class RecordingGenerator:
+        def generate(self, samples, do_sample=True, **kwargs):
+            calls.append((do_sample, [s["input"] for s in samples]))
+            return [f"{s['input']}:{do_sample}" for s in samples]
+
+    monkeypatch.setattr(auto_loop, "GREEDY_FIRST", True)
+    todo = [({"input": "a"}, 0), ({"input": "b"}, 1), ({"input": "c"}, 0)]
+    outputs = auto_loop.generate_outputs(RecordingGenerator(), todo)
+    assert outputs == ["a:False", "b:True", "c:False"]
+    assert calls == [(False, ["a", "c"]), (True, ["b"])]
@@ -0,0 +1,45 @@
+# Bangun ulang (generated.jsonl ditulis ulang) tidak boleh menggandakan file verdict.
+import os
+import sys
+import json
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "scripts"))
+sys.path.append(ROOT)
+
+import jsonl_sink
+from check_engine import CheckEngine, default_rule_sets
+
+SAMPLES = [
+    {"instruction": "ambil data", "input": "GET https://api.example.com/a",
+     "output": "import requests\n\ndef main():\n    r = requests.get('https://api.example.com/a')\n    print(r.text)\n\nmain()\n"},
+    {"instruction": "ambil data", "input": "GET https://api.example.com/b", "output": "print('halo')\nprint('dunia')\n"},
+    {"instruction": "hitung", "input": "", "output": "x = 1\n"},
+]
+
+
+def _line_counts(paths):
+    jsonl_sink.flush_all()
+    return {path: sum(1 for _ in open(path, encoding="utf-8")) if os.path.exists(path) else 0 for path in paths}
+
+
+def test_rebuild_does_not_duplicate_outputs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data/failed_outputs")
+    with open("data/generated.jsonl", "w", encoding="utf-8") as f:
+        for sample in SAMPLES:
+            f.write(json.dumps(sample) + "\n")
+
+    paths = sorted({path for rule_set in default_rule_sets() for path in rule_set.output_paths()})
+    CheckEngine().run()
+    first = _line_counts(paths)
+    assert sum(first.values()) > 0
+
+    # Urutan berubah (mis. setelah dedup): fingerprint beda, semua dibangun ulang
+    with open("data/generated.jsonl", "w", encoding="utf-8") as f:
+        for sample in reversed(SAMPLES):
+            f.write(json.dumps(sample) + "\n")
+    CheckEngine().run()
+    assert _line_counts(paths) == first
+    # errors.jsonl hanya untuk error runtime dari loop
+    assert not os.path.exists("data/failed_outputs/errors.jsonl")
@@ -0,0 +1,145 @@
+# Record fitur vs implementasi pencarian teks lama (scripts/bench_code_features.py).
+# Verdict checker dan syntax_valid harus sama persis, kecuali perbedaan yang
+# memang disengaja: kode yang hanya muncul di komentar atau string. Field
+# hitungan skor punya arti baru (score_checker.SCORE_VERSION 2) dan dites
+# terhadap contoh yang ditulis tangan.
+import io
+import os
+import sys
+import tokenize
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "scripts"))
+sys.path.append(ROOT)
+
+from bench_code_features import legacy_score, legacy_semantic, legacy_automation, load_corpus
+from scripts.score_checker import analyze_code
+from data.semantic_checker import check_semantic_compatibility
+from semantic_checker_automation import check_semantic_for_automation
+
+CORPUS_SIZE = 500
+
+CHECKERS = [
+    ("semantic", legacy_semantic, check_semantic_compatibility),
+    ("automation", legacy_automation, check_semantic_for_automation),
+]
+
+SYNTAX_CASES = [
+    "import requests\n\ndef main():\n    r = requests.get('https://example.com', timeout=10)\n    print(r.status_code)\n",
+    "import asyncio\n\nasync def main():\n    await asyncio.sleep(1)\n\nasyncio.run(main())\n",
+    "123\nx = 'a' + \"b\"\n",
+    "   \n  import os\nprint(os.getcwd())\n",
+    "\n\nimport os\n# komentar\nclass A:\n    pass\n",
+    "import os\ndef rusak(:\n    return\n",
+    "return 1\n",
+    "def f(a, a):\n    pass\n",
+    "",
+]
+
+VERDICT_CASES = [
+    # Kode hanya di komentar: lama lolos, baru ditolak (disengaja)
+    {"instruction": "ambil user", "input": "[GET] https://api.example.com/users",
+     "output": "import requests\n\n# r = requests.get('https://api.example.com/users')\nprint('api.example.com')\n"},
+    # Seluruh script di dalam string (disengaja)
+    {"instruction": "login", "input": "",
+     "output": "'''\nimport requests\nsession = requests.Session()\nsession.post('https://example.com')\n'''\n"},
+    {"instruction": "ambil user", "input": "[GET] https://api.example.com/users",
+     "output": "import requests\n\ndef main():\n    r = requests.get('https://api.example.com/users')\n    print(r.json())\n\nmain()\n"},
+    {"instruction": "hitung", "input": "", "output": "x = 1\n"},
+]
+
+
+def code_only(code):
+    """Kode tanpa komentar dan isi string; None jika tidak bisa di-tokenize."""
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(code).readline))
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return None
+    kept = []
+    for token in tokens:
+        if token.type == tokenize.COMMENT:
+            continue
+        if token.type == tokenize.STRING:
+            token = token._replace(string='""')
+        kept.append(token)
+    return tokenize.untokenize(kept)
+
+
+def assert_verdicts_match(sample):
+    for name, legacy, check in CHECKERS:
+        before, after = legacy(sample)[0], check(sample)[0]
+        if before == after:
+            continue
+        # Satu-satunya perbedaan yang diizinkan: verdict lama berubah jadi sama
+        # setelah komentar dan isi string dibuang dari kode
+        stripped = code_only(sample["output"])
+        assert stripped is not None, (name, sample["output"][:200])
+        assert legacy(dict(sample, output=stripped))[0] == after, (name, sample["output"][:200])
+
+
+@pytest.mark.parametrize("code", SYNTAX_CASES)
+def test_syntax_and_lines_match_legacy(code):
+    score, old = analyze_code(code), legacy_score(code)
+    for field in ("line_count", "syntax_valid", "syntax_valid_percent"):
+        assert score[field] == old[field], field
+
+
+@pytest.mark.parametrize("sample", VERDICT_CASES)
+def test_verdicts_match_legacy(sample):
+    assert_verdicts_match(sample)
+
+
+def test_intended_differences_are_real():
+    # Dua contoh pertama memang berbeda (kode hanya di komentar / string)
+    for sample in VERDICT_CASES[:2]:
+        assert any(legacy(sample)[0] != check(sample)[0] for _, legacy, check in CHECKERS)
+
+
+def test_score_fields_from_ast():
+    code = (
+        "import os\n"
+        "# komentar\n"
+        "DOC = '''\n"
+        "def palsu():\n"
+        "# bukan komentar\n"
+        "'''\n"
+        "async def ambil(url, timeout=10):\n"
+        "    data = {'a': 1}\n"
+        "    return data\n"
+        "class Klien:\n"
+        "    pass\n"
+        "x == 1\n"
+    )
+    score = analyze_code(code)
+    assert score["function_count"] == 1  # def di dalam string tidak dihitung
+    assert score["class_count"] == 1
+    assert score["comment_count"] == 1
+    assert score["variable_count"] == 2  # DOC, data (bukan `x == 1` atau keyword)
+    assert score["hardcoded_values"] == 5  # string DOC, 10, 'a', 1, 1
+
+
+def test_score_fields_without_ast():
+    # Tidak bisa di-parse: hitungan dari regex teks
+    score = analyze_code("import os\ndef rusak(:\n    x = 1\n# catatan\n")
+    assert score["syntax_valid"] is False
+    assert score["function_count"] == 1
+    assert score["comment_count"] == 1
+
+
+def test_corpus_syntax_matches_legacy():
+    samples = load_corpus(CORPUS_SIZE)
+    if not samples:
+        pytest.skip("tidak ada script contoh di data/")
+    for sample in samples:
+        score, old = analyze_code(sample["output"]), legacy_score(sample["output"])
+        assert (score["line_count"], score["syntax_valid"]) == (old["line_count"], old["syntax_valid"])
+
+
+def test_corpus_verdicts_match_legacy():
+    samples = load_corpus(CORPUS_SIZE)
+    if not samples:
+        pytest.skip("tidak ada script contoh di data/")
+    for sample in samples:
+        assert_verdicts_match(sample)
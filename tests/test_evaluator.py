@@ -0,0 +1,39 @@
+# Gate statis harus menjawab seperti proses anak: modul lokal repo (yang hanya
+# ada di sys.path proses loop) dianggap tidak tersedia.
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "scripts"))
+sys.path.append(ROOT)
+
+import evaluator
+
+
+def test_module_lookup_matches_child():
+    for name in ("sys", "os", "json", "asyncio"):
+        assert evaluator.module_available(name), name
+    # Bisa diimpor di sini (sys.path ditambah folder repo), tapi tidak di anak
+    for name in ("rules", "evaluator", "semantic_checker_automation"):
+        assert not evaluator.module_available(name), name
+        code = f"import {name}\nprint('ok')\n"
+        gate = evaluator.static_check(code)
+        run = evaluator.evaluate_script(code, mode="subprocess", static_gate=False)
+        assert gate is not None and not gate["success"]
+        assert not run["success"] and "ModuleNotFoundError" in run["stderr"]
+
+
+def test_child_uses_same_interpreter():
+    result = evaluator.evaluate_script("import sys\nprint(sys.executable)\n", mode="subprocess", static_gate=False)
+    assert result["success"]
+    assert result["stdout"].strip() == sys.executable
+
+
+def test_fork_children_get_fresh_random_state():
+    code = "import random\nprint(random.random())\n"
+    server = evaluator.ForkServerEvaluator()
+    try:
+        outputs = {server.evaluate(code, 10, None)["stdout"] for _ in range(4)}
+    finally:
+        server.close()
+    assert len(outputs) == 4
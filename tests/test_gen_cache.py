@@ -0,0 +1,28 @@
+# Output greedy dipakai ulang; sampling tanpa reuse tidak dihitung sebagai miss.
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "scripts"))
+sys.path.append(ROOT)
+
+from gen_cache import GenerationCache, cache_key
+
+SAMPLE = {"instruction": "buat script", "input": "GET /a"}
+
+
+def test_greedy_hits_and_sampled_bypass(tmp_path):
+    cache = GenerationCache(str(tmp_path / "cache.sqlite"), reuse_sampled=0)
+    greedy = {"max_tokens": 300, "temperature": 0.5, "do_sample": False, "input_budget": 512}
+    sampled = dict(greedy, do_sample=True)
+
+    key = cache_key(SAMPLE, greedy, "rev")
+    assert cache.get(key, greedy) is None
+    cache.put(key, greedy, "print(1)")
+    assert cache.get(key, greedy) == "print(1)"
+
+    key = cache_key(SAMPLE, sampled, "rev")
+    cache.put(key, sampled, "print(2)")
+    assert cache.get(key, sampled) is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "bypassed": 1}
+    cache.close()
@@ -0,0 +1,108 @@
+# Writer loop.py: satu batch = satu flush per sink + satu transaksi jurnal,
+# dan baris output sudah ada di file saat jurnal mencatat `done`. Exception di
+# sebuah stage tidak boleh membuat record hilang (cursor harus sampai akhir).
+import os
+import sys
+import json
+from collections import Counter
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "scripts"))
+sys.path.append(ROOT)
+
+import loop
+import jsonl_sink
+from progress import RunCursor
+
+
+class FakeJournal:
+    def __init__(self):
+        self.batches = []
+        self.lines_at_commit = []
+
+    def record(self, key, stage, result=None):
+        raise AssertionError("writer harus mencatat satu batch sekaligus")
+
+    def record_many(self, entries):
+        self.batches.append(list(entries))
+        self.lines_at_commit.append(sum(1 for _ in open(loop.GENERATED_PATH, encoding="utf-8")))
+
+    def advance(self, offset):
+        pass
+
+
+class FakeCursor:
+    def __init__(self):
+        self.calls = []
+
+    def finish_many(self, seqs):
+        self.calls.append(list(seqs))
+
+
+def record(seq, status, success=True):
+    sample = {"id": f"{seq:08d}", "instruction": "x", "input": str(seq), "output": "import os\nprint(1)\n"}
+    result = {"key": str(seq), "seq": seq, "sample": sample, "status": status, "generated": True}
+    if status == "evaluated":
+        result["eval"] = {"success": success, "stderr": "" if success else "Traceback"}
+    return result
+
+
+def test_writer_group_commit(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(loop, "GENERATED_PATH", str(tmp_path / "generated.jsonl"))
+    monkeypatch.setattr(loop, "FAILED_DIR", str(tmp_path / "failed"))
+    # Sink tidak pernah flush sendiri: hanya group commit yang menulis ke file
+    for name in ("generated.jsonl", "failed/non_python.jsonl", "failed/errors.jsonl"):
+        jsonl_sink.get_sink(str(tmp_path / name), flush_records=10 ** 6, flush_interval=float("inf"))
+
+    journal, cursor, stats = FakeJournal(), FakeCursor(), Counter()
+    run = loop.writer_stage(stats, journal, cursor)
+    batch = [record(0, "evaluated"), record(1, "json"), record(2, "evaluated", success=False),
+             record(3, "eval_error"), record(4, "evaluated")]
+    run(batch)
+
+    assert len(journal.batches) == 1
+    assert [entry[0] for entry in journal.batches[0]] == ["0", "1", "2", "4"]  # eval_error dicoba lagi
+    assert journal.lines_at_commit == [2]
+    assert cursor.calls == [[0, 1, 2, 3, 4]]
+    assert stats["success"] == 2 and stats["json"] == 1
+    jsonl_sink.close_all()
+
+
+class FakeGenerator:
+    def generate(self, samples, **kwargs):
+        return ["import os\nprint(os.getcwd())\n" for _ in samples]
+
+    def stats(self):
+        return {"mode": "palsu"}
+
+
+def test_stage_exception_reaches_writer(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    with open(loop.DATA_PATH, "w", encoding="utf-8") as f:
+        for i in range(6):
+            f.write(json.dumps({"instruction": "buat script", "input": f"boom {i}" if i % 2 else f"GET /{i}"}) + "\n")
+
+    def flaky_filter(record):
+        if record["sample"]["input"].startswith("boom"):
+            raise RuntimeError("filter rusak")
+        return loop.filter_stage(record)
+
+    cursors = []
+
+    class RecordingCursor(RunCursor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            cursors.append(self)
+
+    monkeypatch.setattr(loop, "get_generator", lambda **kwargs: FakeGenerator())
+    monkeypatch.setattr(loop, "filter_stage", flaky_filter)
+    monkeypatch.setattr(loop, "evaluate_script", lambda code, sample=None: {"success": True, "stdout": "", "stderr": ""})
+    monkeypatch.setattr(loop, "RunCursor", RecordingCursor)
+
+    loop.main_loop()
+
+    assert cursors[0]._low == 6
+    assert cursors[0].offset == os.path.getsize(loop.DATA_PATH)
+    jsonl_sink.close_all()
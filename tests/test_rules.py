@@ -0,0 +1,31 @@
+# Alasan penolakan harus sama berapa pun urutan cek dari rule_stats.json.
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "scripts"))
+sys.path.append(ROOT)
+
+from rules import CompiledRules
+
+SPECS = [
+    {"name": "imports", "reason": "tidak ada import", "require": {"starts_with_import": True}},
+    {"name": "http", "reason": "tanpa requests", "when": {"input_any": ["http"]}, "require": {"imports_any": ["requests"]}},
+    {"name": "short", "reason": "terlalu pendek", "require": {"min_lines": 3}},
+]
+
+SAMPLES = [
+    {"instruction": "x", "input": "GET http://a.com", "output": "print(1)"},
+    {"instruction": "x", "input": "GET http://a.com", "output": "import os\nprint(1)"},
+    {"instruction": "x", "input": "", "output": "import os\nprint(1)"},
+    {"instruction": "x", "input": "", "output": "import os\nprint(1)\nprint(2)"},
+]
+
+
+def test_reason_follows_declared_order(tmp_path):
+    declared = CompiledRules("t", SPECS, stats_path=str(tmp_path / "none.json"))
+    reordered = CompiledRules("t", SPECS, stats_path=str(tmp_path / "none.json"))
+    reordered.set_order(list(reversed(reordered.order())))
+    expected = [(False, "tidak ada import"), (False, "tanpa requests"), (False, "terlalu pendek"), (True, None)]
+    assert [declared.check(s) for s in SAMPLES] == expected
+    assert [reordered.check(s) for s in SAMPLES] == expected